@@ -0,0 +1,42 @@
+import gzip
+from typing import Any, Dict, List
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used when it isn't installed
+    brotli = None
+
+
+def accepted_encodings(request: Request) -> List[str]:
+    """Encodings from Accept-Encoding, ignoring ones explicitly refused with q=0"""
+    encodings = []
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.append(name.lower())
+    return encodings
+
+
+def json_response(content: Any, request: Request, status_code: int = 200) -> Response:
+    """Serialize with orjson and compress bodies above the configured size.
+
+    ``content`` is sent as is, without response_model validation, so it must
+    already match the declared schema.
+    """
+    body = orjson.dumps(content)
+    headers: Dict[str, str] = {"Vary": "Accept-Encoding"}
+
+    if settings.response_compression_min_bytes and len(body) >= settings.response_compression_min_bytes:
+        encodings = accepted_encodings(request)
+        if brotli is not None and "br" in encodings:
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in encodings:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
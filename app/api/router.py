@@ -1,13 +1,37 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from datetime import datetime
+from typing import List, Optional, Tuple
+import asyncio
+import base64
 import logging
+import orjson
 from app.api.schemas import (
-    ProductIngest, QueryRequest, QueryResponse, 
-    IngestResponse, HealthResponse, ChatMessage
+    ProductIngest, QueryRequest, QueryResponse, QueryBatchRequest, SearchResponse, SuggestResponse,
+    HealthResponse, ReadinessResponse,
+    CatalogSyncRequest, CatalogSyncResponse,
+    ProductUpdate, ProductBulkUpdateRequest, ProductUpdateResponse,
+    IngestJobResponse, IngestJobStatus
 )
-from app.services.database import db_service
+from app.api.responses import json_response
+from app.services.database import SearchFilters, db_service
 from app.services.llm_service import llm_service
-from app.graph.builder import rag_agent
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.suggest import suggest_service
+from app.services.change_feed import change_feed
+from app.services.catalog_sync import catalog_sync_service
+from app.services.ingest_queue import ingest_queue, QueueFullError
+from app.services.warmup import warmup_service
+from app.services.query_runner import build_query_response, initial_state, run_batch
+from app.services.model_router import model_router
+from app.services.admission import (
+    AdmissionController, AdmissionRejected, batch_admission, ingest_admission, query_admission
+)
+from app.services.loop_monitor import loop_monitor
+from app.core.config import settings
+from app.graph.builder import get_rag_agent
+from app.graph.deadline import deadline_in
 
 logger = logging.getLogger(__name__)
 
@@ -24,51 +48,324 @@ async def health_check():
     )
 
 
-@router.post("/ingest", response_model=IngestResponse)
+@router.get("/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+async def readiness_check():
+    """Readiness probe: 503 until warm-up has finished and while the database is unreachable"""
+    readiness = await warmup_service.readiness()
+    if not readiness["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=readiness)
+    return ReadinessResponse(**readiness)
+
+
+@router.get("/metrics")
+async def metrics():
+    """In-process cache and runtime metrics for this worker"""
+    return {
+        "catalog_version": db_service.catalog_version,
+        "catalog_change_feed_connected": change_feed.connected,
+        "search_cache": db_service.search_cache.stats(),
+        "embedding_cache": llm_service.embedding_cache.stats(),
+        "embedding_provider": llm_service.embedding_provider.stats(),
+        "read_replicas": db_service.replicas.stats(),
+        "sql_statements": db_service.statements.stats(),
+        "model_tiers": model_router.stats(),
+        "azure_openai": llm_service.circuit_stats(),
+        "suggest": suggest_service.stats(),
+        "ingest_queue": ingest_queue.stats(),
+        "admission": {
+            "query": query_admission.stats(),
+            "query_batch": batch_admission.stats(),
+            "ingest": ingest_admission.stats()
+        },
+        "event_loop": loop_monitor.stats()
+    }
+
+
+def _shed(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def _admission(controller: AdmissionController):
+    """Dependency holding one of the controller's slots while the endpoint runs"""
+    async def admit():
+        try:
+            async with controller.slot():
+                yield
+        except AdmissionRejected as e:
+            raise _shed(e)
+    return admit
+
+
+async def _submit_ingest_job(products: List[ProductIngest]) -> IngestJobResponse:
+    try:
+        job_id = await ingest_queue.submit([product.model_dump() for product in products])
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    except Exception as e:
+        logger.error(f"Error queuing ingestion job: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error ingesting product: {str(e)}"
+        )
+    
+    return IngestJobResponse(
+        job_id=job_id,
+        status="queued",
+        status_url=f"/ingest/jobs/{job_id}"
+    )
+
+
+@router.post(
+    "/ingest",
+    response_model=IngestJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(_admission(ingest_admission))]
+)
 async def ingest_product(product: ProductIngest):
-    """Ingest a new product into the database"""
-    logger.info(f"Ingesting product: {product.name}")
+    """Queue a product for ingestion; poll the returned job for its product id"""
+    logger.info(f"Queuing product for ingestion: {product.name}")
+    return await _submit_ingest_job([product])
+
+
+@router.post(
+    "/ingest/bulk",
+    response_model=IngestJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(_admission(ingest_admission))]
+)
+async def ingest_products(products: List[ProductIngest]):
+    """Queue many products as a single ingestion job"""
+    if not products:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one product is required"
+        )
+    if settings.ingest_queue_size and len(products) > settings.ingest_queue_size:
+        # Could never fit in the queue: retrying won't help, the caller has to split the batch
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.ingest_queue_size} products per ingestion job"
+        )
+    
+    logger.info(f"Queuing {len(products)} products for ingestion")
+    return await _submit_ingest_job(products)
+
+
+@router.get("/ingest/jobs/{job_id}", response_model=IngestJobStatus)
+async def get_ingest_job(job_id: str):
+    """Progress of an ingestion job"""
+    job = await ingest_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ingestion job {job_id} not found"
+        )
+    return IngestJobStatus(**job)
+
+
+@router.post("/products/sync", response_model=CatalogSyncResponse, dependencies=[Depends(_admission(ingest_admission))])
+async def sync_catalog(request: CatalogSyncRequest):
+    """Upsert a catalog feed by external id, re-embedding only changed products"""
+    logger.info(f"Syncing {len(request.products)} products (full_snapshot={request.full_snapshot})")
     
     try:
-        text_parts = [product.name]
-        if product.description:
-            text_parts.append(product.description)
-        if product.category:
-            text_parts.append(product.category)
-        
-        product_text = " ".join(text_parts)
-        embedding = await llm_service.generate_embedding(product_text)
-        
-        product_id = await db_service.store_product(
-            name=product.name,
-            description=product.description,
-            category=product.category,
-            price=product.price,
-            stock_quantity=product.stock_quantity,
-            specs=product.specs,
-            embedding=embedding,
-            metadata=product.metadata or {}
+        result = await catalog_sync_service.sync_products(
+            [product.model_dump() for product in request.products],
+            full_snapshot=request.full_snapshot
         )
+        return CatalogSyncResponse(**result)
         
-        logger.info(f"Product ingested successfully with ID: {product_id}")
-        return IngestResponse(
-            product_id=product_id,
-            message="Product ingested successfully",
-            status="success"
+    except Exception as e:
+        logger.error(f"Error syncing catalog: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error syncing catalog: {str(e)}"
+        )
+
+
+@router.patch("/products/{product_id}", response_model=ProductUpdateResponse)
+async def update_product(product_id: str, update: ProductUpdate):
+    """Update price, stock or specs of a product without re-embedding it"""
+    try:
+        not_found = await db_service.update_product_fields(
+            [dict(update.model_dump(), product_id=product_id)]
+        )
+    except Exception as e:
+        logger.error(f"Error updating product {product_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating product: {str(e)}"
+        )
+    
+    if not_found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {product_id} not found"
+        )
+    
+    return ProductUpdateResponse(updated=1, not_found=[])
+
+
+@router.post("/products/updates", response_model=ProductUpdateResponse, dependencies=[Depends(_admission(ingest_admission))])
+async def bulk_update_products(request: ProductBulkUpdateRequest):
+    """Batch-update price, stock or specs for many products without re-embedding them"""
+    logger.info(f"Updating {len(request.updates)} products")
+    
+    try:
+        not_found = await db_service.update_product_fields(
+            [update.model_dump() for update in request.updates]
+        )
+        return ProductUpdateResponse(
+            updated=len(request.updates) - len(not_found),
+            not_found=not_found
         )
         
     except Exception as e:
-        logger.error(f"Error ingesting product: {e}")
+        logger.error(f"Error updating products: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error ingesting product: {str(e)}"
+            detail=f"Error updating products: {str(e)}"
+        )
+
+
+def _encode_cursor(score: float, product_id: str) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([score, product_id])).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        score, product_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), str(product_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_products(
+    http_request: Request,
+    q: str = Query(..., min_length=1, description="Search text"),
+    category: Optional[str] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: bool = Query(False, description="Only products with stock"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    details: bool = Query(False, description="Include description and specs")
+):
+    """Hybrid product search without the LLM, paginated with keyset cursors"""
+    after = _decode_cursor(cursor) if cursor else None
+    filters = SearchFilters(category=category, min_price=min_price, max_price=max_price, in_stock=in_stock)
+    
+    try:
+        try:
+            embedding = await llm_service.embed_query(q)
+        except CircuitOpenError:
+            # Lexical results only while Azure embeddings are failing
+            hits = await db_service.text_search(q, settings.search_max_results, include_details=False, filters=filters)
+            # Text rank is the only score here; the keyset order and cursors need it as the combined score
+            for hit in hits:
+                hit.combined_score = hit.rank_score
+        else:
+            # Every page reads the same cached ranking; details are loaded for the returned page only
+            hits = await db_service.hybrid_search(
+                embedding, q, top_k=settings.search_max_results, filters=filters, include_details=False
+            )
+    except Exception as e:
+        logger.error(f"Error searching products: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching products: {str(e)}"
+        )
+    
+    # Total order for the keyset: score descending, then product id
+    hits.sort(key=lambda hit: (-hit.combined_score, hit.product_id))
+    if after is not None:
+        hits = [hit for hit in hits if (-hit.combined_score, hit.product_id) > (-after[0], after[1])]
+    
+    page = hits[:limit]
+    if details and page:
+        await db_service.load_product_details(page)
+    
+    results = []
+    for hit in page:
+        result = {
+            "product_id": hit.product_id,
+            "name": hit.name,
+            "category": hit.category,
+            "price": hit.price,
+            "stock_quantity": hit.stock_quantity,
+            "scores": {
+                "similarity": hit.similarity_score,
+                "text_rank": hit.rank_score,
+                "fuzzy": hit.fuzzy_score,
+                "combined": hit.combined_score
+            }
+        }
+        if details:
+            result["description"] = hit.description
+            result["specs"] = hit.specs
+        results.append(result)
+    
+    next_cursor = None
+    if len(hits) > limit:
+        next_cursor = _encode_cursor(page[-1].combined_score, page[-1].product_id)
+    
+    return json_response({"query": q, "results": results, "next_cursor": next_cursor}, http_request)
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    http_request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Text typed so far"),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """Typeahead suggestions of product names and categories"""
+    try:
+        suggestions = await suggest_service.suggest(q, limit)
+    except Exception as e:
+        logger.error(f"Error building suggestions: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error building suggestions: {str(e)}"
         )
+    
+    return json_response({"query": q, "suggestions": suggestions}, http_request)
 
 
-@router.post("/query", response_model=QueryResponse)
-async def query_products(request: QueryRequest):
+@router.post("/query/batch")
+async def query_products_batch(request: QueryBatchRequest):
+    """Answer many queries in one call, streaming one NDJSON line per query as it completes"""
+    logger.info(f"Processing batch of {len(request.queries)} queries")
+    
+    # Yield dependencies exit before a streaming body is sent, so the slot is released after the stream instead
+    try:
+        release = await batch_admission.hold()
+    except AdmissionRejected as e:
+        raise _shed(e)
+    
+    async def lines():
+        async for result in run_batch(
+            [query.model_dump() for query in request.queries],
+            search_concurrency=request.search_concurrency,
+            agent_concurrency=request.agent_concurrency
+        ):
+            yield orjson.dumps(result) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson", background=BackgroundTask(release))
+
+
+@router.post("/query", response_model=QueryResponse, dependencies=[Depends(_admission(query_admission))])
+async def query_products(request: QueryRequest, http_request: Request):
     """Query products using RAG"""
-    logger.info(f"Processing query: {request.query}")
+    logger.debug("Processing query")
     
     try:
         conversation_history = []
@@ -78,57 +375,34 @@ async def query_products(request: QueryRequest):
                 for msg in request.conversation_history
             ]
         
-        import time
-        result = await rag_agent.ainvoke({
-            "original_query": request.query,
-            "conversation_history": conversation_history,
-            "query_plan": [],
-            "retrieved_docs": [],
-            "generated_answer": "",
-            "final_answer": "",
-            "evaluation_result": {},
-            "confidence_score": 0.0,
-            "processing_steps": [],
-            "error_messages": [],
-            "start_time": time.time(),
-            "end_time": None,
-            "max_retries": 1,
-            "current_retry": 0
-        })
-        
-        updated_history = conversation_history.copy()
-        updated_history.append({"role": "user", "content": request.query})
-        updated_history.append({"role": "assistant", "content": result["final_answer"]})
-        
-        conversation_messages = [
-            ChatMessage(role=msg["role"], content=msg["content"]) 
-            for msg in updated_history
-        ]
-        
-        sources = []
-        for doc in result.get("retrieved_docs", []):
-            sources.append({
-                "product_id": doc.get("product_id", doc.get("id", "")),
-                "product_name": doc.get("name", ""),
-                "relevance_score": doc.get("combined_score", doc.get("similarity_score", 0.0)),
-                "content_snippet": doc.get("content", f"{doc.get('name', '')} - {doc.get('description', '')}")[:200]
-            })
+        state = initial_state(
+            request.query, conversation_history,
+            deadline=deadline_in(settings.query_deadline_seconds)
+        )
+        # Nodes degrade as the deadline approaches; this is the hard ceiling if one still overruns
+        hard_timeout = None
+        if settings.query_deadline_seconds:
+            hard_timeout = settings.query_deadline_seconds + settings.query_deadline_grace_seconds
+        result = await asyncio.wait_for(get_rag_agent().ainvoke(state), timeout=hard_timeout)
         
-        logger.info(f"Query processed successfully")
-        return QueryResponse(
-            query=request.query,
-            answer=result["final_answer"],
-            sources=sources,
-            confidence_score=result.get("confidence_score", 0.0),
-            processing_time_ms=int((result.get("end_time", 0) - result.get("start_time", 0)) * 1000),
-            conversation_history=conversation_messages
+        logger.debug("Query processed successfully")
+        # Built from validated input and our own results, so pydantic validation is skipped
+        response = build_query_response(
+            request.query, conversation_history, result,
+            include_history=request.include_history,
+            max_sources=request.max_sources
         )
+        return json_response(response, http_request)
         
+    except asyncio.TimeoutError:
+        logger.error("Query exceeded its deadline")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Query took too long to answer"
+        )
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing query: {str(e)}"
         )
-
-
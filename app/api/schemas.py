@@ -12,6 +12,51 @@ class ProductIngest(BaseModel):
     stock_quantity: Optional[int] = Field(None, ge=0, description="Stock quantity")
     specs: Optional[Dict[str, Any]] = Field(None, description="Product specifications")
     metadata: Optional[Dict[str, Any]] = Field(None, description="Additional product metadata")
+    external_id: Optional[str] = Field(None, min_length=1, description="Client-side product id; when set the product is upserted")
+
+
+class ProductSyncItem(ProductIngest):
+    """Schema for a product in a catalog sync"""
+    external_id: str = Field(..., min_length=1, description="Client-side product id used as the upsert key")
+
+
+class CatalogSyncRequest(BaseModel):
+    """Schema for catalog sync requests"""
+    products: List[ProductSyncItem] = Field(..., description="Products to upsert")
+    full_snapshot: bool = Field(False, description="Soft-delete synced products missing from this payload")
+
+
+class CatalogSyncResponse(BaseModel):
+    """Schema for catalog sync responses"""
+    created: int
+    updated: int
+    unchanged: int
+    embedded: int
+    deleted: int
+    product_ids: Dict[str, str]
+
+
+class ProductUpdate(BaseModel):
+    """Schema for non-semantic product updates (no re-embedding)"""
+    price: Optional[float] = Field(None, gt=0, description="Product price")
+    stock_quantity: Optional[int] = Field(None, ge=0, description="Stock quantity")
+    specs: Optional[Dict[str, Any]] = Field(None, description="Product specifications, replaces the stored ones")
+
+
+class ProductBulkUpdateItem(ProductUpdate):
+    """Schema for one entry of a bulk product update"""
+    product_id: str = Field(..., min_length=1, description="Product id")
+
+
+class ProductBulkUpdateRequest(BaseModel):
+    """Schema for bulk product update requests"""
+    updates: List[ProductBulkUpdateItem] = Field(..., description="Product updates")
+
+
+class ProductUpdateResponse(BaseModel):
+    """Schema for product update responses"""
+    updated: int
+    not_found: List[str]
 
 
 class ChatMessage(BaseModel):
@@ -24,6 +69,15 @@ class QueryRequest(BaseModel):
     """Schema for query requests"""
     query: str = Field(..., min_length=1, description="User query")
     conversation_history: Optional[List[ChatMessage]] = Field(None, description="Previous conversation messages")
+    include_history: bool = Field(True, description="Echo the updated conversation history in the response")
+    max_sources: Optional[int] = Field(None, ge=0, description="Return at most this many sources")
+
+
+class QueryBatchRequest(BaseModel):
+    """Schema for batch query requests"""
+    queries: List[QueryRequest] = Field(..., min_length=1, max_length=1000)
+    search_concurrency: Optional[int] = Field(None, ge=1, le=64, description="Hybrid searches running at once")
+    agent_concurrency: Optional[int] = Field(None, ge=1, le=32, description="RAG graph runs (LLM calls) at once")
 
 
 class DocumentReference(BaseModel):
@@ -41,18 +95,77 @@ class QueryResponse(BaseModel):
     sources: List[DocumentReference]
     confidence_score: float
     processing_time_ms: int
-    conversation_history: List[ChatMessage]
+    conversation_history: Optional[List[ChatMessage]] = None
+
+
+class Suggestion(BaseModel):
+    """Schema for one typeahead suggestion"""
+    text: str
+    type: str = Field(..., description="product or category")
+    source: str = Field(..., description="prefix (in-memory index) or fuzzy (pg_trgm)")
 
 
-class IngestResponse(BaseModel):
-    """Schema for ingestion responses"""
+class SuggestResponse(BaseModel):
+    """Schema for typeahead responses"""
+    query: str
+    suggestions: List[Suggestion]
+
+
+class SearchScores(BaseModel):
+    """Score breakdown of a search hit"""
+    similarity: float = Field(..., description="Cosine similarity of the embeddings")
+    text_rank: float = Field(..., description="PostgreSQL ts_rank of the full-text match")
+    fuzzy: float = Field(0.0, description="pg_trgm word similarity, when the typo-tolerant leg found the product")
+    combined: float = Field(..., description="Weighted and boosted score used for ordering")
+
+
+class SearchHit(BaseModel):
+    """Schema for one product in search results"""
     product_id: str
-    message: str
+    name: str
+    category: Optional[str] = None
+    price: Optional[float] = None
+    stock_quantity: Optional[int] = None
+    description: Optional[str] = None
+    specs: Optional[Any] = None
+    scores: SearchScores
+
+
+class SearchResponse(BaseModel):
+    """Schema for product search responses"""
+    query: str
+    results: List[SearchHit]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page")
+
+
+class IngestJobResponse(BaseModel):
+    """Schema for accepted ingestion jobs"""
+    job_id: str
     status: str
+    status_url: str
+
+
+class IngestJobStatus(BaseModel):
+    """Schema for ingestion job progress"""
+    job_id: str
+    status: str = Field(..., description="queued, running, completed or failed")
+    total: int
+    processed: int
+    failed: int
+    product_ids: List[str]
+    errors: List[str]
+    created_at: float
+    finished_at: Optional[float] = None
 
 
 class HealthResponse(BaseModel):
     """Schema for health check responses"""
     status: str
     timestamp: datetime
-    version: str 
\ No newline at end of file
+    version: str
+
+
+class ReadinessResponse(BaseModel):
+    """Schema for readiness probe responses"""
+    ready: bool
+    checks: Dict[str, str]
@@ -1,5 +1,7 @@
 import os
-from typing import Optional
+import uuid
+from typing import List, Optional
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
@@ -16,14 +18,176 @@ class Settings(BaseSettings):
     azure_openai_embedding_deployment: str = "text-embedding-ada-002"
     azure_openai_deployment_name: str = "gpt-4o-mini-ragia"
     
+    # Chat model tiers; an empty deployment falls back to AZURE_OPENAI_DEPLOYMENT_NAME.
+    # Query rewrites and simple answers go to "fast", comparisons and large contexts to "strong".
+    # The answer budget matches the strong tier so routing alone never shortens answers
+    chat_fast_deployment: str = ""
+    chat_fast_max_tokens: int = 600
+    chat_strong_deployment: str = ""
+    chat_strong_max_tokens: int = 600
+    model_routing_complex_query_words: int = 25
+    model_routing_many_products: int = 4
+    model_routing_long_history: int = 6
+    model_routing_max_latency_ms: float = 8000.0
+    model_routing_throttle_seconds: float = 10.0
+    # A tier spilled over for slowness gets one probe call per interval
+    model_routing_slow_probe_seconds: float = 30.0
+    
+    embedding_batch_size: int = 16
+    
+    # Embedding provider: "azure", "local" (ONNX sentence-transformer on CPU) or "hashing"
+    # (deterministic, for tests/benchmarks). Changing it requires re-embedding the catalog.
+    embedding_provider: str = "azure"
+    local_embedding_model_path: str = ""
+    local_embedding_batch_size: int = 32
+    local_embedding_threads: int = 2
+    local_embedding_max_length: int = 256
+    # Concurrent query embeddings arriving within this window share one forward pass (0 disables)
+    local_embedding_batch_wait_ms: float = 2.0
+    
     top_k: int = 20
     rerank_top_k: int = 10
     
+    # Adaptive prompt context: keep products until the combined score drops off
+    context_min_docs: int = 1
+    context_max_docs: int = 5
+    context_relative_threshold: float = 0.6
+    context_score_gap: float = 0.35
+    
+    # Embedding storage: "float" (full precision), "halfvec" or "binary" (quantized ANN index + exact re-rank)
+    embedding_storage: str = "float"
+    # Must match the products.embedding column and the casts in migrations/001_quantized_embedding_indexes.sql
+    embedding_dimensions: int = 1536
+    quantized_candidates: int = 100
+    # Rows an HNSW scan may return, set on every pooled connection (raised to quantized_candidates);
+    # searches needing more raise it per query with SET LOCAL
+    hnsw_ef_search: int = 100
+    
+    # Request deadline for POST /query (0 disables it): nodes get the remaining budget as timeout
+    # and, below deadline_low_budget_seconds, skip the rewrite and shorten the answer
+    query_deadline_seconds: float = 25.0
+    query_deadline_grace_seconds: float = 2.0
+    deadline_low_budget_seconds: float = 8.0
+    deadline_low_budget_max_docs: int = 2
+    deadline_low_budget_max_tokens: int = 250
+    db_command_timeout_seconds: float = 10.0
+    
+    # Admission control per worker (max in-flight 0 disables it): excess requests wait up to
+    # admission_queue_timeout_seconds in a bounded queue, then get 503 + Retry-After.
+    # The /query limit shrinks while its average latency is above the target.
+    admission_query_max_in_flight: int = 32
+    admission_query_min_in_flight: int = 4
+    admission_query_max_queue: int = 64
+    admission_query_target_latency_ms: float = 15000.0
+    admission_ingest_max_in_flight: int = 16
+    admission_ingest_max_queue: int = 32
+    # POST /query/batch holds one slot of its own limiter for the whole stream
+    admission_batch_max_in_flight: int = 2
+    admission_batch_max_queue: int = 4
+    admission_queue_timeout_seconds: float = 2.0
+    
+    # Circuit breaker per Azure OpenAI deployment: opens when failure_ratio of the last `window`
+    # calls failed or were slower than slow_call_ms, then probes again after open_seconds
+    circuit_breaker_failure_ratio: float = 0.5
+    circuit_breaker_min_calls: int = 10
+    circuit_breaker_window: int = 20
+    circuit_breaker_slow_call_ms: float = 20000.0
+    circuit_breaker_open_seconds: float = 30.0
+    
+    # Hedged query embeddings: a backup request after the recent latency percentile
+    embedding_hedging_enabled: bool = False
+    embedding_hedge_percentile: float = 0.95
+    embedding_hedge_min_delay_ms: float = 100.0
+    
+    # Query embedding cache (0 disables it); embeddings of a text never change
+    embedding_cache_size: int = 4096
+    embedding_cache_ttl_seconds: float = 3600.0
+    
+    # GET /search reads up to this many ranked hits and pages through them with keyset cursors
+    search_max_results: int = 100
+    
+    # GET /suggest: in-memory prefix index, pg_trgm fallback for prefixes of at least this length
+    suggest_fuzzy_min_chars: int = 3
+    suggest_cache_size: int = 4096
+    suggest_cache_ttl_seconds: float = 60.0
+    # Catalog writes within this window are coalesced into one index rebuild
+    suggest_refresh_delay_seconds: float = 2.0
+    
+    # Synonym/boost dictionary (empty = app/data/search_synonyms.json), re-read when the file changes
+    search_synonyms_path: str = ""
+    search_synonyms_reload_seconds: float = 5.0
+    
+    # pg_trgm lexical leg for misspellings, fused into hybrid search when full-text search finds fewer hits than this
+    fuzzy_search_enabled: bool = True
+    fuzzy_search_min_text_hits: int = 3
+    fuzzy_search_weight: float = 0.2
+    
+    # Hybrid search result cache (0 disables it)
+    search_cache_size: int = 2048
+    search_cache_ttl_seconds: float = 300.0
+    
+    # Cross-worker cache invalidation through Postgres LISTEN/NOTIFY
+    catalog_change_feed_enabled: bool = True
+    worker_id: str = Field(default_factory=lambda: uuid.uuid4().hex[:12])
+    
+    # Comma-separated postgresql:// DSNs of read replicas used by the search methods
+    read_replica_urls: str = ""
+    replica_max_lag_seconds: float = 10.0
+    replica_health_check_interval: float = 15.0
+    
+    # Background ingestion: "memory" (in-process asyncio queue) or "postgres" (durable, SKIP LOCKED)
+    ingest_queue_backend: str = "memory"
+    ingest_workers: int = 4
+    ingest_queue_size: int = 1000
+    ingest_max_retries: int = 3
+    ingest_retry_backoff_seconds: float = 2.0
+    ingest_poll_interval_seconds: float = 1.0
+    ingest_job_retention: int = 1000
+    
+    # asyncpg pools for search reads; hot queries are prepared once per pooled connection
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    # Capture EXPLAIN (ANALYZE, BUFFERS) for search statements slower than this, in the background (0 disables)
+    sql_explain_threshold_ms: float = 0.0
+    
+    # Logging: "json" or "text"; sampling keeps a fraction of sub-WARNING records per logger,
+    # e.g. "app.graph.nodes=0.1,app.services.llm_service=0.1"
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_sampling: str = ""
+    sql_echo: bool = False
+    
+    # Answer price/stock/spec questions about a single named product from templates, without the LLM
+    lookup_fast_path_enabled: bool = True
+    
+    # POST /query/batch defaults
+    batch_search_concurrency: int = 8
+    batch_agent_concurrency: int = 4
+    
+    # gzip/brotli-compress JSON responses at least this large (0 disables compression)
+    response_compression_min_bytes: int = 1024
+    
+    # Event-loop lag monitor; in debug mode a watchdog thread logs the stack of code blocking the loop
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_ms: float = 100.0
+    loop_monitor_block_threshold_ms: float = 100.0
+    loop_monitor_debug: bool = False
+    
+    # Startup warm-up; /ready returns 503 until it completes
+    warmup_timeout_seconds: float = 30.0
+    warmup_retry_interval_seconds: float = 10.0
+    warmup_azure_probe: bool = False
+    
     @property
     def database_url(self) -> str:
         """Get async database URL with SSL"""
         return f"postgresql+asyncpg://{self.azure_postgres_user}:{self.azure_postgres_password}@{self.azure_postgres_host}:{self.azure_postgres_port}/{self.azure_postgres_db}?sslmode=require"
     
+    @property
+    def read_replica_dsns(self) -> List[str]:
+        """Read replica DSNs parsed from READ_REPLICA_URLS"""
+        return [url.strip() for url in self.read_replica_urls.split(",") if url.strip()]
+    
     @property
     def sync_database_url(self) -> str:
         """Get sync database URL with SSL"""
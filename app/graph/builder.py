@@ -1,14 +1,15 @@
 import time
-from langgraph.graph import StateGraph, END
 from app.graph.state import AgentState
 from app.graph.nodes import (
     plan_query,
     execute_retrieval,
+    answer_lookup,
     generate_answer,
     evaluate_answer,
     finalize_response,
     handle_error,
     should_retry,
+    route_after_lookup,
     check_response_quality
 )
 import logging
@@ -18,10 +19,14 @@ logger = logging.getLogger(__name__)
 
 def create_rag_graph():
     """Create and configure LangGraph for the RAG flow"""
+    # langgraph is slow to import; load it when the graph is built (warm-up), not at app import
+    from langgraph.graph import StateGraph, END
+    
     workflow = StateGraph(AgentState)
     
     workflow.add_node("plan_query", plan_query)
     workflow.add_node("execute_retrieval", execute_retrieval)
+    workflow.add_node("answer_lookup", answer_lookup)
     workflow.add_node("generate_answer", generate_answer)
     workflow.add_node("evaluate_answer", evaluate_answer)
     workflow.add_node("finalize_response", finalize_response)
@@ -30,7 +35,15 @@ def create_rag_graph():
     workflow.set_entry_point("plan_query")
     
     workflow.add_edge("plan_query", "execute_retrieval")
-    workflow.add_edge("execute_retrieval", "generate_answer")
+    workflow.add_edge("execute_retrieval", "answer_lookup")
+    workflow.add_conditional_edges(
+        "answer_lookup",
+        route_after_lookup,
+        {
+            "finalize": "finalize_response",
+            "generate": "generate_answer"
+        }
+    )
     
     workflow.add_edge("generate_answer", "evaluate_answer")
     
@@ -60,4 +73,17 @@ def create_rag_graph():
     return app
 
 
-rag_agent = create_rag_graph() 
\ No newline at end of file
+def get_rag_agent():
+    """Compiled RAG graph, built on first use"""
+    agent = globals().get("rag_agent")
+    if agent is None:
+        agent = create_rag_graph()
+        globals()["rag_agent"] = agent
+    return agent
+
+
+def __getattr__(name):
+    # Keeps `from app.graph.builder import rag_agent` working while compiling lazily
+    if name == "rag_agent":
+        return get_rag_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
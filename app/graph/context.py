@@ -0,0 +1,35 @@
+from typing import List
+from app.core.config import settings
+from app.services.database import ProductHit
+
+
+def hit_score(hit: ProductHit) -> float:
+    return hit.combined_score or hit.similarity_score or hit.rank_score
+
+
+def select_context_docs(docs: List[ProductHit]) -> List[ProductHit]:
+    """Products worth putting in the prompt: cut where the score falls off.
+
+    Keeps at least ``context_min_docs`` and at most ``context_max_docs`` hits,
+    drops hits scoring below ``context_relative_threshold`` of the best one
+    and stops at the first drop larger than ``context_score_gap`` (relative
+    to the previous hit), so a clear single-product match sends one product.
+    """
+    candidates = docs[:settings.context_max_docs]
+    if not candidates:
+        return candidates
+
+    top_score = hit_score(candidates[0])
+    if top_score <= 0:
+        return candidates
+
+    selected = [candidates[0]]
+    for previous, hit in zip(candidates, candidates[1:]):
+        score = hit_score(hit)
+        if len(selected) >= settings.context_min_docs:
+            if score < top_score * settings.context_relative_threshold:
+                break
+            if hit_score(previous) > 0 and (hit_score(previous) - score) / hit_score(previous) > settings.context_score_gap:
+                break
+        selected.append(hit)
+    return selected
@@ -0,0 +1,57 @@
+"""Request deadlines carried in ``AgentState["deadline"]``.
+
+The deadline is an absolute ``time.monotonic()`` value set by the router.
+Nodes pass the remaining budget as the timeout of every Azure and database
+call and switch to cheaper paths once it runs low.
+"""
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar
+from app.core.config import settings
+from app.graph.state import AgentState
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request ran out of budget before a step could run or finish"""
+
+
+def deadline_in(seconds: Optional[float]) -> Optional[float]:
+    return time.monotonic() + seconds if seconds else None
+
+
+def remaining(state: AgentState) -> Optional[float]:
+    """Seconds left for this request, or None when it has no deadline"""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def budget_low(state: AgentState) -> bool:
+    left = remaining(state)
+    return left is not None and left < settings.deadline_low_budget_seconds
+
+
+def step_timeout(state: AgentState) -> Optional[float]:
+    """Timeout for the next call; raises if nothing is left"""
+    left = remaining(state)
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return left
+
+
+async def within_deadline(state: AgentState, awaitable: Awaitable[T]) -> T:
+    """Await with the remaining budget as timeout (asyncpg cancels the query server-side)"""
+    try:
+        timeout = step_timeout(state)
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise
+    
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded("request deadline exceeded") from e
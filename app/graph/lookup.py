@@ -0,0 +1,132 @@
+"""Template answers for price, stock and spec questions about a single product.
+
+These questions are answered straight from the retrieved row when the query
+names exactly one of the retrieved products, without calling the LLM.
+"""
+import json
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.services.database import ProductHit
+
+INTENT_PATTERNS = {
+    "price": re.compile(r"\b(cuanto (cuesta|vale|sale)|precio|cuesta|vale|costo|coste|price|how much)\b"),
+    "stock": re.compile(r"\b(stock|disponibles?|disponibilidad|quedan|existencias|inventario|in stock|available)\b"),
+    "specs": re.compile(r"\b(especificaciones|specs?|caracteristicas|ficha tecnica)\b"),
+}
+
+# Words that say what is being asked rather than which product it is about
+QUESTION_WORDS = {
+    "cuanto", "cuanta", "cuantos", "cuantas", "cuesta", "vale", "sale", "precio", "costo", "coste",
+    "stock", "disponible", "disponibles", "disponibilidad", "quedan", "existencias", "inventario",
+    "especificaciones", "spec", "specs", "caracteristicas", "ficha", "tecnica",
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "al", "en", "y", "o", "con", "para",
+    "que", "cual", "cuales", "hay", "tiene", "tienen", "tienes", "es", "son", "me", "mi", "su", "sus",
+    "por", "favor", "hola", "quiero", "saber", "dime", "puedes", "how", "much", "is", "the", "price", "of",
+    "in", "available", "does", "have", "what", "are",
+}
+
+# A product counts as named when the query covers this share of its name (or at least two name tokens)
+MIN_NAME_COVERAGE = 0.5
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents so "¿Cuánto?" and "cuanto" compare equal"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def tokens(text: str) -> List[str]:
+    return [token for token in re.findall(r"\w+", normalize(text)) if len(token) > 1 or token.isdigit()]
+
+
+def detect_intents(query: str) -> List[str]:
+    normalized = normalize(query)
+    return [intent for intent, pattern in INTENT_PATTERNS.items() if pattern.search(normalized)]
+
+
+def product_specs(product: ProductHit) -> Dict[str, Any]:
+    # asyncpg returns json columns as text unless a codec is registered
+    specs = product.specs
+    if isinstance(specs, str):
+        try:
+            specs = json.loads(specs)
+        except ValueError:
+            return {}
+    return specs if isinstance(specs, dict) else {}
+
+
+def spec_key_tokens(specs: Dict[str, Any]) -> Set[str]:
+    return {token for key in specs for token in tokens(str(key))}
+
+
+def spec_keys_in_query(query: str, specs: Dict[str, Any]) -> List[str]:
+    query_tokens = set(tokens(query))
+    return [key for key in specs if set(tokens(str(key))) & query_tokens]
+
+
+def match_product(query: str, docs: List[ProductHit]) -> Optional[ProductHit]:
+    """The single retrieved product the query names, or None when no product or several match"""
+    query_tokens = {token for token in tokens(query) if token not in QUESTION_WORDS}
+
+    candidates: List[Tuple[bool, int, float, ProductHit]] = []
+    for doc in docs:
+        name_tokens = set(tokens(doc.name))
+        # "¿qué procesador tiene el MacBook Air?" asks for a spec key, it doesn't name another product
+        product_tokens = query_tokens - spec_key_tokens(product_specs(doc))
+        if not name_tokens or not product_tokens:
+            continue
+        # Every word that isn't about the question must belong to the product name
+        if product_tokens <= name_tokens:
+            candidates.append((name_tokens == product_tokens, len(product_tokens), len(product_tokens) / len(name_tokens), doc))
+
+    exact = [doc for is_exact, _, _, doc in candidates if is_exact]
+    if len(exact) == 1:
+        return exact[0]
+    # "iPhone" names both "iPhone 15" and "iPhone 15 Pro"; an ambiguous question goes to the LLM
+    if len(candidates) == 1:
+        _, matched, coverage, doc = candidates[0]
+        if coverage >= MIN_NAME_COVERAGE or matched >= 2:
+            return doc
+    return None
+
+
+def format_price(price: float) -> str:
+    return f"${price:,.2f}"
+
+
+def lookup_answer(query: str, docs: List[ProductHit]) -> Optional[Tuple[str, List[str]]]:
+    """Answer and intents for a structured lookup question, or None if it needs the LLM"""
+    product = match_product(query, docs)
+    if product is None:
+        return None
+
+    intents = detect_intents(query)
+    specs = product_specs(product)
+    asked_keys = spec_keys_in_query(query, specs)
+    if asked_keys and "specs" not in intents:
+        intents.append("specs")
+    if not intents:
+        return None
+
+    parts = []
+    for intent in intents:
+        if intent == "price":
+            if product.price is None:
+                return None
+            parts.append(f"El {product.name} cuesta {format_price(product.price)}.")
+        elif intent == "stock":
+            if product.stock_quantity is None:
+                return None
+            if product.stock_quantity > 0:
+                parts.append(f"Sí, tenemos {product.stock_quantity} unidades de {product.name} en stock.")
+            else:
+                parts.append(f"Por ahora no tenemos stock de {product.name}.")
+        elif intent == "specs":
+            if not specs:
+                return None
+            keys = asked_keys or list(specs)
+            lines = "\n".join(f"- {key}: {specs[key]}" for key in keys)
+            parts.append(f"Especificaciones de {product.name}:\n{lines}")
+
+    return "\n\n".join(parts), intents
@@ -6,20 +6,42 @@ from app.graph.state import AgentState
 from app.services.llm_service import llm_service
 from app.services.database import db_service
 from app.core.config import settings
+from app.graph.context import select_context_docs
+from app.graph.lookup import lookup_answer
+from app.services.circuit_breaker import CircuitOpenError
+from app.graph.deadline import budget_low, remaining, step_timeout, within_deadline
 
 logger = logging.getLogger(__name__)
 
+DEADLINE_FALLBACK_INTRO = "No alcancé a preparar una respuesta completa a tiempo."
+DEGRADED_FALLBACK_INTRO = "Nuestro asistente no está disponible en este momento."
+
+
+def fallback_answer(docs, intro: str) -> str:
+    """Answer listing the retrieved products, for requests that can't use the LLM"""
+    lines = []
+    for doc in docs:
+        price = f" - ${doc.price:,.2f}" if doc.price is not None else ""
+        lines.append(f"- {doc.name}{price}")
+    return f"{intro} Estos productos coinciden con tu consulta:\n" + "\n".join(lines)
+
 
 async def plan_query(state: AgentState) -> AgentState:
     """Query Planning node - decompose complex user query into simpler sub-queries"""
-    logger.info("Starting query planning")
+    logger.debug("Starting query planning")
     
     try:
         query = state["original_query"]
         conversation_history = state.get("conversation_history", [])
         
-        if conversation_history:
-            context_aware_query = await llm_service.contextualize_query(query, conversation_history)
+        if conversation_history and budget_low(state):
+            # Not worth a rewrite call when the answer itself may not fit in the budget
+            sub_queries = await llm_service.plan_query(query)
+            state["processing_steps"].append("contextualization_skipped")
+        elif conversation_history:
+            context_aware_query = await llm_service.contextualize_query(
+                query, conversation_history, timeout=step_timeout(state)
+            )
             sub_queries = await llm_service.plan_query(context_aware_query)
         else:
             sub_queries = await llm_service.plan_query(query)
@@ -27,7 +49,7 @@ async def plan_query(state: AgentState) -> AgentState:
         state["query_plan"] = sub_queries
         state["processing_steps"].append("query_planning_completed")
         
-        logger.info(f"Query plan generated: {len(sub_queries)} sub-queries")
+        logger.info("Query plan generated: %d sub-queries", len(sub_queries))
         
     except Exception as e:
         error_msg = f"Error in query planning: {str(e)}"
@@ -40,25 +62,35 @@ async def plan_query(state: AgentState) -> AgentState:
 
 async def execute_retrieval(state: AgentState) -> AgentState:
     """Hybrid Search & Retrieval node - execute hybrid search"""
-    logger.info("Starting search and retrieval")
+    logger.debug("Starting search and retrieval")
     
     try:
         original_query = state["original_query"]
         
-        # Generate embedding for the query
-        query_embedding = await llm_service.generate_embedding(original_query)
-        
-        # Perform hybrid search
-        retrieved_docs = await db_service.hybrid_search(
-            query_embedding=query_embedding,
-            query_text=original_query,
-            top_k=settings.rerank_top_k
-        )
+        retrieved_docs = state.get("prefetched_docs")
+        if retrieved_docs is None:
+            try:
+                # Generate embedding for the query
+                query_embedding = await llm_service.embed_query(original_query, timeout=step_timeout(state))
+            except CircuitOpenError as e:
+                # Azure embeddings are failing: lexical search alone beats waiting on them
+                logger.warning("Embedding circuit open, using text search only: %s", e)
+                state["processing_steps"].append("text_only_retrieval")
+                retrieved_docs = await within_deadline(
+                    state, db_service.text_search(original_query, top_k=settings.rerank_top_k)
+                )
+            else:
+                # Perform hybrid search
+                retrieved_docs = await within_deadline(state, db_service.hybrid_search(
+                    query_embedding=query_embedding,
+                    query_text=original_query,
+                    top_k=settings.rerank_top_k
+                ))
         
         state["retrieved_docs"] = retrieved_docs
         state["processing_steps"].append("retrieval_completed")
         
-        logger.info(f"Retrieved {len(retrieved_docs)} documents")
+        logger.info("Retrieved %d documents", len(retrieved_docs))
         
     except Exception as e:
         error_msg = f"Error in retrieval: {str(e)}"
@@ -69,28 +101,64 @@ async def execute_retrieval(state: AgentState) -> AgentState:
     return state
 
 
+async def answer_lookup(state: AgentState) -> AgentState:
+    """Lookup fast path - answer price/stock/spec questions about one product without the LLM"""
+    if not settings.lookup_fast_path_enabled or not state.get("retrieved_docs"):
+        return state
+    
+    try:
+        answer = lookup_answer(state["original_query"], state["retrieved_docs"])
+        if answer is not None:
+            state["generated_answer"], state["lookup_intents"] = answer
+            state["confidence_score"] = 0.95
+            state["processing_steps"].append("lookup_answer_completed")
+            logger.info("Answered from lookup template: %s", ",".join(state["lookup_intents"]))
+    
+    except Exception as e:
+        # Fall through to the LLM
+        logger.error("Error in lookup fast path: %s", e)
+    
+    return state
+
+
 async def generate_answer(state: AgentState) -> AgentState:
     """Response Generation node - synthesize coherent answer based on retrieved documents"""
-    logger.info("Starting answer generation")
+    logger.debug("Starting answer generation")
     
     try:
         original_query = state["original_query"]
-        context_docs = state["retrieved_docs"]
+        context_docs = select_context_docs(state["retrieved_docs"])
         conversation_history = state.get("conversation_history", [])
         
         if not context_docs:
             generated_answer = "Sorry, I couldn't find relevant information to answer your query. Please try rephrasing your question or be more specific."
+        elif remaining(state) == 0:
+            generated_answer = fallback_answer(context_docs, DEADLINE_FALLBACK_INTRO)
+            state["processing_steps"].append("deadline_fallback")
         else:
-            generated_answer = await llm_service.generate_answer_with_memory(
-                query=original_query,
-                context_docs=context_docs,
-                conversation_history=conversation_history
-            )
+            max_tokens = None
+            if budget_low(state):
+                # A shorter prompt and completion to finish inside the budget
+                context_docs = context_docs[:settings.deadline_low_budget_max_docs]
+                max_tokens = settings.deadline_low_budget_max_tokens
+                state["processing_steps"].append("low_budget_generation")
+            try:
+                generated_answer = await llm_service.generate_answer_with_memory(
+                    query=original_query,
+                    context_docs=context_docs,
+                    conversation_history=conversation_history,
+                    timeout=step_timeout(state),
+                    max_tokens=max_tokens
+                )
+            except CircuitOpenError as e:
+                logger.warning("Chat circuit open, answering from retrieved products: %s", e)
+                generated_answer = fallback_answer(context_docs, DEGRADED_FALLBACK_INTRO)
+                state["processing_steps"].append("circuit_open_fallback")
         
         state["generated_answer"] = generated_answer
         state["processing_steps"].append("answer_generation_completed")
         
-        logger.info("Answer generated successfully")
+        logger.debug("Answer generated successfully")
         
     except Exception as e:
         error_msg = f"Error generating answer: {str(e)}"
@@ -103,7 +171,7 @@ async def generate_answer(state: AgentState) -> AgentState:
 
 async def evaluate_answer(state: AgentState) -> AgentState:
     """Response Evaluation node - evaluate generated answer"""
-    logger.info("Starting answer evaluation")
+    logger.debug("Starting answer evaluation")
     
     try:
         original_query = state["original_query"]
@@ -121,7 +189,7 @@ async def evaluate_answer(state: AgentState) -> AgentState:
         state["confidence_score"] = evaluation.get("confidence_score", 0.5)
         state["processing_steps"].append("evaluation_completed")
         
-        logger.info(f"Evaluation completed: confidence={state['confidence_score']}")
+        logger.info("Evaluation completed: confidence=%s", state["confidence_score"])
         
     except Exception as e:
         error_msg = f"Error in evaluation: {str(e)}"
@@ -136,7 +204,7 @@ async def evaluate_answer(state: AgentState) -> AgentState:
 
 async def finalize_response(state: AgentState) -> AgentState:
     """Finalization node - prepare final response and complete processing"""
-    logger.info("Finalizing response")
+    logger.debug("Finalizing response")
     
     try:
         state["final_answer"] = state["generated_answer"]
@@ -148,7 +216,7 @@ async def finalize_response(state: AgentState) -> AgentState:
         state["end_time"] = time.time()
         state["processing_steps"].append("response_finalized")
         
-        logger.info("Response finalized successfully")
+        logger.debug("Response finalized successfully")
         
     except Exception as e:
         error_msg = f"Error finalizing response: {str(e)}"
@@ -162,13 +230,13 @@ async def finalize_response(state: AgentState) -> AgentState:
 
 async def handle_error(state: AgentState) -> AgentState:
     """Error handling node - handle errors and decide whether to retry or fail"""
-    logger.info("Handling process errors")
+    logger.debug("Handling process errors")
     
     current_retry = state.get("current_retry", 0)
     max_retries = state.get("max_retries", 1)
     
     if current_retry < max_retries:
-        logger.info(f"Retrying process (attempt {current_retry + 1}/{max_retries})")
+        logger.info("Retrying process (attempt %d/%d)", current_retry + 1, max_retries)
         state["current_retry"] = current_retry + 1
         state["processing_steps"].append(f"retry_attempt_{current_retry + 1}")
         return state
@@ -185,17 +253,22 @@ def should_retry(state: AgentState) -> str:
     if state.get("error_messages"):
         last_error = state["error_messages"][-1]
         if "timeout" in last_error.lower() or "connection" in last_error.lower():
-            if state.get("current_retry", 0) < state.get("max_retries", 1):
+            if state.get("current_retry", 0) < state.get("max_retries", 1) and not budget_low(state):
                 return "retry"
     
     return "continue"
 
 
+def route_after_lookup(state: AgentState) -> str:
+    """Decision function - skip generation and evaluation when a template answered"""
+    return "finalize" if state.get("lookup_intents") else "generate"
+
+
 def check_response_quality(state: AgentState) -> str:
     """Decision function - verify response quality"""
     confidence = state.get("confidence_score", 0)
     
-    if confidence < 0.2:
+    if confidence < 0.2 and not budget_low(state):
         if state.get("current_retry", 0) < state.get("max_retries", 1):
             return "regenerate"
     
@@ -1,6 +1,6 @@
 from typing import List, Dict, Any, Optional
 from typing_extensions import TypedDict
-from langchain_core.messages import BaseMessage
+from app.services.database import ProductHit
 
 
 class AgentState(TypedDict):
@@ -11,8 +11,12 @@ class AgentState(TypedDict):
     
     query_plan: List[str]
     
-    retrieved_docs: List[Dict[str, Any]]
+    retrieved_docs: List[ProductHit]
+    # Set by batch runs that searched ahead of the graph; retrieval uses them instead of searching
+    prefetched_docs: Optional[List[ProductHit]]
     
+    # Set when the answer came from a template (price/stock/specs) instead of the LLM
+    lookup_intents: Optional[List[str]]
     generated_answer: str
     final_answer: str
     
@@ -23,6 +27,8 @@ class AgentState(TypedDict):
     error_messages: List[str]
     start_time: float
     end_time: Optional[float]
+    # time.monotonic() by which the answer must be ready; None means no limit
+    deadline: Optional[float]
     
     max_retries: int
     current_retry: int 
\ No newline at end of file
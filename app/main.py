@@ -2,18 +2,18 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import logging
-import sys
+import uuid
 from contextlib import asynccontextmanager
 from app.api.router import router
 from app.core.config import settings
+from app.core.logging_config import request_id_var, setup_logging
+from app.services.change_feed import change_feed
+from app.services.database import db_service
+from app.services.ingest_queue import ingest_queue
+from app.services.loop_monitor import loop_monitor
+from app.services.warmup import warmup_service
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-    ]
-)
+setup_logging(settings.log_level, settings.log_format, settings.log_sampling)
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +24,13 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting RAG LangGraph application...")
     
     try:
+        if settings.loop_monitor_enabled:
+            loop_monitor.start()
+        if settings.catalog_change_feed_enabled:
+            change_feed.start()
+        db_service.replicas.start()
+        ingest_queue.start()
+        await warmup_service.start()
         logger.info("✅ Application started successfully")
         yield
     except Exception as e:
@@ -31,6 +38,12 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         logger.info("🔥 Closing application...")
+        await warmup_service.stop()
+        await change_feed.stop()
+        await ingest_queue.stop()
+        await db_service.replicas.stop()
+        await db_service.close()
+        await loop_monitor.stop()
 
 
 app = FastAPI(
@@ -51,6 +64,19 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Correlate every log line of a request through X-Request-ID"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
@@ -74,9 +100,13 @@ async def root():
         "docs": "/docs",
         "health": "/health",
         "endpoints": {
-            "ingest": "POST /ingest - Ingest new product",
+            "ingest": "POST /ingest - Queue a new product for ingestion",
+            "ingest_job": "GET /ingest/jobs/{job_id} - Ingestion job progress",
             "query": "POST /query - Query products",
-            "health": "GET /health - Check service status"
+            "health": "GET /health - Check service status",
+            "search": "GET /search - Product search without the LLM",
+            "suggest": "GET /suggest - Typeahead suggestions",
+            "ready": "GET /ready - Check the worker is warmed up and can reach the database"
         }
     }
 
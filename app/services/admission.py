@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA = 0.1
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is at capacity, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Per-worker concurrency limit with a bounded FIFO wait queue.
+
+    Up to ``limit`` requests run at once; up to ``max_queue`` more wait at
+    most ``queue_timeout`` seconds for a slot and the rest are rejected
+    immediately. The limit adapts every ``window`` completions: it shrinks
+    multiplicatively while the average latency is above ``target_latency_ms``
+    and grows by one while requests are queueing and latency is healthy.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        min_in_flight: int = 1,
+        max_queue: int = 0,
+        queue_timeout: float = 1.0,
+        target_latency_ms: float = 0.0,
+        window: int = 20
+    ):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min(min_in_flight, max_in_flight)
+        self.limit = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.target_latency_ms = target_latency_ms
+        self.window = window
+        self.in_flight = 0
+        self.latency_ewma_ms: Optional[float] = None
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._window_count = 0
+        self._window_queued = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: one average request per queued wave"""
+        latency_s = (self.latency_ewma_ms or 1000.0) / 1000
+        waves = (self.queued + 1) / max(self.limit, 1)
+        return max(1, math.ceil(latency_s * waves))
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._window_queued = True
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._waiters.remove(waiter)
+            self.timed_out += 1
+            self.rejected += 1
+            raise AdmissionRejected(self.name, self.retry_after())
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif not waiter.cancelled():
+                # The client went away right after the slot was handed over: give it back
+                self.release(None)
+            raise
+        self.admitted += 1
+
+    def release(self, latency_ms: Optional[float]) -> None:
+        self.in_flight -= 1
+        if latency_ms is not None:
+            self._record(latency_ms)
+        self._wake()
+
+    def _wake(self) -> None:
+        # Hand freed slots straight to waiters so new arrivals can't jump the queue
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _record(self, latency_ms: float) -> None:
+        if self.latency_ewma_ms is None:
+            self.latency_ewma_ms = latency_ms
+        else:
+            self.latency_ewma_ms += LATENCY_EWMA_ALPHA * (latency_ms - self.latency_ewma_ms)
+
+        self._window_count += 1
+        if self._window_count < self.window or not self.target_latency_ms:
+            return
+
+        previous = self.limit
+        if self.latency_ewma_ms > self.target_latency_ms:
+            self.limit = max(self.min_in_flight, int(self.limit * 0.8))
+        elif self._window_queued:
+            self.limit = min(self.max_in_flight, self.limit + 1)
+        if self.limit != previous:
+            logger.info(f"Admission limit for {self.name}: {previous} -> {self.limit} (latency {self.latency_ewma_ms:.0f}ms)")
+        self._window_count = 0
+        self._window_queued = False
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of the block; raises AdmissionRejected when shed"""
+        if not self.enabled:
+            yield
+            return
+
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release((time.perf_counter() - start) * 1000)
+
+    async def hold(self) -> Callable[[], None]:
+        """Take a slot for work that outlives the endpoint (streaming responses); call the result to give it back"""
+        if not self.enabled:
+            return lambda: None
+
+        await self.acquire()
+        start = time.perf_counter()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.release((time.perf_counter() - start) * 1000)
+        return release
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "latency_ewma_ms": self.latency_ewma_ms,
+        }
+
+
+query_admission = AdmissionController(
+    "query",
+    max_in_flight=settings.admission_query_max_in_flight,
+    min_in_flight=settings.admission_query_min_in_flight,
+    max_queue=settings.admission_query_max_queue,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+    target_latency_ms=settings.admission_query_target_latency_ms
+)
+
+# Each batch runs many graph invocations of its own; a handful at a time per worker
+batch_admission = AdmissionController(
+    "query_batch",
+    max_in_flight=settings.admission_batch_max_in_flight,
+    max_queue=settings.admission_batch_max_queue,
+    queue_timeout=settings.admission_queue_timeout_seconds
+)
+
+ingest_admission = AdmissionController(
+    "ingest",
+    max_in_flight=settings.admission_ingest_max_in_flight,
+    max_queue=settings.admission_ingest_max_queue,
+    queue_timeout=settings.admission_queue_timeout_seconds
+)
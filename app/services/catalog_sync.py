@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from app.services.database import db_service
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+
+def product_embedding_text(name: str, description: Optional[str] = None, category: Optional[str] = None) -> str:
+    """Text that gets embedded for a product"""
+    text_parts = [name]
+    if description:
+        text_parts.append(description)
+    if category:
+        text_parts.append(category)
+    return " ".join(text_parts)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def same_fields(stored: Dict[str, Any], product: Dict[str, Any]) -> bool:
+    """Whether a feed entry has the stored price, stock and specs (as upsert_products would write them)"""
+    specs = stored.get("specs")
+    if isinstance(specs, str):
+        specs = json.loads(specs)
+    return (
+        stored.get("price") == product.get("price")
+        and stored.get("stock_quantity") == (product.get("stock_quantity") or 0)
+        and (specs or {}) == (product.get("specs") or {})
+    )
+
+
+class CatalogSyncService:
+    async def sync_products(self, products: List[Dict[str, Any]], full_snapshot: bool = False) -> Dict[str, Any]:
+        """Upsert products by external id, re-embedding only those whose text changed.
+
+        With ``full_snapshot`` the payload is the whole catalog and synced
+        products missing from it are soft-deleted.
+        """
+        # Last occurrence wins if a feed repeats an external id
+        by_external_id = {product["external_id"]: product for product in products}
+        existing = await db_service.get_synced_products(list(by_external_id))
+
+        rows = []
+        field_rows = []
+        to_embed = []
+        product_ids = {}
+        created = updated = unchanged = 0
+
+        for external_id, product in by_external_id.items():
+            text = product_embedding_text(product["name"], product.get("description"), product.get("category"))
+            row = dict(product, content_hash=content_hash(text), embedding=None)
+
+            stored = existing.get(external_id)
+            if stored is None:
+                row["product_id"] = db_service.new_product_id()
+                created += 1
+            else:
+                row["product_id"] = stored["product_id"]
+                if stored["content_hash"] == row["content_hash"] and not stored["deleted"]:
+                    if same_fields(stored, product):
+                        # Nothing to write: no NOTIFY, caches and the suggest index stay as they are
+                        product_ids[external_id] = stored["product_id"]
+                        unchanged += 1
+                    else:
+                        field_rows.append(row)
+                        updated += 1
+                    continue
+                updated += 1
+
+            if stored is None or stored["content_hash"] != row["content_hash"]:
+                to_embed.append((row, text))
+            rows.append(row)
+
+        if to_embed:
+            embeddings = await llm_service.generate_embeddings([text for _, text in to_embed])
+            for (row, _), embedding in zip(to_embed, embeddings):
+                row["embedding"] = embedding
+
+        if rows:
+            product_ids.update(await db_service.upsert_products(rows))
+        if field_rows:
+            # Same embedded text: only price/stock/specs changed, cached rankings stay valid
+            product_ids.update(await db_service.upsert_products(field_rows, kind="fields"))
+
+        deleted = []
+        if full_snapshot:
+            deleted = await db_service.soft_delete_missing(list(by_external_id))
+
+        logger.info(
+            f"Catalog sync: {created} created, {updated} updated, {unchanged} unchanged, "
+            f"{len(to_embed)} embedded, {len(deleted)} deleted"
+        )
+        return {
+            "created": created,
+            "updated": updated,
+            "unchanged": unchanged,
+            "embedded": len(to_embed),
+            "deleted": len(deleted),
+            "product_ids": product_ids
+        }
+
+
+catalog_sync_service = CatalogSyncService()
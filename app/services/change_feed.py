@@ -0,0 +1,87 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+import asyncpg
+from app.core.config import settings
+from app.services.database import CATALOG_CHANNEL, DatabaseService, db_service
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogChangeFeed:
+    """Keeps a dedicated LISTEN connection and invalidates local caches on remote writes"""
+
+    def __init__(self, db: DatabaseService, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.db = db
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[asyncpg.Connection] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed {channel} payload")
+            return
+        if not isinstance(message, dict):
+            logger.warning(f"Ignoring {channel} payload that is not a JSON object")
+            return
+
+        # Writes from this worker were already applied before the NOTIFY was sent
+        if message.get("origin") == settings.worker_id:
+            return
+
+        if message.get("kind") == "fields":
+            self.db.apply_field_change(message.get("product_ids", []))
+        else:
+            self.db.apply_catalog_change(message.get("product_ids", []))
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+
+        while True:
+            lost = asyncio.Event()
+            try:
+                self._connection = await self.db.get_connection()
+                self._connection.add_termination_listener(lambda _: lost.set())
+                await self._connection.add_listener(CATALOG_CHANNEL, self._on_notification)
+                logger.info(f"Listening for {CATALOG_CHANNEL} notifications")
+
+                # Changes made while we were disconnected were never delivered
+                self.db.apply_catalog_change([])
+                delay = self.reconnect_delay
+
+                await lost.wait()
+                logger.warning("Catalog change feed connection lost, reconnecting")
+            except asyncio.CancelledError:
+                if self._connection is not None and not self._connection.is_closed():
+                    await self._connection.close()
+                raise
+            except Exception as e:
+                logger.error(f"Error in catalog change feed: {e}")
+
+            self._connection = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+
+change_feed = CatalogChangeFeed(db_service)
@@ -0,0 +1,141 @@
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def counts_as_failure(error: BaseException) -> bool:
+    """Server-side trouble (5xx, 429, timeouts, connection errors) trips the breaker; bad requests don't"""
+    status_code = getattr(error, "status_code", None)
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one Azure OpenAI deployment.
+
+    Closed: calls go through and outcomes are kept for the last ``window``
+    calls; errors and calls slower than ``slow_call_ms`` count as failures.
+    Once ``min_calls`` outcomes are known and the failure ratio reaches
+    ``failure_ratio`` the circuit opens and calls fail immediately for
+    ``open_seconds``. Then a single probe call is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = 0.5,
+        min_calls: int = 10,
+        window: int = 20,
+        slow_call_ms: float = 0.0,
+        open_seconds: float = 30.0
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.slow_call_ms = slow_call_ms
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._probe_in_flight = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == OPEN:
+            retry_in = self.opened_at + self.open_seconds - time.monotonic()
+            if retry_in > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, retry_in)
+            self.state = HALF_OPEN
+            logger.info(f"Circuit for {self.name} half-open, probing")
+
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 0)
+            self._probe_in_flight = True
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if a call would be rejected now, without taking the half-open probe"""
+        if not self.allows_calls:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(self.opened_at + self.open_seconds - time.monotonic(), 0))
+
+    @property
+    def allows_calls(self) -> bool:
+        if self.state == OPEN:
+            return time.monotonic() >= self.opened_at + self.open_seconds
+        return not (self.state == HALF_OPEN and self._probe_in_flight)
+
+    def record(self, latency_ms: float, error: Optional[BaseException] = None) -> None:
+        failed = (error is not None and counts_as_failure(error)) or (
+            bool(self.slow_call_ms) and latency_ms > self.slow_call_ms
+        )
+
+        if self.state == OPEN:
+            # Calls started before the circuit opened
+            return
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+            if failed:
+                self._open()
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+                logger.info(f"Circuit for {self.name} closed")
+            return
+
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio:
+            self._open()
+
+    def abandon(self) -> None:
+        """A call was cancelled before its outcome was known; let the next one probe"""
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+        logger.warning(f"Circuit for {self.name} opened for {self.open_seconds:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "recent_failures": sum(self._outcomes),
+            "recent_calls": len(self._outcomes),
+        }
+
+
+def breaker_for(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_ratio=settings.circuit_breaker_failure_ratio,
+        min_calls=settings.circuit_breaker_min_calls,
+        window=settings.circuit_breaker_window,
+        slow_call_ms=settings.circuit_breaker_slow_call_ms,
+        open_seconds=settings.circuit_breaker_open_seconds
+    )
@@ -1,12 +1,25 @@
 import asyncio
+import hashlib
 import json
-from typing import List, Dict, Any, Optional, Tuple
+import re
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from typing import List, Dict, Any, Callable, Optional, Tuple
 import asyncpg
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import Column, Integer, String, Text, Float, DateTime, JSON, text
 from sqlalchemy.sql import func
 from app.core.config import settings
+from app.services.cache import TTLCache
+from app.services.replicas import ReplicaRouter
+from app.services.statements import StatementRegistry
+from app.services.synonyms import SynonymDictionary, search_synonyms
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,20 +38,186 @@ class Product(Base):
     stock_quantity = Column(Integer, nullable=True)
     specs = Column(JSON, nullable=True)
     embedding = Column("embedding", nullable=True)
+    external_id = Column(String, nullable=True, unique=True)
+    content_hash = Column(String, nullable=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# NOTIFY channel carrying the ids of products written by any worker
+CATALOG_CHANNEL = "catalog_changed"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_IDS = 200
+# Products with price/stock/specs changes tracked for refreshing cached results; past this, the cache is dropped
+MAX_TRACKED_FIELD_CHANGES = 10000
+
+# Columns needed to rank and display a hit; description/specs are the heavy ones
+LIGHT_COLUMNS = "product_id, name, category, price, stock_quantity"
+DETAIL_COLUMNS = "description, specs"
+
+# pgvector's upper bound for hnsw.ef_search
+HNSW_MAX_EF_SEARCH = 1000
+
+# Longest query words compared by the trigram leg; fixed so the statement text is fixed too
+FUZZY_MAX_TERMS = 4
+FUZZY_MIN_TERM_LENGTH = 4
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Structured filters applied inside the vector and text queries"""
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: bool = False
+
+    @property
+    def uses_fields(self) -> bool:
+        """Whether matching depends on price/stock, which change without a catalog version bump"""
+        return self.min_price is not None or self.max_price is not None or self.in_stock
+
+    def sql(self, first_param: int) -> Tuple[str, str, List[Any]]:
+        """Statement suffix, AND clauses and their args, with placeholders numbered from ``first_param``"""
+        names, clauses, args = [], [], []
+        for name, value, clause in (
+            ("category", self.category and self.category.lower(), "lower(category) = ${}"),
+            ("min_price", self.min_price, "price >= ${}"),
+            ("max_price", self.max_price, "price <= ${}"),
+        ):
+            if value is not None:
+                args.append(value)
+                names.append(name)
+                clauses.append(clause.format(first_param + len(args) - 1))
+        if self.in_stock:
+            names.append("in_stock")
+            clauses.append("stock_quantity > 0")
+        return "+".join(names), "".join(f" AND {clause}" for clause in clauses), args
+
+
+@dataclass(slots=True)
+class ProductHit:
+    """Search result row with its scores.
+
+    Supports ``hit["name"]`` / ``hit.get("name")`` so prompt builders and
+    routers can treat hits and plain product dicts alike.
+    """
+    product_id: str
+    name: str
+    category: Optional[str] = None
+    price: Optional[float] = None
+    stock_quantity: Optional[int] = None
+    description: Optional[str] = None
+    specs: Optional[Any] = None
+    similarity_score: float = 0.0
+    rank_score: float = 0.0
+    fuzzy_score: float = 0.0
+    combined_score: float = 0.0
+    details_loaded: bool = field(default=True, repr=False)
+
+    @classmethod
+    def from_row(cls, row, **scores) -> "ProductHit":
+        details_loaded = "description" in row.keys()
+        return cls(
+            product_id=row["product_id"],
+            name=row["name"],
+            category=row["category"],
+            price=row["price"],
+            stock_quantity=row["stock_quantity"],
+            description=(row["description"] or "") if details_loaded else None,
+            specs=row["specs"] if details_loaded else None,
+            details_loaded=details_loaded,
+            **scores
+        )
+
+    @property
+    def id(self) -> str:
+        return self.product_id
+
+    @property
+    def content(self) -> str:
+        return f"{self.name} - {self.description or ''}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return isinstance(key, str) and hasattr(self, key)
 
 
 class DatabaseService:
     def __init__(self):
-        self.engine = create_async_engine(
+        # Bumped on every catalog write; cached search results from older versions are never served
+        self.catalog_version = 0
+        self._last_catalog_change = float("-inf")
+        self._change_listeners: List[Callable[[List[str]], None]] = []
+        # Bumped on price/stock/specs updates, which leave rankings valid; per product, the version that changed it
+        self.fields_version = 0
+        self._field_changes: "OrderedDict[str, int]" = OrderedDict()
+        self.search_cache = TTLCache(
+            max_size=settings.search_cache_size,
+            ttl_seconds=settings.search_cache_ttl_seconds,
+            name="hybrid_search"
+        )
+        self.replicas = ReplicaRouter(
+            settings.read_replica_dsns,
+            max_lag_seconds=settings.replica_max_lag_seconds,
+            check_interval=settings.replica_health_check_interval
+        )
+        # asyncpg pools for search reads, keyed by DSN (primary and each replica)
+        self._pools: Dict[str, asyncpg.Pool] = {}
+        self._pool_lock = asyncio.Lock()
+        self.statements = StatementRegistry(
+            explain_threshold_ms=settings.sql_explain_threshold_ms,
+            explain_connection=self.read_connection
+        )
+        # An HNSW scan returns at most ef_search rows, so it must cover the quantized candidate pool
+        self.hnsw_ef_search = min(
+            max(settings.hnsw_ef_search, settings.quantized_candidates if settings.embedding_storage != "float" else 0),
+            HNSW_MAX_EF_SEARCH
+        )
+        self._register_statements()
+        self.synonyms: SynonymDictionary = search_synonyms
+        
+    @cached_property
+    def engine(self):
+        """SQLAlchemy engine, created on first use"""
+        return create_async_engine(
             settings.database_url,
-            echo=True,
+            echo=settings.sql_echo,
             pool_size=5,
             max_overflow=10
         )
-        self.async_session = async_sessionmaker(
+    
+    @cached_property
+    def async_session(self):
+        return async_sessionmaker(
             self.engine, class_=AsyncSession, expire_on_commit=False
         )
-        
+    
+    async def ping(self, timeout: float = 2.0) -> None:
+        """Raise if the primary database cannot answer a trivial query in time"""
+        conn = await asyncio.wait_for(self.get_connection(), timeout)
+        try:
+            await conn.fetchval("SELECT 1", timeout=timeout)
+        finally:
+            await conn.close()
+    
+    async def warm_up(self) -> None:
+        """Check the primary and replicas and open the search pool before the worker takes traffic"""
+        await self.ping(timeout=10.0)
+        await self.replicas.check_all()
+        await self._get_pool(settings.sync_database_url)
+    
+    async def close(self) -> None:
+        for pool in self._pools.values():
+            await pool.close()
+        self._pools = {}
+    
     async def get_connection(self) -> asyncpg.Connection:
         """Get direct connection for vector operations"""
         return await asyncpg.connect(
@@ -47,6 +226,52 @@ class DatabaseService:
         )
     
     
+    async def _get_pool(self, dsn: str) -> asyncpg.Pool:
+        pool = self._pools.get(dsn)
+        if pool is None:
+            async with self._pool_lock:
+                pool = self._pools.get(dsn)
+                if pool is None:
+                    pool = await asyncpg.create_pool(
+                        dsn,
+                        ssl='require',
+                        min_size=settings.db_pool_min_size,
+                        max_size=settings.db_pool_max_size,
+                        # Ceiling for any single query; request deadlines cut them shorter
+                        command_timeout=settings.db_command_timeout_seconds or None,
+                        # Keep prepared statements for the lifetime of the connection
+                        max_cached_statement_lifetime=0,
+                        init=self._init_connection
+                    )
+                    self._pools[dsn] = pool
+        return pool
+    
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        """Pool ``init`` hook: session settings for search queries"""
+        await conn.execute(f"SET hnsw.ef_search = {self.hnsw_ef_search}")
+    
+    @asynccontextmanager
+    async def read_connection(self):
+        """Pooled connection for search queries, from a healthy replica when configured"""
+        pool = None
+        replica = self.replicas.pick()
+        if replica is not None:
+            try:
+                pool = await self._get_pool(replica.dsn)
+                conn = await pool.acquire(timeout=5)
+            except Exception as e:
+                self.replicas.mark_unhealthy(replica, str(e))
+                pool = None
+        
+        if pool is None:
+            pool = await self._get_pool(settings.sync_database_url)
+            conn = await pool.acquire()
+        
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+    
     async def store_product(
         self, 
         name: str, 
@@ -63,8 +288,7 @@ class DatabaseService:
         try:
             embedding_str = '[' + ','.join(map(str, embedding)) + ']'
             
-            import uuid
-            product_id = f"PROD-{str(uuid.uuid4())[:8].upper()}"
+            product_id = self.new_product_id()
             
             query = """
                 INSERT INTO products (product_id, name, description, category, price, stock_quantity, specs, embedding)
@@ -83,155 +307,590 @@ class DatabaseService:
                 json.dumps(specs or {}),
                 embedding_str
             )
+            await self.notify_catalog_change(conn, [result_id])
             
             return result_id
         finally:
             await conn.close()
     
-    async def vector_search(self, query_embedding: List[float], top_k: int = 10) -> List[Dict[str, Any]]:
-        """Vector similarity search using pgvector"""
+    def new_product_id(self) -> str:
+        return f"PROD-{str(uuid.uuid4())[:8].upper()}"
+    
+    async def get_synced_products(self, external_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Product id, content hash and price/stock/specs of already synced products, keyed by external id"""
+        conn = await self.get_connection()
+        try:
+            rows = await conn.fetch(
+                """
+                    SELECT external_id, product_id, content_hash, price, stock_quantity, specs,
+                           deleted_at IS NOT NULL AS deleted
+                    FROM products
+                    WHERE external_id = ANY($1::text[])
+                """,
+                external_ids
+            )
+            return {row["external_id"]: dict(row) for row in rows}
+        finally:
+            await conn.close()
+    
+    async def upsert_products(self, products: List[Dict[str, Any]], kind: str = "catalog") -> Dict[str, str]:
+        """Insert or update products by external id.
+
+        Products without an ``embedding`` keep the stored one, so unchanged
+        content is never re-embedded. Upserted products are undeleted.
+        ``kind`` is passed on to ``notify_catalog_change``.
+        Returns the stored product id per external id: when a concurrent
+        upsert created the row first, its id wins over the one proposed here.
+        """
+        query = """
+            INSERT INTO products (
+                product_id, external_id, name, description, category, price,
+                stock_quantity, specs, content_hash, embedding, deleted_at
+            )
+            SELECT product_id, external_id, name, description, category, price,
+                   stock_quantity, specs::json, content_hash, embedding::vector, NULL
+            FROM unnest(
+                $1::text[], $2::text[], $3::text[], $4::text[], $5::text[],
+                $6::float8[], $7::int[], $8::text[], $9::text[], $10::text[]
+            ) AS rows(
+                product_id, external_id, name, description, category,
+                price, stock_quantity, specs, content_hash, embedding
+            )
+            ON CONFLICT (external_id) DO UPDATE SET
+                name = EXCLUDED.name,
+                description = EXCLUDED.description,
+                category = EXCLUDED.category,
+                price = EXCLUDED.price,
+                stock_quantity = EXCLUDED.stock_quantity,
+                specs = EXCLUDED.specs,
+                content_hash = EXCLUDED.content_hash,
+                embedding = COALESCE(EXCLUDED.embedding, products.embedding),
+                deleted_at = NULL
+            RETURNING external_id, product_id
+        """
+        
+        columns = [[] for _ in range(10)]
+        for product in products:
+            embedding = product.get("embedding")
+            values = (
+                product["product_id"],
+                product["external_id"],
+                product["name"],
+                product.get("description"),
+                product.get("category"),
+                product.get("price"),
+                product.get("stock_quantity") or 0,
+                json.dumps(product.get("specs") or {}),
+                product["content_hash"],
+                '[' + ','.join(map(str, embedding)) + ']' if embedding is not None else None
+            )
+            for column, value in zip(columns, values):
+                column.append(value)
+        
         conn = await self.get_connection()
         try:
+            rows = await conn.fetch(query, *columns)
+            product_ids = {row["external_id"]: row["product_id"] for row in rows}
+            await self.notify_catalog_change(conn, list(product_ids.values()), kind=kind)
+            return product_ids
+        finally:
+            await conn.close()
+    
+    async def soft_delete_missing(self, external_ids: List[str]) -> List[str]:
+        """Soft-delete synced products whose external id is not in a full snapshot"""
+        conn = await self.get_connection()
+        try:
+            rows = await conn.fetch(
+                """
+                    UPDATE products SET deleted_at = now()
+                    WHERE external_id IS NOT NULL
+                      AND deleted_at IS NULL
+                      AND NOT (external_id = ANY($1::text[]))
+                    RETURNING product_id
+                """,
+                external_ids
+            )
+            product_ids = [row["product_id"] for row in rows]
+            if product_ids:
+                await self.notify_catalog_change(conn, product_ids)
+            return product_ids
+        finally:
+            await conn.close()
+    
+    async def update_product_fields(self, updates: List[Dict[str, Any]]) -> List[str]:
+        """Batch-update price, stock and specs without touching embeddings.
+
+        Fields that are missing or None keep their stored value. Returns the
+        ids that were not found (or are soft-deleted).
+        """
+        if not updates:
+            return []
+        
+        query = """
+            UPDATE products SET
+                price = COALESCE($2, price),
+                stock_quantity = COALESCE($3, stock_quantity),
+                specs = COALESCE($4, specs)
+            WHERE product_id = $1 AND deleted_at IS NULL
+        """
+        
+        conn = await self.get_connection()
+        try:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    "SELECT product_id FROM products WHERE product_id = ANY($1::text[]) AND deleted_at IS NULL",
+                    [update["product_id"] for update in updates]
+                )
+                found = {row["product_id"] for row in rows}
+                
+                records = [
+                    (
+                        update["product_id"],
+                        update.get("price"),
+                        update.get("stock_quantity"),
+                        json.dumps(update["specs"]) if update.get("specs") is not None else None
+                    )
+                    for update in updates
+                    if update["product_id"] in found
+                ]
+                await conn.executemany(query, records)
+            
+            if found:
+                await self.notify_catalog_change(conn, list(found), kind="fields")
+            
+            return [update["product_id"] for update in updates if update["product_id"] not in found]
+        finally:
+            await conn.close()
+    
+    def bump_catalog_version(self) -> int:
+        """Mark the catalog as changed so cached search results are discarded"""
+        self.catalog_version += 1
+        self._last_catalog_change = time.monotonic()
+        return self.catalog_version
+    
+    def add_change_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Register a callback invoked with the product ids of every catalog change.
+
+        An empty list means the changed ids are unknown and everything should be dropped.
+        """
+        self._change_listeners.append(listener)
+    
+    def apply_catalog_change(self, product_ids: List[str]) -> None:
+        """Invalidate local caches after products were written here or on another worker"""
+        self.bump_catalog_version()
+        for listener in self._change_listeners:
+            try:
+                listener(product_ids)
+            except Exception as e:
+                logger.error(f"Error in catalog change listener: {e}")
+    
+    def apply_field_change(self, product_ids: List[str]) -> None:
+        """Price/stock/specs of these products changed: cached rankings stay, their copies of the fields don't"""
+        if not product_ids or len(self._field_changes) + len(product_ids) > MAX_TRACKED_FIELD_CHANGES:
+            self._field_changes.clear()
+            self.bump_catalog_version()
+            return
+        
+        self.fields_version += 1
+        self._last_catalog_change = time.monotonic()
+        for product_id in product_ids:
+            self._field_changes[product_id] = self.fields_version
+            self._field_changes.move_to_end(product_id)
+    
+    async def notify_catalog_change(self, conn: asyncpg.Connection, product_ids: List[str], kind: str = "catalog") -> None:
+        """Apply a write locally and broadcast it to the other workers via NOTIFY.
+
+        ``kind`` is "catalog" for writes that can change rankings and "fields"
+        for price/stock/specs updates.
+        """
+        if kind == "fields":
+            self.apply_field_change(product_ids)
+        else:
+            self.apply_catalog_change(product_ids)
+        
+        try:
+            for start in range(0, len(product_ids), MAX_NOTIFY_IDS):
+                payload = json.dumps({
+                    "origin": settings.worker_id,
+                    "kind": kind,
+                    "product_ids": product_ids[start:start + MAX_NOTIFY_IDS]
+                })
+                await conn.execute("SELECT pg_notify($1, $2)", CATALOG_CHANNEL, payload)
+        except Exception as e:
+            # The write itself succeeded; other workers fall back to their cache TTL
+            logger.error(f"Error notifying catalog change: {e}")
+    
+    async def vector_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        include_details: bool = True,
+        filters: Optional[SearchFilters] = None
+    ) -> List[ProductHit]:
+        """Vector similarity search using pgvector"""
+        async with self.read_connection() as conn:
             embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
+
+            statement = "vector_search" if include_details else "vector_search_light"
+            args = [embedding_str, top_k]
+            if settings.embedding_storage != "float":
+                args.append(max(settings.quantized_candidates, top_k))
+
+            if filters is not None:
+                shape, filter_sql, filter_args = filters.sql(len(args) + 1)
+                if shape:
+                    statement = self._filtered_statement(
+                        statement, shape,
+                        lambda: self._vector_search_sql(settings.embedding_storage, include_details, filter_sql)
+                    )
+                    args.extend(filter_args)
+
+            # Rows the HNSW scan must yield: the candidate pool, or top_k for the float index
+            ef_search = args[2] if settings.embedding_storage != "float" else top_k
+            if ef_search > self.hnsw_ef_search:
+                # Widen the scan for this query only; SET LOCAL ends with the transaction
+                async with conn.transaction():
+                    await conn.execute(f"SET LOCAL hnsw.ef_search = {min(ef_search, HNSW_MAX_EF_SEARCH)}")
+                    rows = await self.statements.fetch(conn, statement, *args)
+            else:
+                rows = await self.statements.fetch(conn, statement, *args)
             
+            return [
+                ProductHit.from_row(row, similarity_score=float(row["similarity_score"]))
+                for row in rows
+            ]
+    
+    def _register_statements(self) -> None:
+        """Hot search queries, prepared on every pooled read connection"""
+        self.statements.register("vector_search", self._vector_search_sql(settings.embedding_storage))
+        self.statements.register("vector_search_light", self._vector_search_sql(settings.embedding_storage, include_details=False))
+        self.statements.register("text_search", self._text_search_sql())
+        self.statements.register("text_search_light", self._text_search_sql(include_details=False))
+        self.statements.register("fuzzy_search", self._fuzzy_search_sql())
+        self.statements.register(
+            "load_product_details",
+            f"SELECT product_id, {DETAIL_COLUMNS} FROM products WHERE product_id = ANY($1::text[])"
+        )
+        self.statements.register(
+            "load_product_fields",
+            f"SELECT product_id, price, stock_quantity, {DETAIL_COLUMNS} FROM products WHERE product_id = ANY($1::text[])"
+        )
+    
+    def _filtered_statement(self, base: str, shape: str, build_sql: Callable[[], str]) -> str:
+        """Name of the variant of a search statement for one combination of filters, registering it on first use"""
+        name = f"{base}:{shape}"
+        if name not in self.statements.queries:
+            self.statements.register(name, build_sql())
+        return name
+    
+    def _vector_search_sql(self, storage: str, include_details: bool = True, filter_sql: str = "") -> str:
+        """Build the vector search query for the configured embedding storage mode.
+
+        Quantized modes walk the halfvec / binary expression index for a wider
+        candidate pool and re-rank it with the exact float cosine distance.
+        """
+        dims = settings.embedding_dimensions
+        columns = f"{LIGHT_COLUMNS}, {DETAIL_COLUMNS}" if include_details else LIGHT_COLUMNS
+
+        if storage == "float":
             # Use cosine similarity (1 - cosine_distance) for better scores
-            query = """
-                SELECT 
-                    product_id, name, description, category, price, stock_quantity, specs,
+            return f"""
+                SELECT
+                    {columns},
                     1 - (embedding <=> $1::vector) as similarity_score
-                FROM products 
-                WHERE embedding IS NOT NULL
+                FROM products
+                WHERE embedding IS NOT NULL AND deleted_at IS NULL{filter_sql}
                 ORDER BY embedding <=> $1::vector ASC
                 LIMIT $2
             """
-            
-            rows = await conn.fetch(query, embedding_str, top_k)
-            
-            results = []
-            for row in rows:
-                results.append({
-                    "id": row["product_id"],
-                    "product_id": row["product_id"],
-                    "name": row["name"],
-                    "description": row["description"] or "",
-                    "category": row["category"],
-                    "price": row["price"],
-                    "stock_quantity": row["stock_quantity"],
-                    "specs": row["specs"],
-                    "similarity_score": float(row["similarity_score"]),
-                    "content": f"{row['name']} - {row['description'] or ''}"
-                })
-            
-            return results
-        finally:
-            await conn.close()
-    
-    async def text_search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+
+        if storage == "halfvec":
+            candidate_order = f"embedding::halfvec({dims}) <=> $1::halfvec({dims})"
+        elif storage == "binary":
+            candidate_order = f"binary_quantize(embedding)::bit({dims}) <~> binary_quantize($1::vector)"
+        else:
+            raise ValueError(f"Unsupported embedding storage mode: {storage}")
+
+        return f"""
+            WITH candidates AS (
+                SELECT {columns}, embedding
+                FROM products
+                WHERE embedding IS NOT NULL AND deleted_at IS NULL{filter_sql}
+                ORDER BY {candidate_order} ASC
+                LIMIT $3
+            )
+            SELECT
+                {columns},
+                1 - (embedding <=> $1::vector) as similarity_score
+            FROM candidates
+            ORDER BY embedding <=> $1::vector ASC
+            LIMIT $2
+        """
+
+    async def text_search(
+        self,
+        query: str,
+        top_k: int = 10,
+        include_details: bool = True,
+        filters: Optional[SearchFilters] = None
+    ) -> List[ProductHit]:
         """Full text search using PostgreSQL FTS with expanded terms"""
-        conn = await self.get_connection()
-        try:
+        async with self.read_connection() as conn:
             # Expand common search terms
             expanded_query = self._expand_search_terms(query)
+            statement = "text_search" if include_details else "text_search_light"
+            args = [expanded_query, top_k]
             
-            query_sql = """
-                SELECT 
-                    product_id, name, description, category, price, stock_quantity, specs,
-                    ts_rank(to_tsvector('spanish', name || ' ' || COALESCE(description, '') || ' ' || COALESCE(category, '')), plainto_tsquery('spanish', $1)) as rank_score
-                FROM products 
-                WHERE to_tsvector('spanish', name || ' ' || COALESCE(description, '') || ' ' || COALESCE(category, '')) @@ plainto_tsquery('spanish', $1)
-                ORDER BY rank_score DESC
-                LIMIT $2
-            """
+            if filters is not None:
+                shape, filter_sql, filter_args = filters.sql(len(args) + 1)
+                if shape:
+                    statement = self._filtered_statement(
+                        statement, shape, lambda: self._text_search_sql(include_details, filter_sql)
+                    )
+                    args.extend(filter_args)
             
-            rows = await conn.fetch(query_sql, expanded_query, top_k)
+            rows = await self.statements.fetch(conn, statement, *args)
             
-            results = []
+            return [
+                ProductHit.from_row(row, rank_score=float(row["rank_score"]))
+                for row in rows
+            ]
+    
+    def _text_search_sql(self, include_details: bool = True, filter_sql: str = "") -> str:
+        columns = f"{LIGHT_COLUMNS}, {DETAIL_COLUMNS}" if include_details else LIGHT_COLUMNS
+        return f"""
+            SELECT 
+                {columns},
+                ts_rank(to_tsvector('spanish', name || ' ' || COALESCE(description, '') || ' ' || COALESCE(category, '')), plainto_tsquery('spanish', $1)) as rank_score
+            FROM products 
+            WHERE deleted_at IS NULL{filter_sql}
+              AND to_tsvector('spanish', name || ' ' || COALESCE(description, '') || ' ' || COALESCE(category, '')) @@ plainto_tsquery('spanish', $1)
+            ORDER BY rank_score DESC
+            LIMIT $2
+        """
+    
+    async def fuzzy_search(
+        self,
+        query: str,
+        top_k: int = 10,
+        filters: Optional[SearchFilters] = None
+    ) -> List[ProductHit]:
+        """Typo-tolerant lexical search: pg_trgm word similarity of the longest query words to name/category.
+
+        Returns no hits rather than failing when pg_trgm or its indexes are missing.
+        """
+        terms = self._fuzzy_terms(query)
+        if not terms:
+            return []
+        
+        args: List[Any] = terms + [None] * (FUZZY_MAX_TERMS - len(terms)) + [top_k]
+        statement = "fuzzy_search"
+        if filters is not None:
+            shape, filter_sql, filter_args = filters.sql(len(args) + 1)
+            if shape:
+                statement = self._filtered_statement(statement, shape, lambda: self._fuzzy_search_sql(filter_sql))
+                args.extend(filter_args)
+        
+        try:
+            async with self.read_connection() as conn:
+                rows = await self.statements.fetch(conn, statement, *args)
+        except Exception as e:
+            logger.warning(f"Fuzzy search failed: {e}")
+            return []
+        
+        return [
+            ProductHit.from_row(row, fuzzy_score=float(row["fuzzy_score"]))
+            for row in rows
+        ]
+    
+    def _fuzzy_terms(self, query: str) -> List[str]:
+        words = {word for word in re.findall(r"\w+", query.lower()) if len(word) >= FUZZY_MIN_TERM_LENGTH}
+        return sorted(words, key=lambda word: (-len(word), word))[:FUZZY_MAX_TERMS]
+    
+    def _fuzzy_search_sql(self, filter_sql: str = "") -> str:
+        """Trigram search over name/category, served by the GIN trigram indexes (migrations 004 and 005).
+
+        ``$1..$FUZZY_MAX_TERMS`` are query words (NULL when the query has fewer);
+        ``term <% column`` matches when the word is similar to some part of the column.
+        """
+        params = [f"${index}" for index in range(1, FUZZY_MAX_TERMS + 1)]
+        matches = " OR ".join(f"{param} <% name OR {param} <% category" for param in params)
+        scores = ", ".join(
+            f"word_similarity({param}, name), word_similarity({param}, COALESCE(category, ''))" for param in params
+        )
+        return f"""
+            SELECT 
+                {LIGHT_COLUMNS},
+                GREATEST({scores}) as fuzzy_score
+            FROM products 
+            WHERE deleted_at IS NULL{filter_sql}
+              AND ({matches})
+            ORDER BY fuzzy_score DESC
+            LIMIT ${FUZZY_MAX_TERMS + 1}
+        """
+    
+    async def load_product_details(self, hits: List[ProductHit]) -> List[ProductHit]:
+        """Fill description/specs for hits fetched without their heavy columns"""
+        pending = {hit.product_id: hit for hit in hits if not hit.details_loaded}
+        if not pending:
+            return hits
+        
+        async with self.read_connection() as conn:
+            rows = await self.statements.fetch(conn, "load_product_details", list(pending))
             for row in rows:
-                results.append({
-                    "id": row["product_id"],
-                    "product_id": row["product_id"],
-                    "name": row["name"],
-                    "description": row["description"] or "",
-                    "category": row["category"],
-                    "price": row["price"],
-                    "stock_quantity": row["stock_quantity"],
-                    "specs": row["specs"],
-                    "rank_score": float(row["rank_score"]),
-                    "content": f"{row['name']} - {row['description'] or ''}"
-                })
+                hit = pending[row["product_id"]]
+                hit.description = row["description"] or ""
+                hit.specs = row["specs"]
+                hit.details_loaded = True
             
-            return results
-        finally:
-            await conn.close()
+            return hits
+    
+    async def _refresh_changed_fields(self, hits: List[ProductHit], since: int) -> None:
+        """Reload price/stock (and loaded details) of cached hits updated after fields version ``since``"""
+        changed = {
+            hit.product_id: hit for hit in hits
+            if self._field_changes.get(hit.product_id, 0) > since
+        }
+        if not changed:
+            return
+        
+        async with self.read_connection() as conn:
+            rows = await self.statements.fetch(conn, "load_product_fields", list(changed))
+        for row in rows:
+            hit = changed[row["product_id"]]
+            hit.price = row["price"]
+            hit.stock_quantity = row["stock_quantity"]
+            if hit.details_loaded:
+                hit.description = row["description"] or ""
+                hit.specs = row["specs"]
+    
+    def _replicas_may_lag(self) -> bool:
+        """A lagging replica may not have replayed the latest write yet"""
+        return (
+            bool(self.replicas.replicas)
+            and time.monotonic() - self._last_catalog_change < settings.replica_max_lag_seconds
+        )
     
     def _expand_search_terms(self, query: str) -> str:
-        """Expand search terms to improve matching"""
-        query_lower = query.lower()
-        expanded_terms = [query]
+        """Expand search terms with the synonym dictionary to improve matching"""
+        return self.synonyms.expand(query)
+    
+    def _search_cache_key(
+        self,
+        query_embedding: List[float],
+        query_text: str,
+        top_k: int,
+        filters: Optional[SearchFilters] = None,
+        include_details: bool = True
+    ) -> Tuple:
+        normalized_text = " ".join(query_text.lower().split())
+        fingerprint = hashlib.blake2b(array("f", query_embedding).tobytes(), digest_size=8).hexdigest()
+        return (normalized_text, fingerprint, top_k, filters, include_details, self.synonyms.version)
+    
+    async def hybrid_search(
+        self,
+        query_embedding: List[float],
+        query_text: str,
+        top_k: int = 10,
+        filters: Optional[SearchFilters] = None,
+        include_details: bool = True
+    ) -> List[ProductHit]:
+        """Hybrid search served from the result cache when the catalog has not changed.
+
+        Price/stock/specs updates keep cached rankings: the affected hits are
+        reloaded on the next cache hit. Only rankings filtered on price or
+        stock are dropped by them.
+        """
+        if not self.search_cache.enabled:
+            return await self._hybrid_search(query_embedding, query_text, top_k, filters, include_details)
         
-        # Add synonyms for common terms
-        if 'laptop' in query_lower or 'portatil' in query_lower or 'computadora' in query_lower:
-            expanded_terms.extend(['laptop', 'portatil', 'computadora', 'notebook', 'macbook'])
+        cache_key = self._search_cache_key(query_embedding, query_text, top_k, filters, include_details)
+        # Read the versions before querying so a concurrent write leaves this entry stale
+        fields_version = self.fields_version
+        version = self.catalog_version
+        if filters is not None and filters.uses_fields:
+            version = (version, fields_version)
         
-        if 'smartphone' in query_lower or 'telefono' in query_lower or 'celular' in query_lower:
-            expanded_terms.extend(['smartphone', 'telefono', 'celular', 'movil', 'iphone'])
-            
-        if 'dia a dia' in query_lower or 'diario' in query_lower or 'cotidiano' in query_lower:
-            expanded_terms.extend(['diario', 'cotidiano', 'personal', 'uso', 'trabajo'])
+        cached = self.search_cache.get(cache_key, version=version)
+        if cached is not None:
+            cached_fields_version, cached_hits = cached
+            results = [replace(hit) for hit in cached_hits]
+            if cached_fields_version < fields_version:
+                await self._refresh_changed_fields(results, cached_fields_version)
+                if not self._replicas_may_lag():
+                    self.search_cache.set(cache_key, (fields_version, tuple(replace(hit) for hit in results)), version=version)
+            return results
         
-        return ' '.join(set(expanded_terms))
+        results = await self._hybrid_search(query_embedding, query_text, top_k, filters, include_details)
+        # Don't cache what a lagging replica returned
+        if not self._replicas_may_lag():
+            self.search_cache.set(cache_key, (fields_version, tuple(replace(hit) for hit in results)), version=version)
+        
+        return results
     
-    async def hybrid_search(self, query_embedding: List[float], query_text: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    async def _hybrid_search(
+        self,
+        query_embedding: List[float],
+        query_text: str,
+        top_k: int = 10,
+        filters: Optional[SearchFilters] = None,
+        include_details: bool = True
+    ) -> List[ProductHit]:
         """Improved hybrid search combining vector and text search"""
-        # Get more results for better combination
-        search_k = min(top_k * 2, 20)
+        # Get more results for better combination, but never fewer than requested
+        search_k = min(top_k * 2, max(20, top_k))
         
-        vector_results = await self.vector_search(query_embedding, search_k)
-        text_results = await self.text_search(query_text, search_k)
+        # Rank on light columns; description/specs are loaded only for the final top_k
+        vector_results = await self.vector_search(query_embedding, search_k, include_details=False, filters=filters)
+        text_results = await self.text_search(query_text, search_k, include_details=False, filters=filters)
         
-        combined_results = {}
+        combined_results: Dict[str, ProductHit] = {}
         
         # Process vector results with improved scoring
-        for result in vector_results:
-            product_id = result["id"]
+        for hit in vector_results:
             # Ensure positive similarity scores
-            sim_score = max(0, result["similarity_score"])
-            result["combined_score"] = sim_score * 0.6  # Reduced weight for vector
-            combined_results[product_id] = result
+            hit.combined_score = max(0, hit.similarity_score) * 0.6  # Reduced weight for vector
+            combined_results[hit.product_id] = hit
         
         # Process text results
-        for result in text_results:
-            product_id = result["id"]
-            text_score = result["rank_score"] * 0.4  # Increased weight for text
+        for hit in text_results:
+            text_score = hit.rank_score * 0.4  # Increased weight for text
             
-            if product_id in combined_results:
-                combined_results[product_id]["combined_score"] += text_score
-                combined_results[product_id]["rank_score"] = result["rank_score"]
+            existing = combined_results.get(hit.product_id)
+            if existing is not None:
+                existing.combined_score += text_score
+                existing.rank_score = hit.rank_score
             else:
-                result["combined_score"] = text_score
-                result["similarity_score"] = 0.0
-                combined_results[product_id] = result
-        
-        # Boost scores for exact category matches
-        query_lower = query_text.lower()
-        for result in combined_results.values():
-            category = (result.get("category") or "").lower()
-            name = result.get("name", "").lower()
-            description = result.get("description", "").lower()
-            
-            # Boost for category relevance
-            if ('laptop' in query_lower or 'portatil' in query_lower) and 'tecnolog' in category:
-                result["combined_score"] *= 1.5
-            elif 'macbook' in name or 'laptop' in name or 'portatil' in name:
-                result["combined_score"] *= 1.3
+                hit.combined_score = text_score
+                combined_results[hit.product_id] = hit
+        
+        # Misspellings ("macbok", "portatl") find nothing in FTS; add trigram matches when it comes back thin
+        if settings.fuzzy_search_enabled and len(text_results) < settings.fuzzy_search_min_text_hits:
+            for hit in await self.fuzzy_search(query_text, search_k, filters=filters):
+                fuzzy_score = hit.fuzzy_score * settings.fuzzy_search_weight
+                
+                existing = combined_results.get(hit.product_id)
+                if existing is None:
+                    hit.combined_score = fuzzy_score
+                    combined_results[hit.product_id] = hit
+                elif existing.rank_score == 0:
+                    existing.combined_score += fuzzy_score
+                    existing.fuzzy_score = hit.fuzzy_score
+        
+        # Boost category/name matches from the synonym dictionary
+        matches = self.synonyms.match_query(query_text)
+        for hit in combined_results.values():
+            hit.combined_score *= self.synonyms.boost(matches, hit.name or "", hit.category or "")
         
         sorted_results = sorted(
             combined_results.values(), 
-            key=lambda x: x["combined_score"], 
+            key=lambda hit: hit.combined_score, 
             reverse=True
         )
         
-        return sorted_results[:top_k]
+        if not include_details:
+            return sorted_results[:top_k]
+        return await self.load_product_details(sorted_results[:top_k])
     
 
 db_service = DatabaseService() 
\ No newline at end of file
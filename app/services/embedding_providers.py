@@ -0,0 +1,251 @@
+"""Embedding providers, selected per deployment with ``EMBEDDING_PROVIDER``.
+
+- ``azure``: the Azure OpenAI embeddings deployment (default).
+- ``local``: a sentence-transformer exported to ONNX, run on CPU. The directory
+  in ``LOCAL_EMBEDDING_MODEL_PATH`` must hold ``model.onnx`` and
+  ``tokenizer.json``; needs ``onnxruntime``, ``tokenizers`` and ``numpy``.
+- ``hashing``: feature hashing of words and trigrams. Deterministic and free,
+  but only texts sharing words end up close: for tests and benchmarks.
+
+Stored and query embeddings must come from the same provider, so switching
+providers means re-embedding the catalog (``POST /products/sync``), and
+``EMBEDDING_DIMENSIONS`` must match the model's output size.
+"""
+import abc
+import asyncio
+import hashlib
+import logging
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider(abc.ABC):
+    """Turns texts into vectors without blocking the event loop"""
+
+    name = "base"
+    # Remote providers get the circuit breaker, hedging and token truncation
+    remote = False
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    @abc.abstractmethod
+    async def embed(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        ...
+
+    async def warm_up(self) -> None:
+        """Load whatever the first request would otherwise pay for"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"provider": self.name, "dimensions": self.dimensions}
+
+
+class AzureEmbeddingProvider(EmbeddingProvider):
+    """Azure OpenAI embeddings deployment, one request per call in a worker thread"""
+
+    name = "azure"
+    remote = True
+
+    def __init__(self, dimensions: int, deployment: str, client_for: Callable[[Optional[float]], Any]):
+        super().__init__(dimensions)
+        self.deployment = deployment
+        self.client_for = client_for
+
+    async def embed(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        response = await asyncio.to_thread(
+            self.client_for(timeout).embeddings.create,
+            input=texts,
+            model=self.deployment
+        )
+        data = response.data if len(response.data) < 2 else sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in data]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Signed feature hashing of words and character trigrams into a unit vector"""
+
+    name = "hashing"
+
+    def vector(self, text: str) -> List[float]:
+        words = re.findall(r"\w+", text.lower())
+        features = words + [f"#{word[i:i + 3]}" for word in words for i in range(max(len(word) - 2, 1))]
+        vector = [0.0] * self.dimensions
+        # An empty text still gets a (fixed) direction: cosine distance to a zero vector is undefined
+        for feature in features or [""]:
+            value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norm = math.sqrt(sum(component * component for component in vector))
+        return [component / norm for component in vector]
+
+    async def embed(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        if len(texts) == 1:
+            return [self.vector(texts[0])]
+        return await asyncio.to_thread(lambda: [self.vector(text) for text in texts])
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """ONNX sentence-transformer on CPU.
+
+    Inference runs on a dedicated pool of ``threads`` workers (onnxruntime
+    releases the GIL), at most ``batch_size`` texts per run. Single-text calls
+    (query embeddings) arriving within ``batch_wait_ms`` of each other are
+    coalesced into one run, so concurrent queries share a forward pass.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        dimensions: int,
+        model_path: str,
+        batch_size: int = 32,
+        threads: int = 2,
+        max_length: int = 256,
+        batch_wait_ms: float = 2.0
+    ):
+        super().__init__(dimensions)
+        self.model_path = Path(model_path)
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.batch_wait_ms = batch_wait_ms
+        self.runs = 0
+        self.texts = 0
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="local-embeddings")
+        self._load_lock = threading.Lock()
+        self._session = None
+        self._tokenizer = None
+        self._input_names = frozenset()
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def _load(self) -> None:
+        with self._load_lock:
+            if self._session is not None:
+                return
+            try:
+                import onnxruntime
+                from tokenizers import Tokenizer
+            except ImportError as e:
+                raise RuntimeError("EMBEDDING_PROVIDER=local needs onnxruntime, tokenizers and numpy installed") from e
+
+            tokenizer = Tokenizer.from_file(str(self.model_path / "tokenizer.json"))
+            tokenizer.enable_truncation(self.max_length)
+            tokenizer.enable_padding()
+            options = onnxruntime.SessionOptions()
+            # Parallelism comes from the worker pool; more intra-op threads per run would oversubscribe the CPU
+            options.intra_op_num_threads = 1
+            session = onnxruntime.InferenceSession(
+                str(self.model_path / "model.onnx"), options, providers=["CPUExecutionProvider"]
+            )
+            self._input_names = frozenset(model_input.name for model_input in session.get_inputs())
+            self._tokenizer, self._session = tokenizer, session
+            logger.info(f"Loaded local embedding model from {self.model_path}")
+
+    def _run(self, texts: List[str]) -> List[List[float]]:
+        """One forward pass; runs on the worker pool"""
+        import numpy as np
+
+        self._load()
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        output = self._session.run(None, feeds)[0]
+        if output.ndim == 3:
+            # Token embeddings: mean over real tokens, as sentence-transformers does
+            mask = attention_mask[..., None].astype(output.dtype)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        output = output / np.clip(np.linalg.norm(output, axis=1, keepdims=True), 1e-12, None)
+
+        self.runs += 1
+        self.texts += len(texts)
+        return output.tolist()
+
+    async def embed(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        if len(texts) == 1 and self.batch_wait_ms > 0:
+            return [await asyncio.wait_for(self._enqueue(texts[0]), timeout)]
+
+        loop = asyncio.get_running_loop()
+        runs = [
+            loop.run_in_executor(self._executor, self._run, texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        batches = await asyncio.wait_for(asyncio.gather(*runs), timeout)
+        return [vector for batch in batches for vector in batch]
+
+    def _enqueue(self, text: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_wait_ms / 1000, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        run = asyncio.get_running_loop().run_in_executor(self._executor, self._run, [text for text, _ in batch])
+        run.add_done_callback(lambda done: self._deliver(batch, done))
+
+    @staticmethod
+    def _deliver(batch: List[Tuple[str, asyncio.Future]], run: asyncio.Future) -> None:
+        error = asyncio.CancelledError() if run.cancelled() else run.exception()
+        for index, (_, future) in enumerate(batch):
+            # Callers that timed out have already cancelled their future
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(run.result()[index])
+
+    async def warm_up(self) -> None:
+        """Load the model and run one batch; fails if the model doesn't match EMBEDDING_DIMENSIONS"""
+        vector = (await self.embed(["warm up"]))[0]
+        if len(vector) != self.dimensions:
+            raise ValueError(
+                f"Local embedding model outputs {len(vector)} dimensions, EMBEDDING_DIMENSIONS is {self.dimensions}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "runs": self.runs,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.runs, 2) if self.runs else None,
+            "pending": len(self._pending),
+        }
+
+
+def create_embedding_provider(client_for: Callable[[Optional[float]], Any]) -> EmbeddingProvider:
+    provider = settings.embedding_provider
+    if provider == "azure":
+        return AzureEmbeddingProvider(settings.embedding_dimensions, settings.azure_openai_embedding_deployment, client_for)
+    if provider == "hashing":
+        return HashingEmbeddingProvider(settings.embedding_dimensions)
+    if provider == "local":
+        return LocalEmbeddingProvider(
+            settings.embedding_dimensions,
+            settings.local_embedding_model_path,
+            batch_size=settings.local_embedding_batch_size,
+            threads=settings.local_embedding_threads,
+            max_length=settings.local_embedding_max_length,
+            batch_wait_ms=settings.local_embedding_batch_wait_ms
+        )
+    raise ValueError(f"Unsupported embedding provider: {provider}")
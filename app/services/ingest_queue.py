@@ -0,0 +1,372 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import asyncpg
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from app.core.config import settings
+from app.services.catalog_sync import catalog_sync_service, product_embedding_text
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.database import db_service
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError,
+    InternalServerError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncio.TimeoutError,
+    OSError,
+    CircuitOpenError,
+)
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept more items"""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an error (or the error it wraps) is worth retrying"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+async def ingest_product(product: Dict[str, Any]) -> str:
+    """Embed and store one product, upserting when it has an external id"""
+    if product.get("external_id"):
+        result = await catalog_sync_service.sync_products([product])
+        return result["product_ids"][product["external_id"]]
+
+    product_text = product_embedding_text(product["name"], product.get("description"), product.get("category"))
+    embedding = await llm_service.generate_embedding(product_text)
+
+    return await db_service.store_product(
+        name=product["name"],
+        description=product.get("description"),
+        category=product.get("category"),
+        price=product.get("price"),
+        stock_quantity=product.get("stock_quantity"),
+        specs=product.get("specs"),
+        embedding=embedding,
+        metadata=product.get("metadata") or {}
+    )
+
+
+@dataclass
+class IngestItem:
+    job_id: str
+    index: int
+    product: Dict[str, Any]
+    attempts: int = 0
+    item_id: Optional[int] = None
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    total: int
+    status: str = "queued"
+    processed: int = 0
+    failed: int = 0
+    product_ids: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def record(self, product_id: Optional[str] = None, error: Optional[str] = None) -> None:
+        if error is None:
+            self.processed += 1
+            self.product_ids.append(product_id)
+        else:
+            self.failed += 1
+            self.errors.append(error)
+
+        if self.processed + self.failed >= self.total:
+            self.status = "failed" if self.processed == 0 else "completed"
+            self.finished_at = time.time()
+        else:
+            self.status = "running"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "failed": self.failed,
+            "product_ids": self.product_ids,
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class MemoryQueueBackend:
+    """Bounded asyncio queue; jobs are lost if the worker restarts"""
+
+    def __init__(self, max_size: int, job_retention: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self.job_retention = job_retention
+        self._retries = set()
+
+    async def enqueue(self, products: List[Dict[str, Any]]) -> str:
+        if self.queue.maxsize and self.queue.qsize() + len(products) > self.queue.maxsize:
+            raise QueueFullError("Ingestion queue is full, retry later")
+
+        job = IngestJob(job_id=uuid.uuid4().hex, total=len(products))
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > self.job_retention:
+            self.jobs.popitem(last=False)
+
+        for index, product in enumerate(products):
+            self.queue.put_nowait(IngestItem(job_id=job.job_id, index=index, product=product))
+        return job.job_id
+
+    async def claim(self) -> IngestItem:
+        item = await self.queue.get()
+        item.attempts += 1
+        job = self.jobs.get(item.job_id)
+        if job is not None and job.status == "queued":
+            job.status = "running"
+        return item
+
+    async def complete(self, item: IngestItem, product_id: str) -> None:
+        job = self.jobs.get(item.job_id)
+        if job is not None:
+            job.record(product_id=product_id)
+
+    async def fail(self, item: IngestItem, error: str) -> None:
+        job = self.jobs.get(item.job_id)
+        if job is not None:
+            job.record(error=error)
+
+    async def retry(self, item: IngestItem, delay: float) -> None:
+        # Requeue in the background so the worker is free during the backoff
+        task = asyncio.create_task(self._requeue(item, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _requeue(self, item: IngestItem, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.queue.put(item)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+
+class PostgresQueueBackend:
+    """Durable queue in Postgres; workers claim items with FOR UPDATE SKIP LOCKED"""
+
+    def __init__(self, max_size: int, poll_interval: float):
+        self.max_size = max_size
+        self.poll_interval = poll_interval
+
+    async def enqueue(self, products: List[Dict[str, Any]]) -> str:
+        job_id = uuid.uuid4().hex
+        conn = await db_service.get_connection()
+        try:
+            async with conn.transaction():
+                pending = await conn.fetchval(
+                    "SELECT count(*) FROM ingest_items WHERE status IN ('queued', 'processing')"
+                )
+                if self.max_size and pending + len(products) > self.max_size:
+                    raise QueueFullError("Ingestion queue is full, retry later")
+
+                await conn.execute(
+                    "INSERT INTO ingest_jobs (job_id, total) VALUES ($1, $2)",
+                    job_id, len(products)
+                )
+                await conn.executemany(
+                    "INSERT INTO ingest_items (job_id, item_index, payload) VALUES ($1, $2, $3)",
+                    [(job_id, index, json.dumps(product)) for index, product in enumerate(products)]
+                )
+            return job_id
+        finally:
+            await conn.close()
+
+    async def claim(self) -> IngestItem:
+        while True:
+            conn = await db_service.get_connection()
+            try:
+                row = await conn.fetchrow("""
+                    UPDATE ingest_items SET status = 'processing', attempts = attempts + 1, claimed_at = now()
+                    WHERE item_id = (
+                        SELECT item_id FROM ingest_items
+                        WHERE (status = 'queued' AND available_at <= now())
+                           -- Items held by a worker that died mid-processing
+                           OR (status = 'processing' AND claimed_at < now() - interval '10 minutes')
+                        ORDER BY item_id
+                        FOR UPDATE SKIP LOCKED
+                        LIMIT 1
+                    )
+                    RETURNING item_id, job_id, item_index, payload, attempts
+                """)
+            finally:
+                await conn.close()
+
+            if row is not None:
+                return IngestItem(
+                    job_id=row["job_id"],
+                    index=row["item_index"],
+                    product=json.loads(row["payload"]),
+                    attempts=row["attempts"],
+                    item_id=row["item_id"]
+                )
+            await asyncio.sleep(self.poll_interval)
+
+    async def _finish(self, item: IngestItem, product_id: Optional[str], error: Optional[str]) -> None:
+        conn = await db_service.get_connection()
+        try:
+            async with conn.transaction():
+                await conn.execute(
+                    "UPDATE ingest_items SET status = $2, product_id = $3, error = $4 WHERE item_id = $1",
+                    item.item_id, "failed" if error else "done", product_id, error
+                )
+                await conn.execute("""
+                    UPDATE ingest_jobs SET
+                        processed = processed + $2,
+                        failed = failed + $3,
+                        finished_at = CASE WHEN processed + failed + 1 >= total THEN now() END
+                    WHERE job_id = $1
+                """, item.job_id, 0 if error else 1, 1 if error else 0)
+        finally:
+            await conn.close()
+
+    async def complete(self, item: IngestItem, product_id: str) -> None:
+        await self._finish(item, product_id, None)
+
+    async def fail(self, item: IngestItem, error: str) -> None:
+        await self._finish(item, None, error)
+
+    async def retry(self, item: IngestItem, delay: float) -> None:
+        conn = await db_service.get_connection()
+        try:
+            await conn.execute(
+                "UPDATE ingest_items SET status = 'queued', available_at = now() + make_interval(secs => $2) WHERE item_id = $1",
+                item.item_id, delay
+            )
+        finally:
+            await conn.close()
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = await db_service.get_connection()
+        try:
+            job = await conn.fetchrow("SELECT * FROM ingest_jobs WHERE job_id = $1", job_id)
+            if job is None:
+                return None
+            items = await conn.fetch(
+                "SELECT status, attempts, product_id, error FROM ingest_items WHERE job_id = $1 ORDER BY item_index",
+                job_id
+            )
+        finally:
+            await conn.close()
+
+        if job["processed"] + job["failed"] >= job["total"]:
+            status = "failed" if job["processed"] == 0 else "completed"
+        elif any(item["attempts"] for item in items):
+            status = "running"
+        else:
+            status = "queued"
+
+        return {
+            "job_id": job_id,
+            "status": status,
+            "total": job["total"],
+            "processed": job["processed"],
+            "failed": job["failed"],
+            "product_ids": [item["product_id"] for item in items if item["status"] == "done"],
+            "errors": [item["error"] for item in items if item["status"] == "failed"],
+            "created_at": job["created_at"].timestamp(),
+            "finished_at": job["finished_at"].timestamp() if job["finished_at"] else None,
+        }
+
+    def depth(self) -> Optional[int]:
+        return None
+
+
+class IngestJobQueue:
+    """Accepts ingestion jobs and processes their items on a bounded pool of asyncio workers"""
+
+    def __init__(self):
+        if settings.ingest_queue_backend == "postgres":
+            self.backend = PostgresQueueBackend(settings.ingest_queue_size, settings.ingest_poll_interval_seconds)
+        else:
+            self.backend = MemoryQueueBackend(settings.ingest_queue_size, settings.ingest_job_retention)
+        self._workers: List[asyncio.Task] = []
+
+    async def submit(self, products: List[Dict[str, Any]]) -> str:
+        """Queue products for ingestion and return the job id"""
+        return await self.backend.enqueue(products)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.backend.get_job(job_id)
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(number))
+                for number in range(settings.ingest_workers)
+            ]
+            logger.info(f"Started {len(self._workers)} ingestion workers")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def process(self, item: IngestItem) -> None:
+        """Ingest one item, retrying transient Azure/Postgres failures with backoff"""
+        try:
+            product_id = await ingest_product(item.product)
+        except Exception as e:
+            if is_transient(e) and item.attempts <= settings.ingest_max_retries:
+                delay = settings.ingest_retry_backoff_seconds * 2 ** (item.attempts - 1)
+                logger.warning(f"Transient error ingesting item {item.index} of job {item.job_id}, retrying in {delay}s: {e}")
+                await self.backend.retry(item, delay)
+                return
+
+            logger.error(f"Error ingesting item {item.index} of job {item.job_id}: {e}")
+            await self.backend.fail(item, f"{item.product.get('name', '')}: {e}")
+            return
+
+        await self.backend.complete(item, product_id)
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            try:
+                item = await self.backend.claim()
+                await self.process(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion worker {number} error: {e}")
+                await asyncio.sleep(settings.ingest_poll_interval_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": settings.ingest_queue_backend,
+            "workers": len(self._workers),
+            "queue_depth": self.backend.depth(),
+        }
+
+
+ingest_queue = IngestJobQueue()
@@ -1,8 +1,15 @@
-from typing import List, Dict, Any
+import asyncio
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional
 from openai import AzureOpenAI
 import tiktoken
 import logging
 from app.core.config import settings
+from app.services.cache import TTLCache
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, breaker_for
+from app.services.embedding_providers import EmbeddingProvider, create_embedding_provider
+from app.services.model_router import ModelTier, model_router
 
 logger = logging.getLogger(__name__)
 
@@ -16,38 +23,233 @@ class LLMService:
             timeout=45.0,  # Set timeout for Azure OpenAI calls
             max_retries=2  # Reduce retries to fail faster
         )
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+        self._encoding = None
+        # Query embeddings shared by /query and /search; keyed by normalized query text
+        self.embedding_cache = TTLCache(
+            max_size=settings.embedding_cache_size,
+            ttl_seconds=settings.embedding_cache_ttl_seconds,
+            name="query_embeddings"
+        )
+        # One breaker per Azure deployment (embeddings and each chat tier)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._embedding_latencies = deque(maxlen=500)
+        self.hedged_requests = 0
+        self.embedding_provider: EmbeddingProvider = create_embedding_provider(self._client_for)
+    
+    @property
+    def encoding(self):
+        """cl100k_base tokenizer, loaded on first use or during warm-up"""
+        if self._encoding is None:
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
+    
+    async def warm_up(self) -> None:
+        """Load the tokenizer and the embedding model off the event loop so the first request doesn't pay for them"""
+        await asyncio.to_thread(lambda: self.encoding)
+        await self.embedding_provider.warm_up()
+    
+    def _client_for(self, timeout: Optional[float]):
+        """Client bounded by a request's remaining budget: no retries stacking past the deadline"""
+        if timeout is None:
+            return self.client
+        return self.client.with_options(timeout=timeout, max_retries=0)
+    
+    def _breaker(self, deployment: str) -> CircuitBreaker:
+        breaker = self.breakers.get(deployment)
+        if breaker is None:
+            breaker = self.breakers[deployment] = breaker_for(deployment)
+        return breaker
+    
+    async def _request_embeddings(self, inputs: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        """One provider call; remote calls go through the deployment's breaker and feed the hedging latencies"""
+        provider = self.embedding_provider
+        if not provider.remote:
+            return await provider.embed(inputs, timeout)
+        
+        breaker = self._breaker(settings.azure_openai_embedding_deployment)
+        breaker.before_call()
+        start = time.perf_counter()
+        try:
+            embeddings = await provider.embed(inputs, timeout)
+        except asyncio.CancelledError:
+            breaker.abandon()
+            raise
+        except Exception as e:
+            breaker.record((time.perf_counter() - start) * 1000, e)
+            raise
+        
+        latency_ms = (time.perf_counter() - start) * 1000
+        breaker.record(latency_ms)
+        self._embedding_latencies.append(latency_ms)
+        return embeddings
     
-    async def generate_embedding(self, text: str) -> List[float]:
+    def _check_embedding_circuit(self) -> None:
+        """Fail fast on an open embeddings circuit, before paying for tokenization"""
+        if self.embedding_provider.remote:
+            self._breaker(settings.azure_openai_embedding_deployment).check()
+    
+    def _truncate(self, text: str, max_tokens: int = 8000) -> str:
+        """Cut text to the Azure embeddings token limit (conservative for text-embedding-ada-002)"""
+        tokens = self.encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        logger.warning("Text truncated to %d tokens", max_tokens)
+        return self.encoding.decode(tokens[:max_tokens])
+    
+    def _hedge_delay(self, timeout: Optional[float]) -> Optional[float]:
+        """Seconds to wait before a backup request: the recent latency percentile, if hedging applies"""
+        if not (settings.embedding_hedging_enabled and self.embedding_provider.remote) or len(self._embedding_latencies) < 20:
+            return None
+        ordered = sorted(self._embedding_latencies)
+        percentile_ms = ordered[min(int(len(ordered) * settings.embedding_hedge_percentile), len(ordered) - 1)]
+        delay = max(percentile_ms, settings.embedding_hedge_min_delay_ms) / 1000
+        if timeout is not None and delay >= timeout:
+            return None
+        return delay
+    
+    async def _hedged_embedding(self, inputs: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        """Embedding call that fires a second request when the first is slower than usual; the first answer wins"""
+        delay = self._hedge_delay(timeout)
+        if delay is None:
+            return await self._request_embeddings(inputs, timeout)
+        
+        primary = asyncio.ensure_future(self._request_embeddings(inputs, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        
+        self.hedged_requests += 1
+        pending = {primary, asyncio.ensure_future(self._request_embeddings(inputs, timeout))}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    # A rejected hedge (half-open circuit) must not hide the primary's error
+                    if error is None or isinstance(error, CircuitOpenError):
+                        error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def generate_embedding(self, text: str, timeout: Optional[float] = None) -> List[float]:
         """Generate embedding for given text with optimized error handling"""
         try:
-            logger.info(f"Generating embedding for text: {text[:100]}...")
+            logger.debug("Generating embedding for %d chars", len(text))
             
-            # Truncate text if too long (Azure OpenAI has token limits)
-            max_tokens = 8000  # Conservative limit for text-embedding-ada-002
-            if len(self.encoding.encode(text)) > max_tokens:
-                tokens = self.encoding.encode(text)[:max_tokens]
-                text = self.encoding.decode(tokens)
-                logger.warning(f"Text truncated to {max_tokens} tokens")
+            self._check_embedding_circuit()
+            # Azure OpenAI has token limits; local models truncate in their own tokenizer
+            if self.embedding_provider.remote:
+                text = self._truncate(text)
             
-            response = self.client.embeddings.create(
-                input=text,
-                model=settings.azure_openai_embedding_deployment
-            )
-            
-            logger.info("Embedding generated successfully")
-            return response.data[0].embedding
+            embeddings = await self._hedged_embedding([text], timeout)
             
+            logger.debug("Embedding generated successfully")
+            return embeddings[0]
+        
+        except CircuitOpenError:
+            # Callers fall back (text-only search) instead of waiting on a degraded deployment
+            raise
         except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
+            logger.error("Error generating embedding: %s", e)
             # Re-raise with more context
             raise Exception(f"Failed to generate embedding: {str(e)}")
     
+    async def embed_query(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        """Embedding for a search query, served from the embedding cache when seen recently"""
+        key = " ".join(query.lower().split())
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = await self.generate_embedding(query, timeout=timeout)
+            self.embedding_cache.set(key, embedding)
+        return embedding
+    
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for many texts with one provider call per batch"""
+        try:
+            self._check_embedding_circuit()
+            inputs = [self._truncate(text) for text in texts] if self.embedding_provider.remote else list(texts)
+            
+            embeddings = []
+            batch_size = settings.embedding_batch_size
+            for start in range(0, len(inputs), batch_size):
+                embeddings.extend(await self._request_embeddings(inputs[start:start + batch_size]))
+            
+            logger.info("Generated %d embeddings", len(embeddings))
+            return embeddings
+            
+        except Exception as e:
+            logger.error("Error generating embeddings: %s", e)
+            raise Exception(f"Failed to generate embeddings: {str(e)}")
+    
+    async def _chat(
+        self,
+        tier: ModelTier,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Chat completion on the tier's deployment, feeding latency and throttling back to the router and breaker.
+
+        The sync client runs in a worker thread so a slow completion doesn't
+        block the event loop (and every other request's deadline with it).
+        """
+        breaker = self._breaker(tier.deployment)
+        breaker.before_call()
+        start = time.perf_counter()
+        try:
+            response = await asyncio.to_thread(
+                self._client_for(timeout).chat.completions.create,
+                model=tier.deployment,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        except asyncio.CancelledError:
+            # Request deadline hit: no latency sample for the router or the breaker
+            tier.probing = False
+            breaker.abandon()
+            raise
+        except Exception as e:
+            latency_ms = (time.perf_counter() - start) * 1000
+            model_router.record(tier, latency_ms, error=e)
+            breaker.record(latency_ms, e)
+            raise
+        
+        latency_ms = (time.perf_counter() - start) * 1000
+        model_router.record(tier, latency_ms)
+        breaker.record(latency_ms)
+        return response.choices[0].message.content.strip()
+    
+    def _choose_tier(self, task: str, query: str, num_products: int = 0, history_turns: int = 0) -> ModelTier:
+        """Routed tier, moved to the other deployment while its circuit is open"""
+        tier = model_router.choose(task, query, num_products, history_turns)
+        if not self._breaker(tier.deployment).allows_calls:
+            other = model_router.other_tier(tier)
+            if other is not None and self._breaker(other.deployment).allows_calls:
+                return other
+        return tier
+    
+    def circuit_stats(self) -> Dict[str, Any]:
+        return {
+            "breakers": {deployment: breaker.stats() for deployment, breaker in self.breakers.items()},
+            "hedged_embedding_requests": self.hedged_requests,
+        }
+    
     async def plan_query(self, user_query: str) -> List[str]:
         """Query planning - returns original query"""
         return [user_query]
     
-    async def contextualize_query(self, query: str, conversation_history: List[Dict[str, str]]) -> str:
+    async def contextualize_query(
+        self,
+        query: str,
+        conversation_history: List[Dict[str, str]],
+        timeout: Optional[float] = None
+    ) -> str:
         if not conversation_history:
             return query
         
@@ -68,31 +270,34 @@ class LLMService:
                 """
         
         try:
-            response = self.client.chat.completions.create(
-                model=settings.azure_openai_deployment_name,
+            tier = self._choose_tier("rewrite", query)
+            contextualized = await self._chat(
+                tier,
                 messages=[
                     {"role": "system", "content": "Eres un asistente que ayuda a contextualizar consultas basándose en conversaciones previas."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=150
+                max_tokens=min(150, tier.max_tokens),
+                timeout=timeout
             )
             
-            contextualized = response.choices[0].message.content.strip()
             return contextualized if contextualized else query
         
         except Exception as e:
-            logger.error(f"Error contextualizing query: {e}")
+            logger.error("Error contextualizing query: %s", e)
             return query
     
     async def generate_answer_with_memory(
         self, 
         query: str, 
         context_docs: List[Dict[str, Any]],
-        conversation_history: List[Dict[str, str]]
+        conversation_history: List[Dict[str, str]],
+        timeout: Optional[float] = None,
+        max_tokens: Optional[int] = None
     ) -> str:
         context_text = ""
-        for i, doc in enumerate(context_docs[:5], 1):
+        for i, doc in enumerate(context_docs[:settings.context_max_docs], 1):
             context_text += f"\nProducto {i}:\n"
             context_text += f"Nombre: {doc.get('name', 'N/A')}\n"
             context_text += f"Descripción: {doc.get('description', 'N/A')}\n"
@@ -128,20 +333,23 @@ class LLMService:
                 """
         
         try:
-            response = self.client.chat.completions.create(
-                model=settings.azure_openai_deployment_name,
+            tier = self._choose_tier("answer", query, len(context_docs), len(conversation_history or []))
+            return await self._chat(
+                tier,
                 messages=[
                     {"role": "system", "content": "Eres un asistente experto en productos que mantiene conversaciones naturales y contextuales."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.2,
-                max_tokens=600
+                max_tokens=min(tier.max_tokens, max_tokens or tier.max_tokens),
+                timeout=timeout
             )
-            
-            return response.choices[0].message.content.strip()
         
+        except CircuitOpenError:
+            # The graph answers from the retrieved products instead
+            raise
         except Exception as e:
-            logger.error(f"Error generating response: {e}")
+            logger.error("Error generating response: %s", e)
             return "Lo siento, hubo un error al generar la respuesta."
     
     async def evaluate_answer(self, query: str, answer: str, context_docs: List[Dict]) -> Dict[str, Any]:
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Event-loop lag monitor with an optional blocking-call detector.
+
+    A task sleeps ``interval`` seconds in a loop; how late each wake-up is
+    becomes a lag sample, and samples above ``block_threshold`` count as
+    stalls. In debug mode a watchdog thread also checks the task's heartbeat
+    and, when the loop has not come back for ``block_threshold``, captures the
+    loop thread's stack while it is still blocked, pointing at the sync call
+    that stalled every request on the worker.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        block_threshold: float = 0.1,
+        debug: bool = False,
+        max_samples: int = 600,
+        max_captures: int = 20
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.debug = debug
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.stalls = 0
+        self.captures: Deque[Dict[str, Any]] = deque(maxlen=max_captures)
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self._beat = 0.0
+        self._reported_beat = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        if self.debug:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            self.record((self._beat - start - self.interval) * 1000)
+
+    def record(self, lag_ms: float) -> None:
+        lag_ms = max(lag_ms, 0.0)
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self._samples.append(lag_ms)
+        if lag_ms >= self.block_threshold * 1000:
+            self.stalls += 1
+            if not self.debug:
+                logger.warning(f"Event loop blocked for {lag_ms:.0f}ms")
+
+    def _watch(self) -> None:
+        # Checking several times per threshold keeps the capture close to the start of the stall
+        check_every = max(self.block_threshold / 4, 0.005)
+        while not self._stopped.wait(check_every):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked >= self.block_threshold and beat != self._reported_beat:
+                self._reported_beat = beat
+                self._capture(blocked * 1000)
+
+    def _capture(self, blocked_ms: float) -> None:
+        """Stack of the loop thread, taken from the watchdog while the loop is blocked"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.format_stack(frame)
+        task = asyncio.current_task(self._loop)
+        capture = {
+            "at": time.time(),
+            "blocked_ms": round(blocked_ms, 1),
+            "task": task.get_name() if task is not None else None,
+            "stack": [line.rstrip() for line in stack],
+        }
+        self.captures.append(capture)
+        logger.warning(
+            f"Event loop blocked for over {blocked_ms:.0f}ms in task {capture['task']}:\n{''.join(stack)}"
+        )
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 2)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "running": self._task is not None,
+            "lag_ms": {
+                "last": round(self.last_lag_ms, 2),
+                "p50": self.percentile(0.5),
+                "p99": self.percentile(0.99),
+                "max": round(self.max_lag_ms, 2),
+            },
+            "stalls": self.stalls,
+            "block_threshold_ms": self.block_threshold * 1000,
+        }
+        if self.debug:
+            stats["blocking_calls"] = list(self.captures)
+        return stats
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.loop_monitor_interval_ms / 1000,
+    block_threshold=settings.loop_monitor_block_threshold_ms / 1000,
+    debug=settings.loop_monitor_debug
+)
@@ -0,0 +1,146 @@
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Questions that need reasoning across products rather than a quick rewrite or description
+COMPLEX_QUERY_PATTERN = re.compile(r"\b(compar\w*|diferencia\w*|versus|vs|mejor(es)?|recomienda\w*|cual elegir|pros|contras)\b", re.IGNORECASE)
+
+# Weight of the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA = 0.2
+
+
+@dataclass
+class ModelTier:
+    name: str
+    deployment: str
+    max_tokens: int
+    latency_ewma_ms: Optional[float] = None
+    calls: int = 0
+    errors: int = 0
+    throttled: int = 0
+    throttled_until: float = 0.0
+    # While the tier is too slow, one call per probe interval still goes to it to refresh its latency
+    probe_at: float = 0.0
+    probing: bool = False
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=500))
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.throttled_until
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class ModelRouter:
+    """Picks a chat deployment per call from task, query complexity and each tier's recent latency/throttling"""
+
+    def __init__(self, tiers: List[ModelTier], max_latency_ms: float = 8000.0, slow_probe_seconds: float = 30.0):
+        self.tiers = {tier.name: tier for tier in tiers}
+        self.max_latency_ms = max_latency_ms
+        self.slow_probe_seconds = slow_probe_seconds
+
+    def preferred_tier(self, task: str, query: str, num_products: int = 0, history_turns: int = 0) -> str:
+        if task == "rewrite":
+            return "fast"
+        if (
+            COMPLEX_QUERY_PATTERN.search(query)
+            or len(query.split()) >= settings.model_routing_complex_query_words
+            or num_products >= settings.model_routing_many_products
+            or history_turns >= settings.model_routing_long_history
+        ):
+            return "strong"
+        return "fast"
+
+    def other_tier(self, tier: ModelTier) -> Optional[ModelTier]:
+        """The tier to spill over to, or None when both tiers share a deployment"""
+        other = self.tiers["strong" if tier.name == "fast" else "fast"]
+        return other if other.deployment != tier.deployment else None
+
+    def choose(self, task: str, query: str, num_products: int = 0, history_turns: int = 0) -> ModelTier:
+        tier = self.tiers[self.preferred_tier(task, query, num_products, history_turns)]
+        other = self.other_tier(tier)
+        if other is None:
+            return tier
+
+        # Spill over to the other tier while the preferred one is throttled or too slow
+        slow = tier.latency_ewma_ms is not None and tier.latency_ewma_ms > self.max_latency_ms
+        if slow and tier.available and other.available:
+            # A tier that gets no calls never gets faster: probe it now and then
+            now = time.monotonic()
+            if now < tier.probe_at:
+                return other
+            tier.probe_at = now + self.slow_probe_seconds
+            tier.probing = True
+            return tier
+        if not tier.available and other.available:
+            return other
+        return tier
+
+    def record(self, tier: ModelTier, latency_ms: float, error: Optional[Exception] = None) -> None:
+        tier.calls += 1
+        tier.latencies.append(latency_ms)
+        probe, tier.probing = tier.probing, False
+        if tier.latency_ewma_ms is None or (probe and error is None):
+            # A successful probe's latency replaces the stale average instead of nudging it
+            tier.latency_ewma_ms = latency_ms
+        else:
+            tier.latency_ewma_ms += LATENCY_EWMA_ALPHA * (latency_ms - tier.latency_ewma_ms)
+
+        if error is not None:
+            tier.errors += 1
+            status_code = getattr(error, "status_code", None)
+            if status_code == 429:
+                tier.throttled += 1
+                tier.throttled_until = time.monotonic() + self._retry_after(error)
+                logger.warning(f"Deployment {tier.deployment} ({tier.name} tier) throttled")
+
+    def _retry_after(self, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after", settings.model_routing_throttle_seconds))
+        except (TypeError, ValueError):
+            return settings.model_routing_throttle_seconds
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "deployment": tier.deployment,
+                "calls": tier.calls,
+                "errors": tier.errors,
+                "throttled": tier.throttled,
+                "available": tier.available,
+                "latency_ewma_ms": tier.latency_ewma_ms,
+                "p50_ms": tier.percentile(0.5),
+                "p95_ms": tier.percentile(0.95),
+            }
+            for name, tier in self.tiers.items()
+        }
+
+
+model_router = ModelRouter(
+    [
+        ModelTier(
+            name="fast",
+            deployment=settings.chat_fast_deployment or settings.azure_openai_deployment_name,
+            max_tokens=settings.chat_fast_max_tokens
+        ),
+        ModelTier(
+            name="strong",
+            deployment=settings.chat_strong_deployment or settings.azure_openai_deployment_name,
+            max_tokens=settings.chat_strong_max_tokens
+        ),
+    ],
+    max_latency_ms=settings.model_routing_max_latency_ms,
+    slow_probe_seconds=settings.model_routing_slow_probe_seconds
+)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.core.config import settings
+from app.graph.builder import get_rag_agent
+from app.services.database import ProductHit, db_service
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+
+def initial_state(
+    query: str,
+    conversation_history: List[Dict[str, str]],
+    prefetched_docs: Optional[List[ProductHit]] = None,
+    deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    return {
+        "original_query": query,
+        "conversation_history": conversation_history,
+        "query_plan": [],
+        "retrieved_docs": [],
+        "prefetched_docs": prefetched_docs,
+        "lookup_intents": None,
+        "generated_answer": "",
+        "final_answer": "",
+        "evaluation_result": {},
+        "confidence_score": 0.0,
+        "processing_steps": [],
+        "error_messages": [],
+        "start_time": time.time(),
+        "end_time": None,
+        "deadline": deadline,
+        "max_retries": 1,
+        "current_retry": 0
+    }
+
+
+def build_query_response(
+    query: str,
+    conversation_history: List[Dict[str, str]],
+    result: Dict[str, Any],
+    include_history: bool = True,
+    max_sources: Optional[int] = None
+) -> Dict[str, Any]:
+    """QueryResponse as a plain dict, trimmed to the fields the client asked for"""
+    docs = result.get("retrieved_docs", [])
+    if max_sources is not None:
+        docs = docs[:max_sources]
+
+    sources = []
+    for doc in docs:
+        sources.append({
+            "product_id": doc.get("product_id", doc.get("id", "")),
+            "product_name": doc.get("name", ""),
+            "relevance_score": float(doc.get("combined_score", doc.get("similarity_score", 0.0))),
+            "content_snippet": doc.get("content", f"{doc.get('name', '')} - {doc.get('description', '')}")[:200]
+        })
+
+    response = {
+        "query": query,
+        "answer": result["final_answer"],
+        "sources": sources,
+        "confidence_score": float(result.get("confidence_score", 0.0)),
+        "processing_time_ms": int(((result.get("end_time") or 0) - (result.get("start_time") or 0)) * 1000)
+    }
+    if include_history:
+        response["conversation_history"] = conversation_history + [
+            {"role": "user", "content": query},
+            {"role": "assistant", "content": result["final_answer"]}
+        ]
+    return response
+
+
+async def run_batch(
+    queries: List[Dict[str, Any]],
+    search_concurrency: Optional[int] = None,
+    agent_concurrency: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Answer many queries, yielding each result (tagged with its index) as soon as it is ready.
+
+    Query embeddings are generated in batched Azure calls up front, hybrid
+    searches run with ``search_concurrency`` and the RAG graph runs on the
+    prefetched documents with ``agent_concurrency``, so the slow LLM stage
+    never holds database connections.
+    """
+    search_limit = asyncio.Semaphore(search_concurrency or settings.batch_search_concurrency)
+    agent_limit = asyncio.Semaphore(agent_concurrency or settings.batch_agent_concurrency)
+
+    try:
+        embeddings = await llm_service.generate_embeddings([item["query"] for item in queries])
+    except Exception as e:
+        # Each item falls back to embedding its own query inside the graph
+        logger.error(f"Batch embedding failed, embedding per query: {e}")
+        embeddings = [None] * len(queries)
+
+    async def answer(index: int, item: Dict[str, Any], embedding: Optional[List[float]]) -> Dict[str, Any]:
+        history = item.get("conversation_history") or []
+        try:
+            docs = None
+            if embedding is not None:
+                async with search_limit:
+                    docs = await db_service.hybrid_search(
+                        query_embedding=embedding,
+                        query_text=item["query"],
+                        top_k=settings.rerank_top_k
+                    )
+
+            async with agent_limit:
+                result = await get_rag_agent().ainvoke(initial_state(item["query"], history, docs))
+
+            response = build_query_response(
+                item["query"], history, result,
+                include_history=item.get("include_history", True),
+                max_sources=item.get("max_sources")
+            )
+            return {"index": index, **response}
+        except Exception as e:
+            logger.error(f"Error processing batch query {index}: {e}")
+            return {"index": index, "query": item["query"], "error": str(e)}
+
+    tasks = [
+        asyncio.create_task(answer(index, item, embedding))
+        for index, (item, embedding) in enumerate(zip(queries, embeddings))
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # Client went away or the consumer stopped early
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,111 @@
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Zero when the replica has replayed everything it received, otherwise the age of the last replayed commit
+REPLICATION_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+@dataclass
+class Replica:
+    dsn: str
+    healthy: bool = True
+    lag_seconds: float = 0.0
+    last_error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Host and port only, safe for logs and metrics"""
+        parsed = urlparse(self.dsn)
+        return f"{parsed.hostname}:{parsed.port or 5432}"
+
+
+class ReplicaRouter:
+    """Round-robin over healthy read replicas with periodic lag checks"""
+
+    def __init__(self, dsns: List[str], max_lag_seconds: float = 10.0, check_interval: float = 15.0):
+        self.replicas = [Replica(dsn=dsn) for dsn in dsns]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[Replica]:
+        """Next healthy replica, or None when reads must go to the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_unhealthy(self, replica: Replica, error: str) -> None:
+        if replica.healthy:
+            logger.warning(f"Read replica {replica.name} marked unhealthy: {error}")
+        replica.healthy = False
+        replica.last_error = error
+
+    async def connect(self, replica: Replica) -> asyncpg.Connection:
+        return await asyncpg.connect(replica.dsn, ssl='require', timeout=5)
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            conn = await self.connect(replica)
+            try:
+                lag = float(await conn.fetchval(REPLICATION_LAG_SQL))
+            finally:
+                await conn.close()
+        except Exception as e:
+            self.mark_unhealthy(replica, str(e))
+            return
+
+        replica.lag_seconds = lag
+        if lag > self.max_lag_seconds:
+            self.mark_unhealthy(replica, f"replication lag {lag:.1f}s")
+            return
+
+        if not replica.healthy:
+            logger.info(f"Read replica {replica.name} is healthy again")
+        replica.healthy = True
+        replica.last_error = None
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "replica": replica.name,
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag_seconds,
+                "last_error": replica.last_error,
+            }
+            for replica in self.replicas
+        ]
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional, Set
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# EXPLAIN ANALYZE runs the query a second time, so capture at most one plan per statement per interval
+EXPLAIN_MIN_INTERVAL_SECONDS = 60.0
+
+
+@dataclass
+class StatementTiming:
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    slow_calls: int = 0
+
+    def record(self, elapsed_ms: float, slow: bool) -> None:
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if slow:
+            self.slow_calls += 1
+
+
+class StatementRegistry:
+    """Named hot queries with per-statement timings.
+
+    asyncpg keeps a per-connection cache of server-side prepared statements
+    keyed by query text, so each registered query is parsed and planned once
+    per pooled connection (the pools keep cached statements for the life of
+    the connection). Because every call goes through ``fetch`` we get
+    timings per statement. When ``explain_threshold_ms`` is set, calls slower
+    than it get their plan captured with ``EXPLAIN (ANALYZE, BUFFERS)`` in
+    the background, on a connection from ``explain_connection``.
+    """
+
+    def __init__(
+        self,
+        explain_threshold_ms: float = 0.0,
+        explain_connection: Optional[Callable[[], AsyncContextManager[asyncpg.Connection]]] = None
+    ):
+        self.queries: Dict[str, str] = {}
+        self.timings: Dict[str, StatementTiming] = {}
+        self.plans: Dict[str, Dict[str, Any]] = {}
+        self.explain_threshold_ms = explain_threshold_ms
+        self.explain_connection = explain_connection
+        self._explaining: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def register(self, name: str, query: str) -> None:
+        self.queries[name] = query
+        self.timings.setdefault(name, StatementTiming())
+
+    async def fetch(self, conn: asyncpg.Connection, name: str, *args) -> List[asyncpg.Record]:
+        query = self.queries[name]
+        start = time.perf_counter()
+        rows = await conn.fetch(query, *args)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        slow = bool(self.explain_threshold_ms) and elapsed_ms >= self.explain_threshold_ms
+        self.timings[name].record(elapsed_ms, slow)
+        if slow:
+            self._schedule_plan(name, args, elapsed_ms)
+        return rows
+
+    def _schedule_plan(self, name: str, args: tuple, elapsed_ms: float) -> None:
+        """Capture the plan off the request path: EXPLAIN ANALYZE runs the slow query again"""
+        if self.explain_connection is None or name in self._explaining:
+            return
+        last = self.plans.get(name)
+        if last is not None and time.time() - last["captured_at"] < EXPLAIN_MIN_INTERVAL_SECONDS:
+            return
+
+        self._explaining.add(name)
+        task = asyncio.create_task(self._capture_plan(name, args, elapsed_ms))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _capture_plan(self, name: str, args: tuple, elapsed_ms: float) -> None:
+        try:
+            async with self.explain_connection() as conn:
+                plan = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {self.queries[name]}", *args)
+        except Exception as e:
+            logger.error(f"Error capturing plan for statement {name}: {e}")
+            return
+        finally:
+            self._explaining.discard(name)
+
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        self.plans[name] = {"captured_at": time.time(), "elapsed_ms": elapsed_ms, "plan": plan}
+        logger.warning(f"Slow statement {name} took {elapsed_ms:.1f}ms, plan captured")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for name, timing in self.timings.items():
+            plan: Optional[Dict[str, Any]] = self.plans.get(name)
+            stats[name] = {
+                "calls": timing.calls,
+                "avg_ms": timing.total_ms / timing.calls if timing.calls else 0.0,
+                "max_ms": timing.max_ms,
+                "slow_calls": timing.slow_calls,
+                "last_plan": plan,
+            }
+        return stats
@@ -0,0 +1,196 @@
+import asyncio
+import bisect
+import logging
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.cache import TTLCache
+from app.services.database import DatabaseService, db_service
+
+logger = logging.getLogger(__name__)
+
+# Bounds the work of one lookup for very short prefixes ("a", "s") on large catalogs
+MAX_PREFIX_SCAN = 1000
+
+SUGGEST_SOURCE_SQL = """
+    SELECT name, category, stock_quantity
+    FROM products
+    WHERE deleted_at IS NULL
+"""
+
+# Served by products_name_trgm_idx (migrations/004_suggest_trigram_index.sql)
+SUGGEST_FUZZY_SQL = """
+    SELECT name, similarity(name, $1) AS score
+    FROM products
+    WHERE deleted_at IS NULL AND name % $1
+    ORDER BY score DESC, name
+    LIMIT $2
+"""
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace so "Electrónicos" matches "electro" """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", text))
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    text: str
+    kind: str  # "product" | "category"
+    # Higher first: products in stock and categories with more products
+    weight: int = 0
+
+
+class PrefixIndex:
+    """Sorted prefix index over product names and categories.
+
+    Every word of a name starts a key ("macbook air m2", "air m2", "m2"), so
+    typing any word of the name finds it. Keys live in one sorted list and a
+    prefix lookup is a bisect plus a scan of the matching range, which keeps
+    memory close to the raw strings (a node-per-character trie in Python
+    takes several times more).
+    """
+
+    def __init__(self, suggestions: List[Suggestion]):
+        self.suggestions = suggestions
+        self._texts = [normalize(suggestion.text) for suggestion in suggestions]
+        entries: List[Tuple[str, int]] = []
+        for position, text in enumerate(self._texts):
+            words = text.split()
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), position))
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._positions = [position for _, position in entries]
+
+    def __len__(self) -> int:
+        return len(self.suggestions)
+
+    def search(self, prefix: str, limit: int) -> List[Suggestion]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        # Key rank: 0 when the text itself starts with the prefix, 1 when a later word does
+        ranked: Dict[int, int] = {}
+        index = bisect.bisect_left(self._keys, prefix)
+        end = min(index + MAX_PREFIX_SCAN, len(self._keys))
+        while index < end and self._keys[index].startswith(prefix):
+            position = self._positions[index]
+            starts_text = self._texts[position].startswith(prefix)
+            ranked[position] = min(ranked.get(position, 1), 0 if starts_text else 1)
+            index += 1
+
+        order = sorted(
+            ranked,
+            key=lambda position: (
+                ranked[position],
+                -self.suggestions[position].weight,
+                len(self.suggestions[position].text),
+                self.suggestions[position].text
+            )
+        )
+        return [self.suggestions[position] for position in order[:limit]]
+
+
+class SuggestService:
+    """Typeahead suggestions from an in-memory index with a pg_trgm fallback for typos"""
+
+    def __init__(self, db: DatabaseService):
+        self.db = db
+        self.index: Optional[PrefixIndex] = None
+        self.built_at: Optional[float] = None
+        self.fuzzy_cache = TTLCache(settings.suggest_cache_size, settings.suggest_cache_ttl_seconds, name="suggest_fuzzy")
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.db.statements.register("suggest_fuzzy", SUGGEST_FUZZY_SQL)
+        self.db.add_change_listener(self.on_catalog_change)
+
+    async def refresh(self) -> PrefixIndex:
+        """Rebuild the index from the catalog"""
+        async with self._refresh_lock:
+            start = time.perf_counter()
+            async with self.db.read_connection() as conn:
+                rows = await conn.fetch(SUGGEST_SOURCE_SQL)
+
+            names: Dict[str, int] = {}
+            categories: Dict[str, int] = {}
+            for row in rows:
+                in_stock = 1 if (row["stock_quantity"] or 0) > 0 else 0
+                names[row["name"]] = max(names.get(row["name"], 0), in_stock)
+                if row["category"]:
+                    categories[row["category"]] = categories.get(row["category"], 0) + 1
+
+            suggestions = [Suggestion(name, "product", weight) for name, weight in names.items()]
+            suggestions += [Suggestion(category, "category", count) for category, count in categories.items()]
+            # Build off the event loop: large catalogs take tens of milliseconds to sort
+            self.index = await asyncio.to_thread(PrefixIndex, suggestions)
+            self.built_at = time.time()
+            logger.info(f"Suggest index built with {len(suggestions)} entries in {(time.perf_counter() - start) * 1000:.0f}ms")
+            return self.index
+
+    def on_catalog_change(self, product_ids: List[str]) -> None:
+        """Catalog listener: rebuild shortly after a write, coalescing bursts of writes into one rebuild"""
+        self.fuzzy_cache.clear()
+        if self.index is None or (self._refresh_task is not None and not self._refresh_task.done()):
+            return
+        try:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._delayed_refresh())
+        except RuntimeError:
+            # No loop (scripts, tests): the next request rebuilds
+            self.index = None
+
+    async def _delayed_refresh(self) -> None:
+        await asyncio.sleep(settings.suggest_refresh_delay_seconds)
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Error refreshing suggest index: {e}")
+
+    async def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        index = self.index or await self.refresh()
+        results = [
+            {"text": suggestion.text, "type": suggestion.kind, "source": "prefix"}
+            for suggestion in index.search(prefix, limit)
+        ]
+
+        prefix = prefix.strip()
+        if len(results) < limit and len(prefix) >= settings.suggest_fuzzy_min_chars:
+            seen = {result["text"] for result in results}
+            for fuzzy in await self._fuzzy(prefix, limit):
+                if fuzzy["text"] not in seen and len(results) < limit:
+                    results.append(fuzzy)
+        return results
+
+    async def _fuzzy(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        key = (prefix.lower(), limit)
+        cached = self.fuzzy_cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            async with self.db.read_connection() as conn:
+                rows = await self.db.statements.fetch(conn, "suggest_fuzzy", prefix, limit)
+        except Exception as e:
+            # Typeahead degrades to prefix matches only
+            logger.warning(f"Fuzzy suggest failed: {e}")
+            return []
+
+        results = [{"text": row["name"], "type": "product", "source": "fuzzy"} for row in rows]
+        self.fuzzy_cache.set(key, results)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.index) if self.index is not None else 0,
+            "built_at": self.built_at,
+            "fuzzy_cache": self.fuzzy_cache.stats(),
+        }
+
+
+suggest_service = SuggestService(db_service)
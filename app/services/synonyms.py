@@ -0,0 +1,212 @@
+"""Search synonyms and score boosts, loaded from a JSON dictionary.
+
+The dictionary (``app/data/search_synonyms.json`` unless ``SEARCH_SYNONYMS_PATH``
+points elsewhere) has two sections::
+
+    {
+      "synonyms": [{"match": ["laptop", "dia a dia"], "expand": ["notebook", "macbook"]}],
+      "boosts": [{"query": ["laptop"], "category": ["tecnologia"], "name": ["macbook"], "factor": 1.5}]
+    }
+
+A synonym group adds its ``expand`` terms to the full-text query when any of
+its ``match`` terms appears in it. A boost multiplies the combined score of a
+hit when every condition it sets holds (query term, category word, name word);
+the first boost that applies to a hit wins. Terms are compared without case
+or accents and a trailing plural "s"/"es" in the text is ignored.
+
+Every term is compiled into one token map, so matching costs a few dict
+lookups per query token however large the dictionary grows. The file is
+re-read when its modification time changes.
+"""
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNONYMS_PATH = Path(__file__).resolve().parent.parent / "data" / "search_synonyms.json"
+
+
+def normalize_tokens(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"\w+", text)
+
+
+def token_variants(token: str) -> Tuple[str, ...]:
+    """The token and its singular guesses: "laptops" -> laptop, "celulares" -> celular"""
+    if len(token) > 3 and token.endswith("es"):
+        return (token, token[:-1], token[:-2])
+    if len(token) > 3 and token.endswith("s"):
+        return (token, token[:-1])
+    return (token,)
+
+
+class TermMatcher:
+    """Finds the payloads of every dictionary term present in a text in one pass over its tokens"""
+
+    def __init__(self):
+        self._words: Dict[str, Set[Hashable]] = defaultdict(set)
+        # Multi-word terms, keyed by their first token
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], Hashable]]] = defaultdict(list)
+
+    def add(self, term: str, payload: Hashable) -> None:
+        tokens = tuple(normalize_tokens(term))
+        if len(tokens) == 1:
+            self._words[tokens[0]].add(payload)
+        elif tokens:
+            self._phrases[tokens[0]].append((tokens, payload))
+
+    def find(self, text: str) -> Set[Hashable]:
+        return self.find_tokens(normalize_tokens(text))
+
+    def find_tokens(self, tokens: List[str]) -> Set[Hashable]:
+        found: Set[Hashable] = set()
+        for position, token in enumerate(tokens):
+            for variant in token_variants(token):
+                found.update(self._words.get(variant, ()))
+            for phrase, payload in self._phrases.get(token, ()):
+                if tuple(tokens[position:position + len(phrase)]) == phrase:
+                    found.add(payload)
+        return found
+
+
+@dataclass(frozen=True)
+class BoostRule:
+    factor: float
+    needs_query: bool
+    needs_category: bool
+    needs_name: bool
+
+
+class SynonymDictionary:
+    """Compiled synonyms/boosts with hot reload from the dictionary file"""
+
+    def __init__(self, path: Optional[str] = None, reload_interval: float = 5.0):
+        self.path = Path(path) if path else DEFAULT_SYNONYMS_PATH
+        self.reload_interval = reload_interval
+        # Part of the search cache key, so results computed with an older dictionary are not served
+        self.version = 0
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._expansions: List[Tuple[str, ...]] = []
+        self._rules: List[BoostRule] = []
+        self._unconditional: FrozenSet[int] = frozenset()
+        self._query_matcher = TermMatcher()
+        self._category_matcher = TermMatcher()
+        self._name_matcher = TermMatcher()
+        self.reload()
+
+    def load(self, data: Dict[str, Any]) -> None:
+        """Compile a dictionary and swap it in"""
+        expansions: List[Tuple[str, ...]] = []
+        rules: List[BoostRule] = []
+        query_matcher, category_matcher, name_matcher = TermMatcher(), TermMatcher(), TermMatcher()
+
+        for group in data.get("synonyms", []):
+            group_id = len(expansions)
+            expansions.append(tuple(group.get("expand", [])))
+            for term in group.get("match", []):
+                query_matcher.add(term, ("synonym", group_id))
+
+        for boost in data.get("boosts", []):
+            rule_id = len(rules)
+            rules.append(BoostRule(
+                factor=float(boost["factor"]),
+                needs_query=bool(boost.get("query")),
+                needs_category=bool(boost.get("category")),
+                needs_name=bool(boost.get("name"))
+            ))
+            for term in boost.get("query", []):
+                query_matcher.add(term, ("boost", rule_id))
+            for term in boost.get("category", []):
+                category_matcher.add(term, rule_id)
+            for term in boost.get("name", []):
+                name_matcher.add(term, rule_id)
+
+        # Swap everything at once; searches in flight keep the matchers they already read
+        self._expansions, self._rules = expansions, rules
+        self._unconditional = frozenset(
+            rule_id for rule_id, rule in enumerate(rules)
+            if not (rule.needs_query or rule.needs_category or rule.needs_name)
+        )
+        self._query_matcher, self._category_matcher, self._name_matcher = query_matcher, category_matcher, name_matcher
+        self.version += 1
+
+    def reload(self) -> bool:
+        """Re-read the file if it changed; a broken file keeps the previous dictionary"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.error(f"Error loading search synonyms from {self.path}: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+
+        # Remember the mtime even if loading fails so a broken file is reported once, not on every check
+        self._mtime = mtime
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.load(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Error loading search synonyms from {self.path}: {e}")
+            return False
+
+        logger.info(f"Loaded {len(self._expansions)} synonym groups and {len(self._rules)} boosts from {self.path}")
+        return True
+
+    def maybe_reload(self) -> None:
+        """Stat the file at most once per reload interval"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            self.reload()
+
+    def match_query(self, query: str) -> FrozenSet[Hashable]:
+        self.maybe_reload()
+        return frozenset(self._query_matcher.find(query))
+
+    def expand(self, query: str, matches: Optional[Iterable[Hashable]] = None) -> str:
+        """The query plus the expansion terms of every synonym group it mentions"""
+        if matches is None:
+            matches = self.match_query(query)
+
+        expansions = self._expansions
+        terms = [query]
+        for kind, group_id in matches:
+            if kind == "synonym" and group_id < len(expansions):
+                terms.extend(expansions[group_id])
+        return " ".join(dict.fromkeys(terms))
+
+    def boost(self, matches: FrozenSet[Hashable], name: str, category: str) -> float:
+        """Score factor of the first boost rule that applies to a hit"""
+        rules = self._rules
+        name_rules = self._name_matcher.find(name)
+        category_rules = self._category_matcher.find(category)
+        query_rules = {payload[1] for payload in matches if payload[0] == "boost"}
+        # Only rules one of the texts mentions can apply, in dictionary order
+        candidates = sorted(name_rules | category_rules | query_rules | self._unconditional)
+        for rule_id in candidates:
+            # ``matches`` may come from a dictionary reloaded since
+            if rule_id >= len(rules):
+                break
+            rule = rules[rule_id]
+            if rule.needs_query and rule_id not in query_rules:
+                continue
+            if rule.needs_category and rule_id not in category_rules:
+                continue
+            if rule.needs_name and rule_id not in name_rules:
+                continue
+            return rule.factor
+        return 1.0
+
+
+search_synonyms = SynonymDictionary(settings.search_synonyms_path, settings.search_synonyms_reload_seconds)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.graph.builder import get_rag_agent
+from app.services.database import db_service
+from app.services.llm_service import llm_service
+from app.services.suggest import suggest_service
+
+logger = logging.getLogger(__name__)
+
+
+async def _compile_graph() -> None:
+    await asyncio.to_thread(get_rag_agent)
+
+
+async def _probe_azure() -> None:
+    await llm_service.generate_embedding("warm-up")
+
+
+class WarmupService:
+    """Runs the warm-up steps and tracks whether this worker is ready for traffic"""
+
+    def __init__(self):
+        self.ready = False
+        self.checks: Dict[str, str] = {}
+        self.warmed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def steps(self) -> List[Tuple[str, Callable[[], Awaitable[None]]]]:
+        steps = [
+            ("tokenizer", llm_service.warm_up),
+            ("graph", _compile_graph),
+            ("database", db_service.warm_up),
+            ("suggest_index", suggest_service.refresh),
+        ]
+        if settings.warmup_azure_probe:
+            steps.append(("azure_openai", _probe_azure))
+        return steps
+
+    async def warm_up(self) -> bool:
+        """Run every step once; the worker is ready only if all of them pass"""
+        start = time.perf_counter()
+
+        for name, step in self.steps():
+            if self.checks.get(name) == "ok":
+                continue
+            try:
+                await step()
+                self.checks[name] = "ok"
+            except Exception as e:
+                logger.error(f"Warm-up step {name} failed: {e}")
+                self.checks[name] = f"error: {e}"
+
+        self.ready = all(status == "ok" for status in self.checks.values())
+        if self.ready:
+            self.warmed_at = time.time()
+            logger.info(f"Warm-up completed in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return self.ready
+
+    async def start(self) -> None:
+        """Warm up during startup; keep retrying in the background if it doesn't finish in time"""
+        try:
+            if await asyncio.wait_for(self.warm_up(), settings.warmup_timeout_seconds):
+                return
+        except asyncio.TimeoutError:
+            logger.error(f"Warm-up did not finish within {settings.warmup_timeout_seconds}s")
+
+        self._task = asyncio.create_task(self._retry())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _retry(self) -> None:
+        while not self.ready:
+            await asyncio.sleep(settings.warmup_retry_interval_seconds)
+            await self.warm_up()
+
+    async def readiness(self) -> Dict[str, Any]:
+        """Warm-up state plus a live database check"""
+        if not self.ready:
+            return {"ready": False, "checks": dict(self.checks)}
+
+        checks = dict(self.checks)
+        try:
+            await db_service.ping()
+            checks["database"] = "ok"
+        except Exception as e:
+            checks["database"] = f"error: {e}"
+
+        return {"ready": checks["database"] == "ok", "checks": checks}
+
+
+warmup_service = WarmupService()
@@ -3,6 +3,8 @@ import type {
   ChatResponse, 
   Product, 
   ProductIngestResponse, 
+  IngestJobAccepted,
+  IngestJobStatus,
   User, 
   Conversation,
   Message
@@ -14,7 +16,7 @@ const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 // Create axios instance with default config
 const api = axios.create({
   baseURL: API_BASE_URL,
-  timeout: 60000, // Increased to 60 seconds for product ingestion with Azure OpenAI
+  timeout: 60000,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -90,11 +92,33 @@ export const chatApi = {
   },
 };
 
+const INGEST_POLL_INTERVAL_MS = 1000;
+const INGEST_POLL_TIMEOUT_MS = 120000;
+
 export const productApi = {
-  // Ingest new product
+  // Ingest new product: the backend queues it (202) and we poll the job until it finishes
   async ingestProduct(product: Product): Promise<ProductIngestResponse> {
-    const response = await api.post('/ingest', product);
-    return response.data;
+    const { data: accepted } = await api.post<IngestJobAccepted>('/ingest', product);
+    const deadline = Date.now() + INGEST_POLL_TIMEOUT_MS;
+
+    while (Date.now() < deadline) {
+      const { data: job } = await api.get<IngestJobStatus>(accepted.status_url);
+
+      if (job.status === 'completed') {
+        return {
+          product_id: job.product_ids[0],
+          message: 'Product ingested successfully',
+          status: 'success',
+        };
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.errors[0] || 'Product ingestion failed');
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, INGEST_POLL_INTERVAL_MS));
+    }
+
+    throw new Error('Product ingestion is taking longer than expected');
   },
 
 };
@@ -54,6 +54,24 @@ export interface ProductIngestResponse {
   status: string;
 }
 
+export interface IngestJobAccepted {
+  job_id: string;
+  status: string;
+  status_url: string;
+}
+
+export interface IngestJobStatus {
+  job_id: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  total: number;
+  processed: number;
+  failed: number;
+  product_ids: string[];
+  errors: string[];
+  created_at: number;
+  finished_at?: number | null;
+}
+
 export interface ChatState {
   user_id: string | null;
   conversation_id: string | null;
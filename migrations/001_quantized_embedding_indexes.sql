@@ -0,0 +1,32 @@
+-- Quantized ANN indexes for products.embedding
+--
+-- The float column stays as the source of truth (it is used for the exact
+-- re-rank); only the ANN index is built over a quantized expression, so it
+-- takes half (halfvec) or 1/32 (binary) of the memory of a float index.
+--
+-- Requires pgvector >= 0.7.0. Build the index matching EMBEDDING_STORAGE,
+-- deploy the setting, then drop the old float index.
+--
+-- The 1536 in the casts below must equal EMBEDDING_DIMENSIONS (the size of
+-- products.embedding): the search queries cast with that setting, and the
+-- planner only uses an expression index whose expression matches exactly.
+-- With another embedding model, replace every 1536 before running this file.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- EMBEDDING_STORAGE=halfvec
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_embedding_halfvec_idx
+    ON products USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops);
+
+-- EMBEDDING_STORAGE=binary
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_embedding_binary_idx
+    ON products USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops);
+
+-- Once the new mode is live, the full-precision index can be dropped:
+-- DROP INDEX CONCURRENTLY IF EXISTS products_embedding_idx;
+
+-- Rollback (EMBEDDING_STORAGE=float):
+-- CREATE INDEX CONCURRENTLY IF NOT EXISTS products_embedding_idx
+--     ON products USING hnsw (embedding vector_cosine_ops);
+-- DROP INDEX CONCURRENTLY IF EXISTS products_embedding_halfvec_idx;
+-- DROP INDEX CONCURRENTLY IF EXISTS products_embedding_binary_idx;
@@ -0,0 +1,20 @@
+-- Incremental catalog sync (POST /products/sync)
+--
+-- external_id: client-supplied id used as the upsert key
+-- content_hash: sha256 of the embedded text (name, description, category);
+--               the embedding is only regenerated when it changes
+-- deleted_at:   set on products missing from a full snapshot; searches skip them
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS external_id TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+
+-- NULLs stay allowed for products created through POST /ingest without an external id
+-- Postgres has no ADD CONSTRAINT IF NOT EXISTS; check the catalog so the migration can be re-run
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'products_external_id_key') THEN
+        ALTER TABLE products ADD CONSTRAINT products_external_id_key UNIQUE (external_id);
+    END IF;
+END
+$$;
@@ -0,0 +1,30 @@
+-- Durable ingestion queue (INGEST_QUEUE_BACKEND=postgres)
+--
+-- Workers on every pod claim items with FOR UPDATE SKIP LOCKED, so an item
+-- is processed by exactly one worker and no worker blocks on another.
+
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    job_id TEXT PRIMARY KEY,
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS ingest_items (
+    item_id BIGSERIAL PRIMARY KEY,
+    job_id TEXT NOT NULL REFERENCES ingest_jobs (job_id) ON DELETE CASCADE,
+    item_index INTEGER NOT NULL,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued | processing | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    claimed_at TIMESTAMPTZ,
+    product_id TEXT,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS ingest_items_pending_idx
+    ON ingest_items (item_id) WHERE status IN ('queued', 'processing');
+CREATE INDEX IF NOT EXISTS ingest_items_job_idx ON ingest_items (job_id);
@@ -0,0 +1,11 @@
+-- Trigram index for fuzzy typeahead (GET /suggest)
+--
+-- Prefixes are served from an in-memory index on each worker; this index
+-- only backs the fallback for typos ("macbok"), which uses the % operator
+-- and similarity() from pg_trgm.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_name_trgm_idx
+    ON products USING gin (name gin_trgm_ops)
+    WHERE deleted_at IS NULL;
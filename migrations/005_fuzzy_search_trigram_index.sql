@@ -0,0 +1,19 @@
+-- Trigram indexes for the typo-tolerant lexical leg of hybrid search
+--
+-- Hybrid search falls back to pg_trgm word similarity over name and
+-- category when full-text search returns few hits ("macbok", "portatl").
+-- products_name_trgm_idx comes from 004_suggest_trigram_index.sql.
+--
+-- The match threshold is pg_trgm.word_similarity_threshold (default 0.6);
+-- lower it per database to tolerate more typos:
+--   ALTER DATABASE <db> SET pg_trgm.word_similarity_threshold = 0.5;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_name_trgm_idx
+    ON products USING gin (name gin_trgm_ops)
+    WHERE deleted_at IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_category_trgm_idx
+    ON products USING gin (category gin_trgm_ops)
+    WHERE deleted_at IS NULL;
@@ -0,0 +1,62 @@
+"""Run a file of canned questions through the RAG pipeline and write NDJSON results.
+
+The input has one question per line, either plain text or a JSON object with
+the same fields as a ``POST /query`` body. Results are written in completion
+order, each tagged with the ``index`` of its input line.
+
+Usage:
+    python -m scripts.batch_query questions.txt --output results.ndjson --agent-concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+import orjson
+
+from app.services.query_runner import run_batch
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            queries.append(json.loads(line) if line.startswith("{") else {"query": line})
+    for query in queries:
+        query.setdefault("include_history", False)
+    return queries
+
+
+async def main(path: str, output: str, search_concurrency: int, agent_concurrency: int):
+    queries = load_queries(path)
+    out = open(output, "wb") if output else sys.stdout.buffer
+    start = time.perf_counter()
+    errors = 0
+
+    try:
+        async for result in run_batch(queries, search_concurrency, agent_concurrency):
+            errors += "error" in result
+            out.write(orjson.dumps(result) + b"\n")
+            out.flush()
+    finally:
+        if output:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(queries)} queries, {errors} errors in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input")
+    parser.add_argument("--output", default="")
+    parser.add_argument("--search-concurrency", type=int, default=None)
+    parser.add_argument("--agent-concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.input, args.output, args.search_concurrency, args.agent_concurrency))
@@ -0,0 +1,130 @@
+"""Benchmark embedding storage modes: recall, latency and index memory.
+
+Uses stored product embeddings as queries, takes an exact float scan as the
+ground truth and compares every storage mode against it. Each mode runs with
+the ``hnsw.ef_search`` production would use, and modes whose ANN index
+doesn't exist are skipped (a sequential scan would report perfect recall).
+
+Usage:
+    python -m scripts.benchmark_embedding_storage --queries 200 --top-k 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Set
+
+from app.core.config import settings
+from app.services.database import HNSW_MAX_EF_SEARCH, db_service
+
+MODES = ["float", "halfvec", "binary"]
+
+# Operator class of the ANN index each mode's query can use (migrations/001_quantized_embedding_indexes.sql)
+INDEX_OPCLASSES = {"float": "vector_cosine_ops", "halfvec": "halfvec_cosine_ops", "binary": "bit_hamming_ops"}
+
+INDEX_SIZE_SQL = """
+    SELECT indexrelname, pg_relation_size(indexrelid) AS size_bytes
+    FROM pg_stat_user_indexes
+    WHERE relname = 'products' AND indexrelname LIKE 'products_embedding%'
+"""
+
+
+async def exact_top_k(conn, embedding: str, top_k: int) -> List[str]:
+    """Ground truth: full float scan without any index"""
+    async with conn.transaction():
+        await conn.execute("SET LOCAL enable_indexscan = off")
+        rows = await conn.fetch(
+            "SELECT product_id FROM products WHERE embedding IS NOT NULL AND deleted_at IS NULL "
+            "ORDER BY embedding <=> $1::vector LIMIT $2",
+            embedding, top_k
+        )
+    return [row["product_id"] for row in rows]
+
+
+async def indexed_modes(conn) -> Set[str]:
+    """Storage modes with an ANN index on products"""
+    definitions = [row["indexdef"] for row in await conn.fetch(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = 'products'"
+    )]
+    return {
+        mode for mode, opclass in INDEX_OPCLASSES.items()
+        if any(opclass in definition for definition in definitions)
+    }
+
+
+def ef_search_for(mode: str, top_k: int, candidates: int) -> int:
+    """hnsw.ef_search a search in this mode gets in DatabaseService.vector_search"""
+    rows_needed = candidates if mode != "float" else top_k
+    return min(max(settings.hnsw_ef_search, rows_needed), HNSW_MAX_EF_SEARCH)
+
+
+async def run_mode(conn, mode: str, queries: List[str], truth: Dict[str, List[str]], top_k: int) -> Dict[str, Any]:
+    sql = db_service._vector_search_sql(mode)
+    candidates = max(settings.quantized_candidates, top_k)
+    # The default of 40 would cut the candidate pool before the re-rank
+    ef_search = ef_search_for(mode, top_k, candidates)
+    await conn.execute(f"SET hnsw.ef_search = {ef_search}")
+    latencies = []
+    recalls = []
+
+    for embedding in queries:
+        start = time.perf_counter()
+        if mode == "float":
+            rows = await conn.fetch(sql, embedding, top_k)
+        else:
+            rows = await conn.fetch(sql, embedding, top_k, candidates)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        found = {row["product_id"] for row in rows}
+        expected = truth[embedding]
+        recalls.append(len(found.intersection(expected)) / max(len(expected), 1))
+
+    latencies.sort()
+    return {
+        "ef_search": ef_search,
+        "recall": statistics.mean(recalls),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+async def main(num_queries: int, top_k: int):
+    conn = await db_service.get_connection()
+    try:
+        rows = await conn.fetch(
+            "SELECT embedding::text AS embedding FROM products WHERE embedding IS NOT NULL"
+        )
+        if not rows:
+            print("No embeddings stored, nothing to benchmark")
+            return
+
+        queries = [row["embedding"] for row in random.sample(rows, min(num_queries, len(rows)))]
+        truth = {embedding: await exact_top_k(conn, embedding, top_k) for embedding in queries}
+
+        available = await indexed_modes(conn)
+        print(f"{'mode':<10}{'ef_search':>10}{'recall@' + str(top_k):>12}{'p50 ms':>10}{'p95 ms':>10}")
+        for mode in MODES:
+            if mode not in available:
+                print(f"{mode:<10}  skipped: no {INDEX_OPCLASSES[mode]} index on products")
+                continue
+            result = await run_mode(conn, mode, queries, truth, top_k)
+            print(
+                f"{mode:<10}{result['ef_search']:>10}{result['recall']:>12.3f}"
+                f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+            )
+
+        print("\nIndex memory:")
+        for row in await conn.fetch(INDEX_SIZE_SQL):
+            print(f"  {row['indexrelname']:<40}{row['size_bytes'] / 1024 / 1024:>10.1f} MB")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.queries, args.top_k))
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_rejects_immediately_when_queue_is_full():
+    controller = AdmissionController("test", max_in_flight=1, max_queue=0)
+    
+    async with controller.slot():
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await controller.acquire()
+    
+    assert exc_info.value.retry_after >= 1
+    assert controller.rejected == 1
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_request_gets_the_freed_slot_in_order():
+    controller = AdmissionController("test", max_in_flight=1, max_queue=2, queue_timeout=1)
+    order = []
+    
+    async def request(name):
+        async with controller.slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+    
+    await asyncio.gather(request("a"), request("b"), request("c"))
+    
+    assert order == ["a", "b", "c"]
+    assert controller.in_flight == 0
+    assert controller.admitted == 3
+
+
+@pytest.mark.asyncio
+async def test_queued_request_times_out():
+    controller = AdmissionController("test", max_in_flight=1, max_queue=1, queue_timeout=0.01)
+    
+    async with controller.slot():
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+    
+    assert controller.timed_out == 1
+    assert controller.queued == 0
+
+
+def test_limit_adapts_to_latency():
+    controller = AdmissionController("test", max_in_flight=10, min_in_flight=2, target_latency_ms=1000, window=2)
+    
+    for _ in range(2):
+        controller.in_flight += 1
+        controller.release(5000)
+    assert controller.limit == 8
+    
+    controller.latency_ewma_ms = 100
+    controller._window_queued = True
+    for _ in range(2):
+        controller.in_flight += 1
+        controller.release(100)
+    assert controller.limit == 9
+
+
+@pytest.mark.asyncio
+async def test_disabled_controller_admits_everything():
+    controller = AdmissionController("test", max_in_flight=0)
+    
+    async with controller.slot():
+        async with controller.slot():
+            pass
+    
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_hold_releases_once():
+    controller = AdmissionController("test", max_in_flight=1, max_queue=0)
+    
+    release = await controller.hold()
+    assert controller.in_flight == 1
+    release()
+    release()
+    
+    assert controller.in_flight == 0
@@ -201,4 +201,92 @@ async def test_generate_answer_no_docs():
     state = await generate_answer(initial_state)
     
     assert "Sorry, I couldn't find relevant information" in state["generated_answer"]
-    assert "answer_generation_completed" in state["processing_steps"] 
\ No newline at end of file
+    assert "answer_generation_completed" in state["processing_steps"] 
+
+@pytest.mark.asyncio
+async def test_plan_query_skips_contextualization_when_budget_is_low():
+    import time
+    from app.graph.nodes import plan_query
+    
+    initial_state = {
+        "original_query": "¿y en color negro?",
+        "conversation_history": [{"role": "user", "content": "Busco un mouse"}],
+        "query_plan": [],
+        "processing_steps": [],
+        "error_messages": [],
+        "deadline": time.monotonic() + 1
+    }
+    
+    with patch("app.services.llm_service.llm_service.contextualize_query", new_callable=AsyncMock) as mock_context:
+        state = await plan_query(initial_state)
+        
+        mock_context.assert_not_called()
+        assert state["query_plan"] == ["¿y en color negro?"]
+        assert "contextualization_skipped" in state["processing_steps"]
+
+
+@pytest.mark.asyncio
+async def test_generate_answer_shrinks_or_skips_llm_call_near_deadline():
+    import time
+    from app.graph.nodes import generate_answer
+    from app.services.database import ProductHit
+    
+    docs = [ProductHit(product_id=f"PROD-{i}", name=f"Laptop {i}", price=500.0, combined_score=0.9) for i in range(4)]
+    initial_state = {
+        "original_query": "laptops",
+        "retrieved_docs": docs,
+        "conversation_history": [],
+        "generated_answer": "",
+        "processing_steps": [],
+        "error_messages": [],
+        "deadline": time.monotonic() + 3
+    }
+    
+    with patch("app.services.llm_service.llm_service.generate_answer_with_memory", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = "Respuesta corta"
+        state = await generate_answer(initial_state)
+        
+        kwargs = mock_generate.call_args.kwargs
+        assert len(kwargs["context_docs"]) == 2
+        assert kwargs["max_tokens"] == 250
+        assert 0 < kwargs["timeout"] <= 3
+        
+        initial_state["deadline"] = time.monotonic() - 1
+        state = await generate_answer(initial_state)
+        
+        assert mock_generate.call_count == 1
+        assert "Laptop 0 - $500.00" in state["generated_answer"]
+        assert "deadline_fallback" in state["processing_steps"]
+
+
+def test_check_response_quality_no_regeneration_near_deadline(initial_state):
+    import time
+    initial_state["confidence_score"] = 0.1
+    initial_state["deadline"] = time.monotonic() + 1
+    
+    assert check_response_quality(initial_state) == "finalize"
+
+
+@pytest.mark.asyncio
+async def test_execute_retrieval_falls_back_to_text_search_when_embeddings_circuit_is_open():
+    from app.graph.nodes import execute_retrieval
+    from app.services.circuit_breaker import CircuitOpenError
+    
+    initial_state = {
+        "original_query": "laptop gamer",
+        "retrieved_docs": [],
+        "processing_steps": [],
+        "error_messages": []
+    }
+    
+    with patch("app.services.llm_service.llm_service.embed_query", new_callable=AsyncMock) as mock_embed, \
+         patch("app.services.database.db_service.text_search", new_callable=AsyncMock) as mock_text, \
+         patch("app.services.database.db_service.hybrid_search", new_callable=AsyncMock) as mock_hybrid:
+        mock_embed.side_effect = CircuitOpenError("text-embedding-ada-002", 30)
+        mock_text.return_value = [{"id": "PROD-1", "name": "Laptop Gamer"}]
+        
+        state = await execute_retrieval(initial_state)
+        
+        mock_hybrid.assert_not_called()
+        assert len(state["retrieved_docs"]) == 1
+        assert "text_only_retrieval" in state["processing_steps"]
@@ -16,23 +16,57 @@ def test_health_endpoint():
     assert data["version"] == "1.0.0"
 
 
-def test_ingest_product_basic():
+def test_ready_endpoint_before_warm_up():
     from app.main import app
     
-    with patch("app.services.llm_service.llm_service.generate_embedding", new_callable=AsyncMock) as mock_embed, \
-         patch("app.services.database.db_service.store_product", new_callable=AsyncMock) as mock_store:
-        
-        mock_embed.return_value = [0.1] * 1536
-        mock_store.return_value = "PROD-TEST123"
+    with patch("app.services.warmup.warmup_service.ready", False):
+        client = TestClient(app)
+        response = client.get("/ready")
         
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+
+
+def test_ready_endpoint_checks_database():
+    from app.main import app
+    
+    with patch("app.services.warmup.warmup_service.ready", True), \
+         patch("app.services.database.db_service.ping", new_callable=AsyncMock) as mock_ping:
         client = TestClient(app)
-        product_data = {"name": "Test Product", "description": "Test description"}
-        response = client.post("/ingest", json=product_data)
         
+        response = client.get("/ready")
         assert response.status_code == 200
-        data = response.json()
-        assert data["status"] == "success"
-        assert data["product_id"] == "PROD-TEST123"
+        assert response.json()["checks"]["database"] == "ok"
+        
+        mock_ping.side_effect = OSError("connection refused")
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert "connection refused" in response.json()["checks"]["database"]
+
+
+def test_ingest_product_basic():
+    from app.main import app
+    
+    client = TestClient(app)
+    product_data = {"name": "Test Product", "description": "Test description"}
+    response = client.post("/ingest", json=product_data)
+    
+    assert response.status_code == 202
+    data = response.json()
+    assert data["status"] == "queued"
+    assert data["status_url"] == f"/ingest/jobs/{data['job_id']}"
+    
+    job = client.get(data["status_url"])
+    assert job.status_code == 200
+    assert job.json()["total"] == 1
+
+
+def test_ingest_job_not_found():
+    from app.main import app
+    client = TestClient(app)
+    
+    response = client.get("/ingest/jobs/missing")
+    assert response.status_code == 404
 
 
 def test_query_basic():
@@ -88,8 +122,8 @@ def test_query_empty_string():
 def test_ingest_product_with_error():
     from app.main import app
     
-    with patch("app.services.llm_service.llm_service.generate_embedding", new_callable=AsyncMock) as mock_embed:
-        mock_embed.side_effect = Exception("LLM Error")
+    with patch("app.services.ingest_queue.ingest_queue.submit", new_callable=AsyncMock) as mock_submit:
+        mock_submit.side_effect = Exception("DB Error")
         
         client = TestClient(app)
         product_data = {"name": "Test Product"}
@@ -100,6 +134,32 @@ def test_ingest_product_with_error():
         assert "Error ingesting product" in data["detail"]
 
 
+def test_ingest_queue_full():
+    from app.main import app
+    from app.services.ingest_queue import QueueFullError
+    
+    with patch("app.services.ingest_queue.ingest_queue.submit", new_callable=AsyncMock) as mock_submit:
+        mock_submit.side_effect = QueueFullError("Ingestion queue is full, retry later")
+        
+        client = TestClient(app)
+        response = client.post("/ingest", json={"name": "Test Product"})
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+
+
+def test_ingest_bulk_larger_than_queue_is_rejected():
+    from app.main import app
+    
+    with patch("app.api.router.settings.ingest_queue_size", 2), \
+         patch("app.services.ingest_queue.ingest_queue.submit", new_callable=AsyncMock) as mock_submit:
+        client = TestClient(app)
+        response = client.post("/ingest/bulk", json=[{"name": f"Product {i}"} for i in range(3)])
+        
+        assert response.status_code == 413
+        mock_submit.assert_not_called()
+
+
 def test_query_with_conversation_history():
     from app.main import app
     
@@ -128,4 +188,294 @@ def test_query_with_conversation_history():
         assert response.status_code == 200
         data = response.json()
         assert len(data["conversation_history"]) == 4  # 2 original + 2 new
-        assert data["answer"] == "Here's more information" 
\ No newline at end of file
+        assert data["answer"] == "Here's more information" 
+
+def test_sync_catalog_basic():
+    from app.main import app
+    
+    sync_result = {
+        "created": 1, "updated": 0, "unchanged": 0, "embedded": 1, "deleted": 0,
+        "product_ids": {"SKU-1": "PROD-TEST123"}
+    }
+    
+    with patch("app.services.catalog_sync.catalog_sync_service.sync_products", new_callable=AsyncMock) as mock_sync:
+        mock_sync.return_value = sync_result
+        
+        client = TestClient(app)
+        response = client.post("/products/sync", json={
+            "products": [{"external_id": "SKU-1", "name": "Test Product"}],
+            "full_snapshot": True
+        })
+        
+        assert response.status_code == 200
+        assert response.json()["product_ids"] == {"SKU-1": "PROD-TEST123"}
+        assert mock_sync.call_args[1]["full_snapshot"] is True
+
+
+def test_update_product_not_found():
+    from app.main import app
+    
+    with patch("app.services.database.db_service.update_product_fields", new_callable=AsyncMock) as mock_update:
+        mock_update.return_value = ["PROD-MISSING"]
+        
+        client = TestClient(app)
+        response = client.patch("/products/PROD-MISSING", json={"price": 10.0})
+        
+        assert response.status_code == 404
+
+
+def test_bulk_update_products():
+    from app.main import app
+    
+    with patch("app.services.database.db_service.update_product_fields", new_callable=AsyncMock) as mock_update, \
+         patch("app.services.llm_service.llm_service.generate_embedding", new_callable=AsyncMock) as mock_embed:
+        mock_update.return_value = []
+        
+        client = TestClient(app)
+        response = client.post("/products/updates", json={
+            "updates": [
+                {"product_id": "PROD-1", "price": 10.0},
+                {"product_id": "PROD-2", "stock_quantity": 3}
+            ]
+        })
+        
+        assert response.status_code == 200
+        assert response.json() == {"updated": 2, "not_found": []}
+        mock_embed.assert_not_called()
+
+
+def test_query_field_selection():
+    from app.main import app
+    from app.services.database import ProductHit
+    
+    mock_result = {
+        "final_answer": "Test answer",
+        "confidence_score": 0.8,
+        "retrieved_docs": [
+            ProductHit(product_id=f"PROD-{i}", name=f"Product {i}", combined_score=0.9 - i / 10)
+            for i in range(3)
+        ],
+        "start_time": 1234567890,
+        "end_time": 1234567891
+    }
+    
+    with patch("app.graph.builder.rag_agent.ainvoke", new_callable=AsyncMock) as mock_agent:
+        mock_agent.return_value = mock_result
+        
+        client = TestClient(app)
+        response = client.post("/query", json={
+            "query": "laptops",
+            "conversation_history": [{"role": "user", "content": "hi"}],
+            "include_history": False,
+            "max_sources": 1
+        })
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert "conversation_history" not in data
+        assert [source["product_id"] for source in data["sources"]] == ["PROD-0"]
+        assert data["processing_time_ms"] == 1000
+
+
+def test_query_response_compressed():
+    from app.main import app
+    
+    mock_result = {
+        "final_answer": "Test answer " * 200,
+        "confidence_score": 0.8,
+        "retrieved_docs": [],
+        "start_time": 1234567890,
+        "end_time": 1234567891
+    }
+    
+    with patch("app.graph.builder.rag_agent.ainvoke", new_callable=AsyncMock) as mock_agent:
+        mock_agent.return_value = mock_result
+        
+        client = TestClient(app)
+        response = client.post("/query", json={"query": "laptops"}, headers={"Accept-Encoding": "gzip"})
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["answer"] == mock_result["final_answer"]
+        
+        response = client.post("/query", json={"query": "laptops"}, headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+
+
+def test_query_batch_streams_ndjson():
+    import json
+    from app.main import app
+    
+    async def fake_batch(queries, search_concurrency=None, agent_concurrency=None):
+        for index, query in enumerate(queries):
+            yield {"index": index, "query": query["query"], "answer": "ok"}
+    
+    with patch("app.api.router.run_batch", side_effect=fake_batch):
+        client = TestClient(app)
+        response = client.post("/query/batch", json={"queries": [{"query": "a"}, {"query": "b"}]})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["query"] for line in lines] == ["a", "b"]
+
+
+def test_query_batch_rejects_empty():
+    from app.main import app
+    client = TestClient(app)
+    
+    response = client.post("/query/batch", json={"queries": []})
+    assert response.status_code == 422
+
+
+def test_search_paginates_with_cursor():
+    from app.main import app
+    from app.services.database import ProductHit
+    
+    hits = [
+        ProductHit(product_id=f"PROD-{i}", name=f"Laptop {i}", price=100.0 * i, combined_score=score)
+        for i, score in enumerate([0.9, 0.7, 0.7, 0.4])
+    ]
+    
+    with patch("app.services.llm_service.llm_service.embed_query", new_callable=AsyncMock) as mock_embed, \
+         patch("app.services.database.db_service.hybrid_search", new_callable=AsyncMock) as mock_search:
+        mock_embed.return_value = [0.1] * 1536
+        mock_search.side_effect = lambda *args, **kwargs: list(hits)
+        client = TestClient(app)
+        
+        response = client.get("/search", params={"q": "laptop", "limit": 2, "max_price": 500, "in_stock": True})
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["product_id"] for r in data["results"]] == ["PROD-0", "PROD-1"]
+        assert data["results"][0]["scores"]["combined"] == 0.9
+        filters = mock_search.call_args.kwargs["filters"]
+        assert filters.max_price == 500 and filters.in_stock
+        
+        response = client.get("/search", params={"q": "laptop", "limit": 2, "cursor": data["next_cursor"]})
+        data = response.json()
+        assert [r["product_id"] for r in data["results"]] == ["PROD-2", "PROD-3"]
+        assert data["next_cursor"] is None
+
+
+def test_search_text_fallback_orders_by_text_rank():
+    from app.main import app
+    from app.services.circuit_breaker import CircuitOpenError
+    from app.services.database import ProductHit
+    
+    hits = [
+        ProductHit(product_id="PROD-A", name="Mouse", rank_score=0.1),
+        ProductHit(product_id="PROD-B", name="Laptop Gamer", rank_score=0.8),
+        ProductHit(product_id="PROD-C", name="Laptop", rank_score=0.5),
+    ]
+    
+    with patch("app.services.llm_service.llm_service.embed_query", new_callable=AsyncMock) as mock_embed, \
+         patch("app.services.database.db_service.text_search", new_callable=AsyncMock) as mock_search:
+        mock_embed.side_effect = CircuitOpenError("embeddings", 30)
+        mock_search.side_effect = lambda *args, **kwargs: list(hits)
+        client = TestClient(app)
+        
+        response = client.get("/search", params={"q": "laptop", "limit": 2})
+        data = response.json()
+        assert [r["product_id"] for r in data["results"]] == ["PROD-B", "PROD-C"]
+        assert data["results"][0]["scores"]["combined"] == 0.8
+        
+        response = client.get("/search", params={"q": "laptop", "limit": 2, "cursor": data["next_cursor"]})
+        assert [r["product_id"] for r in response.json()["results"]] == ["PROD-A"]
+
+
+def test_search_invalid_cursor():
+    from app.main import app
+    client = TestClient(app)
+    
+    response = client.get("/search", params={"q": "laptop", "cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_query_hard_deadline_returns_504():
+    import asyncio
+    from app.main import app
+    
+    async def slow_agent(state):
+        await asyncio.sleep(1)
+    
+    with patch("app.graph.builder.rag_agent.ainvoke", side_effect=slow_agent), \
+         patch("app.api.router.settings.query_deadline_seconds", 0.05), \
+         patch("app.api.router.settings.query_deadline_grace_seconds", 0):
+        client = TestClient(app)
+        response = client.post("/query", json={"query": "laptops"})
+        
+        assert response.status_code == 504
+
+
+def test_query_shed_with_retry_after():
+    from app.main import app
+    from app.services.admission import AdmissionRejected
+    
+    with patch("app.services.admission.query_admission.acquire", new_callable=AsyncMock) as mock_acquire:
+        mock_acquire.side_effect = AdmissionRejected("query", 3)
+        client = TestClient(app)
+        response = client.post("/query", json={"query": "laptops"})
+        
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+
+
+def test_query_batch_shed_with_retry_after():
+    from app.main import app
+    from app.services.admission import AdmissionRejected
+    
+    with patch("app.services.admission.batch_admission.acquire", new_callable=AsyncMock) as mock_acquire, \
+         patch("app.api.router.run_batch") as mock_run:
+        mock_acquire.side_effect = AdmissionRejected("query_batch", 7)
+        client = TestClient(app)
+        response = client.post("/query/batch", json={"queries": [{"query": "a"}]})
+        
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "7"
+        mock_run.assert_not_called()
+
+
+def test_query_batch_holds_slot_until_stream_ends():
+    from app.main import app
+    from app.services.admission import batch_admission
+    
+    seen_in_flight = []
+    
+    async def fake_batch(queries, **kwargs):
+        seen_in_flight.append(batch_admission.in_flight)
+        yield {"index": 0, "query": "a", "answer": "ok"}
+    
+    with patch("app.api.router.run_batch", side_effect=fake_batch):
+        client = TestClient(app)
+        response = client.post("/query/batch", json={"queries": [{"query": "a"}]})
+        
+        assert response.status_code == 200
+        assert seen_in_flight == [1]
+        assert batch_admission.in_flight == 0
+
+
+def test_bulk_product_updates_shed_with_retry_after():
+    from app.main import app
+    from app.services.admission import AdmissionRejected
+    
+    with patch("app.services.admission.ingest_admission.acquire", new_callable=AsyncMock) as mock_acquire, \
+         patch("app.services.database.db_service.update_product_fields", new_callable=AsyncMock) as mock_update:
+        mock_acquire.side_effect = AdmissionRejected("ingest", 2)
+        client = TestClient(app)
+        response = client.post("/products/updates", json={"updates": [{"product_id": "PROD-1", "price": 10.0}]})
+        
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "2"
+        mock_update.assert_not_called()
+
+
+def test_query_releases_admission_slot():
+    from app.main import app
+    from app.services.admission import query_admission
+    
+    with patch("app.graph.builder.rag_agent.ainvoke", new_callable=AsyncMock) as mock_agent:
+        mock_agent.side_effect = Exception("boom")
+        client = TestClient(app)
+        response = client.post("/query", json={"query": "laptops"})
+        
+        assert response.status_code == 500
+        assert query_admission.in_flight == 0
@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import patch
+from app.services.cache import TTLCache
+
+
+def test_get_returns_stored_value():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("key", "value")
+    
+    assert cache.get("key") == "value"
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = TTLCache(max_size=2, ttl_seconds=10)
+    
+    with patch("app.services.cache.time.monotonic", return_value=100.0):
+        cache.set("key", "value")
+    with patch("app.services.cache.time.monotonic", return_value=111.0):
+        assert cache.get("key") is None
+    
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_version_mismatch_is_a_miss():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("key", "value", version=1)
+    
+    assert cache.get("key", version=2) is None
+    assert cache.get("key", version=1) is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = TTLCache(max_size=0, ttl_seconds=60)
+    cache.set("key", "value")
+    
+    assert not cache.enabled
+    assert cache.get("key") is None
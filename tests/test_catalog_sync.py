@@ -0,0 +1,154 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.catalog_sync import CatalogSyncService, content_hash, product_embedding_text
+
+
+@pytest.fixture
+def sync_service():
+    return CatalogSyncService()
+
+
+@pytest.fixture
+def feed():
+    return [
+        {"external_id": "SKU-1", "name": "MacBook Air", "description": "Laptop ligera", "category": "Tecnología", "price": 1199.0},
+        {"external_id": "SKU-2", "name": "iPhone 15", "description": "Smartphone", "category": "Tecnología", "price": 999.0}
+    ]
+
+
+def test_product_embedding_text_skips_missing_fields():
+    assert product_embedding_text("MacBook Air", None, "Tecnología") == "MacBook Air Tecnología"
+
+
+def stored_product(product_id, content_hash, price=None, stock_quantity=0, specs="{}"):
+    return {
+        "product_id": product_id,
+        "content_hash": content_hash,
+        "price": price,
+        "stock_quantity": stock_quantity,
+        "specs": specs,
+        "deleted": False
+    }
+
+
+@pytest.mark.asyncio
+async def test_sync_only_embeds_new_and_changed_products(sync_service, feed):
+    unchanged_hash = content_hash(product_embedding_text("MacBook Air", "Laptop ligera", "Tecnología"))
+    existing = {"SKU-1": stored_product("PROD-1", unchanged_hash, price=1199.0)}
+    
+    with patch("app.services.catalog_sync.db_service") as mock_db, \
+         patch("app.services.catalog_sync.llm_service") as mock_llm:
+        mock_db.get_synced_products = AsyncMock(return_value=existing)
+        mock_db.upsert_products = AsyncMock(return_value={"SKU-2": "PROD-NEW"})
+        mock_db.new_product_id.return_value = "PROD-NEW"
+        mock_llm.generate_embeddings = AsyncMock(return_value=[[0.1] * 1536])
+        
+        result = await sync_service.sync_products(feed)
+        
+        mock_llm.generate_embeddings.assert_called_once_with(["iPhone 15 Smartphone Tecnología"])
+        # The unchanged product isn't written at all
+        mock_db.upsert_products.assert_called_once()
+        rows = mock_db.upsert_products.call_args[0][0]
+        assert [row["product_id"] for row in rows] == ["PROD-NEW"]
+        assert rows[0]["embedding"] == [0.1] * 1536
+        assert result["created"] == 1
+        assert result["unchanged"] == 1
+        assert result["embedded"] == 1
+        assert result["product_ids"] == {"SKU-1": "PROD-1", "SKU-2": "PROD-NEW"}
+
+
+@pytest.mark.asyncio
+async def test_unchanged_snapshot_writes_nothing(sync_service, feed):
+    existing = {
+        "SKU-1": stored_product(
+            "PROD-1", content_hash(product_embedding_text("MacBook Air", "Laptop ligera", "Tecnología")), price=1199.0
+        ),
+        "SKU-2": stored_product(
+            "PROD-2", content_hash(product_embedding_text("iPhone 15", "Smartphone", "Tecnología")), price=999.0, specs=None
+        )
+    }
+    
+    with patch("app.services.catalog_sync.db_service") as mock_db, \
+         patch("app.services.catalog_sync.llm_service") as mock_llm:
+        mock_db.get_synced_products = AsyncMock(return_value=existing)
+        mock_db.upsert_products = AsyncMock()
+        mock_db.soft_delete_missing = AsyncMock(return_value=[])
+        mock_llm.generate_embeddings = AsyncMock()
+        
+        result = await sync_service.sync_products(feed, full_snapshot=True)
+        
+        mock_db.upsert_products.assert_not_called()
+        mock_llm.generate_embeddings.assert_not_called()
+        assert result["unchanged"] == 2
+        assert result["product_ids"] == {"SKU-1": "PROD-1", "SKU-2": "PROD-2"}
+
+
+@pytest.mark.asyncio
+async def test_price_only_change_is_a_field_change(sync_service, feed):
+    existing = {
+        "SKU-1": stored_product(
+            "PROD-1", content_hash(product_embedding_text("MacBook Air", "Laptop ligera", "Tecnología")), price=1299.0
+        )
+    }
+    
+    with patch("app.services.catalog_sync.db_service") as mock_db, \
+         patch("app.services.catalog_sync.llm_service") as mock_llm:
+        mock_db.get_synced_products = AsyncMock(return_value=existing)
+        mock_db.upsert_products = AsyncMock(return_value={"SKU-1": "PROD-1"})
+        mock_llm.generate_embeddings = AsyncMock()
+        
+        result = await sync_service.sync_products(feed[:1])
+        
+        mock_llm.generate_embeddings.assert_not_called()
+        rows = mock_db.upsert_products.call_args[0][0]
+        assert rows[0]["price"] == 1199.0
+        assert rows[0]["embedding"] is None
+        assert mock_db.upsert_products.call_args[1] == {"kind": "fields"}
+        assert result["updated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_snapshot_soft_deletes_missing(sync_service, feed):
+    with patch("app.services.catalog_sync.db_service") as mock_db, \
+         patch("app.services.catalog_sync.llm_service") as mock_llm:
+        mock_db.get_synced_products = AsyncMock(return_value={})
+        mock_db.upsert_products = AsyncMock(return_value={"SKU-1": "PROD-1", "SKU-2": "PROD-2"})
+        mock_db.soft_delete_missing = AsyncMock(return_value=["PROD-OLD"])
+        mock_llm.generate_embeddings = AsyncMock(return_value=[[0.1] * 1536, [0.2] * 1536])
+        
+        result = await sync_service.sync_products(feed, full_snapshot=True)
+        
+        mock_db.soft_delete_missing.assert_called_once_with(["SKU-1", "SKU-2"])
+        assert result["deleted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_changed_description_is_reembedded(sync_service, feed):
+    existing = {"SKU-1": stored_product("PROD-1", "stale", price=1199.0)}
+    
+    with patch("app.services.catalog_sync.db_service") as mock_db, \
+         patch("app.services.catalog_sync.llm_service") as mock_llm:
+        mock_db.get_synced_products = AsyncMock(return_value=existing)
+        mock_db.upsert_products = AsyncMock(return_value={"SKU-1": "PROD-1", "SKU-2": "PROD-NEW"})
+        mock_db.new_product_id.return_value = "PROD-NEW"
+        mock_llm.generate_embeddings = AsyncMock(return_value=[[0.1] * 1536, [0.2] * 1536])
+        
+        result = await sync_service.sync_products(feed)
+        
+        assert result["updated"] == 1
+        assert result["embedded"] == 2
+
+
+@pytest.mark.asyncio
+async def test_sync_reports_ids_stored_by_postgres(sync_service, feed):
+    with patch("app.services.catalog_sync.db_service") as mock_db, \
+         patch("app.services.catalog_sync.llm_service") as mock_llm:
+        mock_db.get_synced_products = AsyncMock(return_value={})
+        # Another sync inserted SKU-1 between our lookup and our upsert
+        mock_db.upsert_products = AsyncMock(return_value={"SKU-1": "PROD-OTHER", "SKU-2": "PROD-NEW"})
+        mock_db.new_product_id.return_value = "PROD-NEW"
+        mock_llm.generate_embeddings = AsyncMock(return_value=[[0.1] * 1536, [0.2] * 1536])
+        
+        result = await sync_service.sync_products(feed)
+        
+        assert result["product_ids"] == {"SKU-1": "PROD-OTHER", "SKU-2": "PROD-NEW"}
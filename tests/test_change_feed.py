@@ -0,0 +1,86 @@
+import json
+import pytest
+from unittest.mock import AsyncMock
+from app.core.config import settings
+from app.services.change_feed import CatalogChangeFeed
+from app.services.database import CATALOG_CHANNEL, DatabaseService
+
+
+@pytest.fixture
+def db_service():
+    return DatabaseService()
+
+
+def test_remote_notification_invalidates_caches(db_service):
+    feed = CatalogChangeFeed(db_service)
+    received = []
+    db_service.add_change_listener(received.append)
+    
+    payload = json.dumps({"origin": "other-worker", "product_ids": ["PROD-1"]})
+    feed._on_notification(None, 1234, CATALOG_CHANNEL, payload)
+    
+    assert db_service.catalog_version == 1
+    assert received == [["PROD-1"]]
+
+
+def test_remote_field_notification_keeps_rankings(db_service):
+    feed = CatalogChangeFeed(db_service)
+    received = []
+    db_service.add_change_listener(received.append)
+    
+    payload = json.dumps({"origin": "other-worker", "kind": "fields", "product_ids": ["PROD-1"]})
+    feed._on_notification(None, 1234, CATALOG_CHANNEL, payload)
+    
+    assert db_service.catalog_version == 0
+    assert db_service.fields_version == 1
+    assert received == []
+
+
+def test_own_notification_is_ignored(db_service):
+    feed = CatalogChangeFeed(db_service)
+    
+    payload = json.dumps({"origin": settings.worker_id, "product_ids": ["PROD-1"]})
+    feed._on_notification(None, 1234, CATALOG_CHANNEL, payload)
+    
+    assert db_service.catalog_version == 0
+
+
+def test_malformed_notification_is_ignored(db_service):
+    feed = CatalogChangeFeed(db_service)
+    
+    feed._on_notification(None, 1234, CATALOG_CHANNEL, "not json")
+    
+    assert db_service.catalog_version == 0
+
+
+def test_non_object_notification_is_ignored(db_service):
+    feed = CatalogChangeFeed(db_service)
+    
+    for payload in ("[]", "1", '"PROD-1"', "null"):
+        feed._on_notification(None, 1234, CATALOG_CHANNEL, payload)
+    
+    assert db_service.catalog_version == 0
+
+
+@pytest.mark.asyncio
+async def test_notify_catalog_change_chunks_payload(db_service):
+    conn = AsyncMock()
+    product_ids = [f"PROD-{i}" for i in range(450)]
+    
+    await db_service.notify_catalog_change(conn, product_ids)
+    
+    assert conn.execute.call_count == 3
+    _, channel, payload = conn.execute.call_args_list[0][0]
+    assert channel == CATALOG_CHANNEL
+    assert len(json.loads(payload)["product_ids"]) == 200
+    assert db_service.catalog_version == 1
+
+
+@pytest.mark.asyncio
+async def test_notify_failure_does_not_raise(db_service):
+    conn = AsyncMock()
+    conn.execute.side_effect = Exception("connection closed")
+    
+    await db_service.notify_catalog_change(conn, ["PROD-1"])
+    
+    assert db_service.catalog_version == 1
@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import patch
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_opens_on_failure_ratio_and_rejects_immediately():
+    breaker = CircuitBreaker("chat", failure_ratio=0.5, min_calls=4, window=4, open_seconds=30)
+    
+    for error in [None, StatusError(500), None, TimeoutError()]:
+        breaker.before_call()
+        breaker.record(100, error)
+    
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected == 1
+
+
+def test_client_errors_do_not_count_but_slow_calls_do():
+    breaker = CircuitBreaker("chat", failure_ratio=0.5, min_calls=2, window=2, slow_call_ms=1000)
+    
+    breaker.record(100, StatusError(400))
+    breaker.record(100, StatusError(400))
+    assert breaker.state == CLOSED
+    
+    breaker.record(5000)
+    breaker.record(5000)
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_one_probe():
+    breaker = CircuitBreaker("embeddings", failure_ratio=0.5, min_calls=1, window=1, open_seconds=30)
+    breaker.record(100, StatusError(503))
+    
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=breaker.opened_at + 31):
+        breaker.before_call()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        
+        breaker.record(100)
+        assert breaker.state == CLOSED
+        breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("embeddings", failure_ratio=0.5, min_calls=1, window=1, open_seconds=30)
+    breaker.record(100, StatusError(503))
+    
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=breaker.opened_at + 31):
+        breaker.before_call()
+        breaker.record(100, StatusError(503))
+    
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+
+def test_check_rejects_without_taking_the_probe():
+    breaker = CircuitBreaker("embeddings", failure_ratio=0.5, min_calls=1, window=1, open_seconds=30)
+    breaker.record(100, StatusError(503))
+    
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.rejected == 1
+    
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=breaker.opened_at + 31):
+        breaker.check()
+        # The probe is still available to the actual call
+        breaker.before_call()
+        assert breaker.state == HALF_OPEN
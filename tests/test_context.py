@@ -0,0 +1,33 @@
+from unittest.mock import patch
+from app.graph.context import select_context_docs
+from app.services.database import ProductHit
+
+
+def hits(*scores):
+    return [ProductHit(product_id=f"PROD-{i}", name=f"Product {i}", combined_score=score) for i, score in enumerate(scores)]
+
+
+def test_clear_match_keeps_single_product():
+    selected = select_context_docs(hits(0.92, 0.41, 0.39, 0.38))
+    
+    assert [hit.product_id for hit in selected] == ["PROD-0"]
+
+
+def test_close_scores_are_kept_up_to_max():
+    selected = select_context_docs(hits(0.8, 0.78, 0.77, 0.75, 0.74, 0.73, 0.72))
+    
+    assert len(selected) == 5
+
+
+def test_cut_at_score_gap():
+    selected = select_context_docs(hits(0.8, 0.75, 0.3, 0.29))
+    
+    assert [hit.product_id for hit in selected] == ["PROD-0", "PROD-1"]
+
+
+def test_min_docs_and_missing_scores():
+    with patch("app.graph.context.settings.context_min_docs", 2):
+        assert len(select_context_docs(hits(0.9, 0.1, 0.05))) == 2
+    
+    assert len(select_context_docs(hits(0.0, 0.0, 0.0))) == 3
+    assert select_context_docs([]) == []
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from app.services.database import DatabaseService
+from app.services.database import DatabaseService, ProductHit, SearchFilters
 
 
 @pytest.fixture
@@ -14,6 +14,13 @@ def mock_connection():
     return mock_conn
 
 
+def fake_pool(conn):
+    pool = MagicMock()
+    pool.acquire = AsyncMock(return_value=conn)
+    pool.release = AsyncMock()
+    return pool
+
+
 @pytest.mark.asyncio
 async def test_store_product_success(db_service, mock_connection, sample_product_data, sample_embedding):
     mock_connection.fetchval.return_value = "PROD-TEST123"
@@ -74,7 +81,7 @@ async def test_vector_search_success(db_service, mock_connection, sample_embeddi
     ]
     mock_connection.fetch.return_value = mock_rows
     
-    with patch.object(db_service, 'get_connection', return_value=mock_connection):
+    with patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
         results = await db_service.vector_search(sample_embedding, top_k=5)
         
         assert len(results) == 2
@@ -83,7 +90,7 @@ async def test_vector_search_success(db_service, mock_connection, sample_embeddi
         assert results[1]["product_id"] == "PROD-TEST456"
         assert results[1]["similarity_score"] == 0.75
         mock_connection.fetch.assert_called_once()
-        mock_connection.close.assert_called_once()
+        db_service._get_pool.return_value.release.assert_called_once_with(mock_connection)
 
 
 @pytest.mark.asyncio
@@ -102,7 +109,7 @@ async def test_text_search_success(db_service, mock_connection):
     ]
     mock_connection.fetch.return_value = mock_rows
     
-    with patch.object(db_service, 'get_connection', return_value=mock_connection):
+    with patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
         results = await db_service.text_search("laptop", top_k=5)
         
         assert len(results) == 1
@@ -115,28 +122,25 @@ async def test_text_search_success(db_service, mock_connection):
 @pytest.mark.asyncio
 async def test_hybrid_search_success(db_service, sample_embedding):
     vector_results = [
-        {
-            "id": "PROD-TEST123",
-            "product_id": "PROD-TEST123",
-            "name": "Test Product 1",
-            "description": "Test description",
-            "similarity_score": 0.9,
-            "content": "Test Product 1 - Test description"
-        }
+        ProductHit(
+            product_id="PROD-TEST123",
+            name="Test Product 1",
+            description="Test description",
+            similarity_score=0.9
+        )
     ]
     
     text_results = [
-        {
-            "id": "PROD-TEST123",
-            "product_id": "PROD-TEST123", 
-            "name": "Test Product 1",
-            "description": "Test description",
-            "rank_score": 0.7,
-            "content": "Test Product 1 - Test description"
-        }
+        ProductHit(
+            product_id="PROD-TEST123",
+            name="Test Product 1",
+            description="Test description",
+            rank_score=0.7
+        )
     ]
     
     with patch.object(db_service, 'vector_search', return_value=vector_results), \
+         patch.object(db_service, 'fuzzy_search', return_value=[]), \
          patch.object(db_service, 'text_search', return_value=text_results):
         
         results = await db_service.hybrid_search(sample_embedding, "test query", top_k=5)
@@ -184,7 +188,7 @@ def test_expand_search_terms_no_match(db_service):
 async def test_vector_search_empty_results(db_service, mock_connection, sample_embedding):
     mock_connection.fetch.return_value = []
     
-    with patch.object(db_service, 'get_connection', return_value=mock_connection):
+    with patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
         results = await db_service.vector_search(sample_embedding, top_k=5)
         
         assert results == []
@@ -194,7 +198,7 @@ async def test_vector_search_empty_results(db_service, mock_connection, sample_e
 async def test_text_search_empty_results(db_service, mock_connection):
     mock_connection.fetch.return_value = []
     
-    with patch.object(db_service, 'get_connection', return_value=mock_connection):
+    with patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
         results = await db_service.text_search("nonexistent", top_k=5)
         
         assert results == []
@@ -203,6 +207,7 @@ async def test_text_search_empty_results(db_service, mock_connection):
 @pytest.mark.asyncio
 async def test_hybrid_search_empty_results(db_service, sample_embedding):
     with patch.object(db_service, 'vector_search', return_value=[]), \
+         patch.object(db_service, 'fuzzy_search', return_value=[]), \
          patch.object(db_service, 'text_search', return_value=[]):
         
         results = await db_service.hybrid_search(sample_embedding, "test query", top_k=5)
@@ -219,7 +224,7 @@ async def test_store_product_connection_error(db_service, sample_embedding):
 
 @pytest.mark.asyncio
 async def test_vector_search_connection_error(db_service, sample_embedding):
-    with patch.object(db_service, 'get_connection', side_effect=Exception("Connection failed")):
+    with patch.object(db_service, '_get_pool', side_effect=Exception("Connection failed")):
         with pytest.raises(Exception):
             await db_service.vector_search(sample_embedding, top_k=5)
 
@@ -227,26 +232,15 @@ async def test_vector_search_connection_error(db_service, sample_embedding):
 @pytest.mark.asyncio
 async def test_hybrid_search_combines_scores_correctly(db_service, sample_embedding):
     vector_results = [
-        {
-            "id": "PROD-TEST123",
-            "product_id": "PROD-TEST123",
-            "name": "Test Product",
-            "similarity_score": 0.8,
-            "content": "Test content"
-        }
+        ProductHit(product_id="PROD-TEST123", name="Test Product", similarity_score=0.8)
     ]
     
     text_results = [
-        {
-            "id": "PROD-TEST123", 
-            "product_id": "PROD-TEST123",
-            "name": "Test Product",
-            "rank_score": 0.6,
-            "content": "Test content"
-        }
+        ProductHit(product_id="PROD-TEST123", name="Test Product", rank_score=0.6)
     ]
     
     with patch.object(db_service, 'vector_search', return_value=vector_results), \
+         patch.object(db_service, 'fuzzy_search', return_value=[]), \
          patch.object(db_service, 'text_search', return_value=text_results):
         
         results = await db_service.hybrid_search(sample_embedding, "test", top_k=5)
@@ -255,4 +249,263 @@ async def test_hybrid_search_combines_scores_correctly(db_service, sample_embedd
         combined_score = results[0]["combined_score"]
         
         assert combined_score > 0
-        assert isinstance(combined_score, float) 
\ No newline at end of file
+        assert isinstance(combined_score, float) 
+
+@pytest.mark.asyncio
+async def test_vector_search_halfvec_reranks_candidates(mock_connection, sample_embedding):
+    mock_connection.fetch.return_value = []
+    
+    with patch("app.services.database.settings.embedding_storage", "halfvec"), \
+         patch("app.services.database.settings.quantized_candidates", 100):
+        db_service = DatabaseService()
+        with patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
+            await db_service.vector_search(sample_embedding, top_k=5)
+        
+        query, _, top_k, candidates = mock_connection.fetch.call_args[0]
+        assert "halfvec" in query
+        assert "WITH candidates" in query
+        assert top_k == 5
+        assert candidates == 100
+
+
+@pytest.mark.asyncio
+async def test_vector_search_widens_hnsw_scan_for_large_candidate_pool(mock_connection, sample_embedding):
+    mock_connection.fetch.return_value = []
+    mock_connection.transaction = MagicMock()
+    
+    with patch("app.services.database.settings.embedding_storage", "binary"), \
+         patch("app.services.database.settings.quantized_candidates", 100), \
+         patch("app.services.database.settings.hnsw_ef_search", 40):
+        db_service = DatabaseService()
+        assert db_service.hnsw_ef_search == 100
+        with patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
+            await db_service.vector_search(sample_embedding, top_k=5)
+            mock_connection.execute.assert_not_called()
+            
+            await db_service.vector_search(sample_embedding, top_k=300)
+        
+        mock_connection.transaction.assert_called_once()
+        mock_connection.execute.assert_called_once_with("SET LOCAL hnsw.ef_search = 300")
+
+
+def test_vector_search_sql_binary(db_service):
+    query = db_service._vector_search_sql("binary")
+    
+    assert "binary_quantize" in query
+    assert "embedding <=> $1::vector" in query
+
+
+def test_vector_search_sql_invalid_mode(db_service):
+    with pytest.raises(ValueError):
+        db_service._vector_search_sql("int8")
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_loads_details_for_top_hits_only(db_service, mock_connection, sample_embedding):
+    light_hits = [
+        ProductHit(product_id=f"PROD-{i}", name=f"Product {i}", similarity_score=1 - i / 10, details_loaded=False)
+        for i in range(4)
+    ]
+    mock_connection.fetch.return_value = [
+        {"product_id": "PROD-0", "description": "First", "specs": {}},
+        {"product_id": "PROD-1", "description": "Second", "specs": {}}
+    ]
+    
+    with patch.object(db_service, 'vector_search', return_value=light_hits), \
+         patch.object(db_service, 'fuzzy_search', return_value=[]), \
+         patch.object(db_service, 'text_search', return_value=[]), \
+         patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
+        results = await db_service.hybrid_search(sample_embedding, "test", top_k=2)
+        
+        assert [hit.product_id for hit in results] == ["PROD-0", "PROD-1"]
+        assert mock_connection.fetch.call_args[0][1] == ["PROD-0", "PROD-1"]
+        assert results[0].content == "Product 0 - First"
+        assert results[1]["description"] == "Second"
+
+
+def test_product_hit_mapping_access():
+    hit = ProductHit(product_id="PROD-1", name="Laptop", description="Fast")
+    
+    assert hit["id"] == "PROD-1"
+    assert hit.get("content") == "Laptop - Fast"
+    assert hit.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        hit["missing"]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_served_from_cache(db_service, sample_embedding):
+    hits = [ProductHit(product_id="PROD-1", name="Laptop", similarity_score=0.9)]
+    
+    with patch.object(db_service, 'vector_search', return_value=hits) as mock_vector, \
+         patch.object(db_service, 'fuzzy_search', return_value=[]), \
+         patch.object(db_service, 'text_search', return_value=[]):
+        first = await db_service.hybrid_search(sample_embedding, "Laptop  barata", top_k=5)
+        second = await db_service.hybrid_search(sample_embedding, "laptop barata", top_k=5)
+        
+        assert mock_vector.call_count == 1
+        assert [hit.product_id for hit in second] == [hit.product_id for hit in first]
+        assert db_service.search_cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_cache_invalidated_by_catalog_write(db_service, sample_embedding):
+    with patch.object(db_service, 'vector_search', return_value=[]) as mock_vector, \
+         patch.object(db_service, 'fuzzy_search', return_value=[]), \
+         patch.object(db_service, 'text_search', return_value=[]):
+        await db_service.hybrid_search(sample_embedding, "laptop", top_k=5)
+        db_service.bump_catalog_version()
+        await db_service.hybrid_search(sample_embedding, "laptop", top_k=5)
+        
+        assert mock_vector.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_store_product_bumps_catalog_version(db_service, mock_connection, sample_embedding):
+    mock_connection.fetchval.return_value = "PROD-TEST123"
+    
+    with patch.object(db_service, 'get_connection', return_value=mock_connection):
+        await db_service.store_product(name="Test Product", embedding=sample_embedding)
+        
+        assert db_service.catalog_version == 1
+
+
+@pytest.mark.asyncio
+async def test_upsert_products_returns_stored_ids(db_service, mock_connection):
+    # A concurrent upsert created SKU-1 first: Postgres keeps its id, not the one proposed here
+    mock_connection.fetch.return_value = [{"external_id": "SKU-1", "product_id": "PROD-FIRST"}]
+    products = [{"product_id": "PROD-MINE", "external_id": "SKU-1", "name": "Laptop", "content_hash": "abc"}]
+    
+    with patch.object(db_service, 'get_connection', return_value=mock_connection), \
+         patch.object(db_service, 'notify_catalog_change', new_callable=AsyncMock) as mock_notify:
+        product_ids = await db_service.upsert_products(products)
+        
+        assert product_ids == {"SKU-1": "PROD-FIRST"}
+        assert "RETURNING external_id, product_id" in mock_connection.fetch.call_args[0][0]
+        assert mock_connection.fetch.call_args[0][1] == ["PROD-MINE"]
+        mock_notify.assert_called_once_with(mock_connection, ["PROD-FIRST"], kind="catalog")
+
+
+@pytest.mark.asyncio
+async def test_update_product_fields_batches_updates(db_service, mock_connection):
+    mock_connection.transaction = MagicMock()
+    mock_connection.fetch.return_value = [{"product_id": "PROD-1"}, {"product_id": "PROD-2"}]
+    updates = [
+        {"product_id": "PROD-1", "price": 10.0},
+        {"product_id": "PROD-2", "stock_quantity": 0, "specs": {"color": "negro"}},
+        {"product_id": "PROD-MISSING", "price": 5.0}
+    ]
+    
+    with patch.object(db_service, 'get_connection', return_value=mock_connection):
+        not_found = await db_service.update_product_fields(updates)
+        
+        assert not_found == ["PROD-MISSING"]
+        records = mock_connection.executemany.call_args[0][1]
+        assert records == [
+            ("PROD-1", 10.0, None, None),
+            ("PROD-2", None, 0, '{"color": "negro"}')
+        ]
+        # Price/stock/specs don't affect rankings: cached searches are kept
+        assert db_service.catalog_version == 0
+        assert db_service.fields_version == 1
+
+
+@pytest.mark.asyncio
+async def test_field_update_refreshes_cached_hits_without_new_search(db_service, mock_connection, sample_embedding):
+    hits = [
+        ProductHit(product_id="PROD-1", name="Laptop", price=1000.0, stock_quantity=5, similarity_score=0.9),
+        ProductHit(product_id="PROD-2", name="Mouse", price=20.0, stock_quantity=9, similarity_score=0.5),
+    ]
+    mock_connection.fetch.return_value = [
+        {"product_id": "PROD-1", "price": 899.0, "stock_quantity": 0, "description": "", "specs": {}}
+    ]
+    
+    with patch.object(db_service, 'vector_search', return_value=hits) as mock_vector, \
+         patch.object(db_service, 'fuzzy_search', return_value=[]), \
+         patch.object(db_service, 'text_search', return_value=[]), \
+         patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
+        await db_service.hybrid_search(sample_embedding, "laptop", top_k=5, include_details=False)
+        db_service.apply_field_change(["PROD-1"])
+        
+        results = await db_service.hybrid_search(sample_embedding, "laptop", top_k=5, include_details=False)
+        again = await db_service.hybrid_search(sample_embedding, "laptop", top_k=5, include_details=False)
+        
+        assert mock_vector.call_count == 1
+        assert (results[0].price, results[0].stock_quantity) == (899.0, 0)
+        assert results[1].price == 20.0
+        assert mock_connection.fetch.call_args.args[1] == ["PROD-1"]
+        # The refreshed entry is stored back; no reload on the next hit
+        assert mock_connection.fetch.call_count == 1
+        assert again[0].price == 899.0
+
+
+@pytest.mark.asyncio
+async def test_field_update_drops_rankings_filtered_on_price(db_service, sample_embedding):
+    filters = SearchFilters(max_price=500.0)
+    
+    with patch.object(db_service, 'vector_search', return_value=[]) as mock_vector, \
+         patch.object(db_service, 'fuzzy_search', return_value=[]), \
+         patch.object(db_service, 'text_search', return_value=[]):
+        await db_service.hybrid_search(sample_embedding, "laptop", top_k=5, filters=filters)
+        db_service.apply_field_change(["PROD-1"])
+        await db_service.hybrid_search(sample_embedding, "laptop", top_k=5, filters=filters)
+        
+        assert mock_vector.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_vector_search_with_filters(db_service, mock_connection, sample_embedding):
+    mock_connection.fetch.return_value = []
+    filters = SearchFilters(category="Electrónicos", max_price=1500.0, in_stock=True)
+    
+    with patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
+        await db_service.vector_search(sample_embedding, top_k=5, filters=filters)
+        
+        sql, *args = mock_connection.fetch.call_args.args
+        assert "lower(category) = $3" in sql
+        assert "price <= $4" in sql
+        assert "stock_quantity > 0" in sql
+        assert args[2:] == ["electrónicos", 1500.0]
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_search_passes_longest_words_padded(db_service, mock_connection):
+    mock_connection.fetch.return_value = [
+        {"product_id": "PROD-1", "name": "MacBook Air", "category": "Laptops", "price": 999.0, "stock_quantity": 3, "fuzzy_score": 0.7}
+    ]
+    
+    with patch.object(db_service, '_get_pool', return_value=fake_pool(mock_connection)):
+        results = await db_service.fuzzy_search("precio de la macbok air", top_k=10)
+        
+        sql, *args = mock_connection.fetch.call_args.args
+        assert "$1 <% name" in sql
+        assert args == ["macbok", "precio", None, None, 10]
+        assert results[0].fuzzy_score == 0.7
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_search_degrades_to_no_hits(db_service):
+    with patch.object(db_service, '_get_pool', side_effect=Exception("operator does not exist: unknown <% text")):
+        assert await db_service.fuzzy_search("macbok", top_k=5) == []
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_fuzzy_hits_when_text_search_is_thin(db_service, sample_embedding):
+    fuzzy_results = [ProductHit(product_id="PROD-1", name="MacBook Air", fuzzy_score=0.8)]
+    
+    with patch.object(db_service, 'vector_search', return_value=[]), \
+         patch.object(db_service, 'text_search', return_value=[]), \
+         patch.object(db_service, 'fuzzy_search', return_value=fuzzy_results) as mock_fuzzy:
+        results = await db_service.hybrid_search(sample_embedding, "macbok", top_k=5)
+        
+        mock_fuzzy.assert_called_once()
+        assert [hit.product_id for hit in results] == ["PROD-1"]
+        assert results[0].combined_score > 0
+    
+    text_results = [ProductHit(product_id=f"PROD-{i}", name="Laptop", rank_score=0.1) for i in range(3)]
+    with patch.object(db_service, 'vector_search', return_value=[]), \
+         patch.object(db_service, 'text_search', return_value=text_results), \
+         patch.object(db_service, 'fuzzy_search', return_value=[]) as mock_fuzzy:
+        await db_service.hybrid_search(sample_embedding, "laptop", top_k=5)
+        
+        mock_fuzzy.assert_not_called()
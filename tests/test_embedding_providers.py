@@ -0,0 +1,129 @@
+import asyncio
+import math
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.embedding_providers import (
+    AzureEmbeddingProvider,
+    EmbeddingProvider,
+    HashingEmbeddingProvider,
+    LocalEmbeddingProvider,
+    create_embedding_provider,
+)
+
+
+def cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+@pytest.mark.asyncio
+async def test_hashing_provider_is_deterministic_unit_vectors():
+    provider = HashingEmbeddingProvider(64)
+
+    first, second, empty = await provider.embed(["Laptop Gamer", "Laptop Gamer", ""])
+
+    assert first == second
+    assert len(first) == 64
+    assert math.isclose(math.sqrt(sum(x * x for x in first)), 1.0)
+    assert math.isclose(math.sqrt(sum(x * x for x in empty)), 1.0)
+    assert first == HashingEmbeddingProvider(64).vector("laptop gamer")
+
+
+@pytest.mark.asyncio
+async def test_hashing_provider_shared_words_are_closer():
+    provider = HashingEmbeddingProvider(256)
+    laptop, laptops, shoes = await provider.embed(["laptop gamer rgb", "laptop para gamers", "zapatillas running"])
+
+    assert cosine(laptop, laptops) > cosine(laptop, shoes)
+
+
+@pytest.mark.asyncio
+async def test_azure_provider_orders_batch_by_index():
+    client = MagicMock()
+    client.embeddings.create.return_value.data = [
+        MagicMock(index=1, embedding=[1.0]),
+        MagicMock(index=0, embedding=[0.0]),
+    ]
+    provider = AzureEmbeddingProvider(1, "ada", lambda timeout: client)
+
+    assert await provider.embed(["a", "b"]) == [[0.0], [1.0]]
+    client.embeddings.create.assert_called_once_with(input=["a", "b"], model="ada")
+
+
+def test_provider_without_embed_cannot_be_instantiated():
+    class Incomplete(EmbeddingProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError, match="embed"):
+        Incomplete(8)
+
+
+def fake_run(texts):
+    return [[float(len(text))] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_local_provider_coalesces_concurrent_queries():
+    provider = LocalEmbeddingProvider(1, "/models/none", batch_size=8, batch_wait_ms=20)
+
+    with patch.object(provider, '_run', side_effect=fake_run) as mock_run:
+        results = await asyncio.gather(*(provider.embed(["x" * n]) for n in (1, 2, 3)))
+
+    assert results == [[[1.0]], [[2.0]], [[3.0]]]
+    mock_run.assert_called_once_with(["x", "xx", "xxx"])
+
+
+@pytest.mark.asyncio
+async def test_local_provider_splits_large_inputs_into_batches():
+    provider = LocalEmbeddingProvider(1, "/models/none", batch_size=2)
+
+    with patch.object(provider, '_run', side_effect=fake_run) as mock_run:
+        result = await provider.embed(["a", "bb", "ccc"])
+
+    assert result == [[1.0], [2.0], [3.0]]
+    assert mock_run.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_local_provider_failure_reaches_every_waiter():
+    provider = LocalEmbeddingProvider(1, "/models/none", batch_wait_ms=20)
+
+    with patch.object(provider, '_run', side_effect=RuntimeError("model missing")):
+        results = await asyncio.gather(provider.embed(["a"]), provider.embed(["b"]), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_local_provider_warm_up_checks_dimensions():
+    provider = LocalEmbeddingProvider(1536, "/models/none", batch_wait_ms=0)
+
+    with patch.object(provider, '_run', return_value=[[0.1] * 384]):
+        with pytest.raises(ValueError, match="384"):
+            await provider.warm_up()
+
+
+def test_create_embedding_provider_from_settings():
+    with patch("app.services.embedding_providers.settings.embedding_provider", "hashing"):
+        assert isinstance(create_embedding_provider(lambda timeout: None), HashingEmbeddingProvider)
+
+    with patch("app.services.embedding_providers.settings.embedding_provider", "bert"):
+        with pytest.raises(ValueError):
+            create_embedding_provider(lambda timeout: None)
+
+
+@pytest.mark.asyncio
+async def test_llm_service_with_hashing_provider_skips_azure():
+    from app.services.llm_service import LLMService
+
+    service = LLMService()
+    service.embedding_provider = HashingEmbeddingProvider(1536)
+    client = MagicMock()
+
+    with patch.object(service, 'client', client):
+        embedding = await service.generate_embedding("laptop")
+        embeddings = await service.generate_embeddings(["laptop", "mouse"])
+
+    assert embedding == embeddings[0]
+    assert len(embeddings) == 2
+    client.embeddings.create.assert_not_called()
+    assert service.breakers == {}
@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from openai import APIConnectionError
+from app.services.ingest_queue import (
+    IngestJobQueue, MemoryQueueBackend, QueueFullError, is_transient
+)
+
+
+@pytest.fixture
+def queue():
+    job_queue = IngestJobQueue()
+    job_queue.backend = MemoryQueueBackend(max_size=10, job_retention=10)
+    return job_queue
+
+
+def test_is_transient_follows_wrapped_errors():
+    try:
+        try:
+            raise APIConnectionError(request=None)
+        except Exception as e:
+            raise Exception(f"Failed to generate embedding: {e}")
+    except Exception as wrapped:
+        assert is_transient(wrapped)
+    
+    assert not is_transient(ValueError("bad input"))
+
+
+@pytest.mark.asyncio
+async def test_job_completes(queue):
+    job_id = await queue.submit([{"name": "Laptop"}, {"name": "Phone"}])
+    
+    with patch("app.services.ingest_queue.ingest_product", new_callable=AsyncMock) as mock_ingest:
+        mock_ingest.side_effect = ["PROD-1", "PROD-2"]
+        await queue.process(await queue.backend.claim())
+        
+        job = await queue.get_job(job_id)
+        assert job["status"] == "running"
+        
+        await queue.process(await queue.backend.claim())
+    
+    job = await queue.get_job(job_id)
+    assert job["status"] == "completed"
+    assert job["product_ids"] == ["PROD-1", "PROD-2"]
+    assert job["finished_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_permanent_error_fails_item(queue):
+    job_id = await queue.submit([{"name": "Laptop"}])
+    
+    with patch("app.services.ingest_queue.ingest_product", new_callable=AsyncMock) as mock_ingest:
+        mock_ingest.side_effect = Exception("LLM Error")
+        await queue.process(await queue.backend.claim())
+    
+    job = await queue.get_job(job_id)
+    assert job["status"] == "failed"
+    assert "LLM Error" in job["errors"][0]
+
+
+@pytest.mark.asyncio
+async def test_transient_error_is_retried(queue):
+    job_id = await queue.submit([{"name": "Laptop"}])
+    
+    with patch("app.services.ingest_queue.ingest_product", new_callable=AsyncMock) as mock_ingest, \
+         patch("app.services.ingest_queue.settings.ingest_retry_backoff_seconds", 0):
+        mock_ingest.side_effect = [APIConnectionError(request=None), "PROD-1"]
+        await queue.process(await queue.backend.claim())
+        
+        item = await queue.backend.claim()
+        assert item.attempts == 2
+        await queue.process(item)
+    
+    job = await queue.get_job(job_id)
+    assert job["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_queue_full_rejects_job(queue):
+    queue.backend = MemoryQueueBackend(max_size=1, job_retention=10)
+    
+    with pytest.raises(QueueFullError):
+        await queue.submit([{"name": "Laptop"}, {"name": "Phone"}])
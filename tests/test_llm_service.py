@@ -204,4 +204,134 @@ async def test_contextualize_query_limits_history(llm_service, mock_openai_clien
         prompt = call_args[1]["messages"][1]["content"]
         
         assert "Message 6" in prompt  
-        assert "Message 5" not in prompt 
\ No newline at end of file
+        assert "Message 5" not in prompt 
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_batches_requests(llm_service, mock_openai_client):
+    def embeddings_response(input, model):
+        response = MagicMock()
+        response.data = [MagicMock(index=i, embedding=[float(i)] * 3) for i in range(len(input))]
+        return response
+    
+    mock_openai_client.embeddings.create.side_effect = embeddings_response
+    
+    # The cl100k_base tokenizer would be downloaded on first use
+    with patch.object(llm_service, 'client', mock_openai_client), \
+         patch.object(llm_service, '_truncate', side_effect=lambda text: text), \
+         patch("app.services.llm_service.settings.embedding_batch_size", 2):
+        result = await llm_service.generate_embeddings(["a", "b", "c"])
+        
+        assert len(result) == 3
+        assert mock_openai_client.embeddings.create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_calls_use_routed_deployment(llm_service, mock_openai_client):
+    from app.services.model_router import ModelRouter, ModelTier
+    router = ModelRouter([
+        ModelTier(name="fast", deployment="gpt-fast", max_tokens=300),
+        ModelTier(name="strong", deployment="gpt-strong", max_tokens=800),
+    ])
+    
+    with patch.object(llm_service, 'client', mock_openai_client), \
+         patch("app.services.llm_service.model_router", router):
+        await llm_service.contextualize_query("¿y ese?", [{"role": "user", "content": "laptops"}])
+        assert mock_openai_client.chat.completions.create.call_args.kwargs["model"] == "gpt-fast"
+        
+        docs = [{"name": f"Laptop {i}", "description": "", "category": "", "price": 1} for i in range(5)]
+        await llm_service.generate_answer_with_memory("laptops", docs, [])
+        call = mock_openai_client.chat.completions.create.call_args.kwargs
+        assert call["model"] == "gpt-strong"
+        assert call["max_tokens"] == 800
+    
+    assert router.tiers["fast"].calls == 1
+    assert router.tiers["strong"].calls == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_does_not_block_event_loop(llm_service, mock_openai_client):
+    import asyncio
+    import time
+    
+    def slow_completion(**kwargs):
+        time.sleep(0.2)
+        return mock_openai_client.chat.completions.create.return_value
+    
+    mock_openai_client.chat.completions.create.side_effect = slow_completion
+    
+    with patch.object(llm_service, 'client', mock_openai_client):
+        answer = asyncio.create_task(llm_service.generate_answer_with_memory("laptops", [], []))
+        # The loop keeps serving other work (and deadlines) while the completion is in flight
+        start = time.monotonic()
+        await asyncio.sleep(0.01)
+        assert time.monotonic() - start < 0.1
+        assert not answer.done()
+        assert await answer == "Test response"
+
+
+@pytest.mark.asyncio
+async def test_embed_query_cached(llm_service):
+    with patch.object(llm_service, 'generate_embedding', new_callable=AsyncMock, return_value=[0.1] * 1536) as mock_embed:
+        first = await llm_service.embed_query("Laptop  Gamer")
+        second = await llm_service.embed_query("laptop gamer")
+        
+        assert first == second
+        mock_embed.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_embeddings_fast(llm_service, mock_openai_client):
+    from app.services.circuit_breaker import CircuitOpenError
+    from app.core.config import settings
+    
+    breaker = llm_service._breaker(settings.azure_openai_embedding_deployment)
+    breaker._open()
+    
+    with patch.object(llm_service, 'client', mock_openai_client), \
+         patch.object(llm_service, '_truncate') as mock_truncate:
+        with pytest.raises(CircuitOpenError):
+            await llm_service.generate_embedding("test text")
+    
+    # Rejected before tokenizing, not just before the request
+    mock_truncate.assert_not_called()
+    mock_openai_client.embeddings.create.assert_not_called()
+    assert breaker.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_embedding_returns_first_response(llm_service):
+    import asyncio
+    
+    fast = [[0.2] * 1536]
+    calls = []
+    
+    async def request(inputs, timeout=None):
+        calls.append(inputs)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+        return fast
+    
+    llm_service._embedding_latencies.extend([10.0] * 20)
+    with patch.object(llm_service, '_request_embeddings', side_effect=request), \
+         patch.object(llm_service, '_truncate', side_effect=lambda text: text), \
+         patch("app.services.llm_service.settings.embedding_hedging_enabled", True), \
+         patch("app.services.llm_service.settings.embedding_hedge_min_delay_ms", 10):
+        result = await llm_service.generate_embedding("test text")
+    
+    assert result == [0.2] * 1536
+    assert len(calls) == 2
+    assert llm_service.hedged_requests == 1
+
+
+@pytest.mark.asyncio
+async def test_answer_moves_to_other_tier_while_circuit_is_open(llm_service, mock_openai_client):
+    from app.services.model_router import ModelRouter, ModelTier
+    
+    router = ModelRouter([ModelTier("fast", "gpt-mini", 400), ModelTier("strong", "gpt-large", 600)])
+    llm_service._breaker("gpt-mini")._open()
+    
+    with patch.object(llm_service, 'client', mock_openai_client), \
+         patch("app.services.llm_service.model_router", router):
+        await llm_service.generate_answer_with_memory("hola", [{"name": "Laptop"}], [])
+    
+    assert mock_openai_client.chat.completions.create.call_args.kwargs["model"] == "gpt-large"
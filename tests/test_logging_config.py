@@ -0,0 +1,67 @@
+import json
+import logging
+from unittest.mock import patch
+from app.core.logging_config import (
+    JsonFormatter, LazyQueueHandler, RequestIdFilter, SamplingFilter, parse_sampling, request_id_var
+)
+
+
+def make_record(name="app.graph.nodes", level=logging.INFO, msg="Retrieved %d documents", args=(3,)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_parse_sampling():
+    assert parse_sampling("app.graph.nodes=0.1, app.services=0.5") == {"app.graph.nodes": 0.1, "app.services": 0.5}
+    assert parse_sampling("") == {}
+
+
+def test_sampling_filter_uses_most_specific_logger():
+    sampler = SamplingFilter({"app": 1.0, "app.graph": 0.0})
+    
+    assert not sampler.filter(make_record("app.graph.nodes"))
+    assert sampler.filter(make_record("app.services.database"))
+    assert sampler.filter(make_record("uvicorn"))
+
+
+def test_sampling_filter_keeps_warnings():
+    sampler = SamplingFilter({"app.graph.nodes": 0.0})
+    
+    assert sampler.filter(make_record(level=logging.WARNING))
+
+
+def test_json_formatter_includes_request_id_and_extra():
+    token = request_id_var.set("req-123")
+    try:
+        record = make_record()
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+    record.latency_ms = 12.5
+    
+    entry = json.loads(JsonFormatter().format(record))
+    
+    assert entry["message"] == "Retrieved 3 documents"
+    assert entry["request_id"] == "req-123"
+    assert entry["latency_ms"] == 12.5
+    assert entry["logger"] == "app.graph.nodes"
+
+
+def test_queue_handler_defers_formatting():
+    record = make_record()
+    
+    with patch.object(logging.LogRecord, "getMessage") as get_message:
+        prepared = LazyQueueHandler(None).prepare(record)
+    
+    get_message.assert_not_called()
+    assert prepared.args == (3,)
+
+
+def test_request_id_header_round_trip():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    
+    response = client.get("/health", headers={"X-Request-ID": "abc"})
+    
+    assert response.headers["X-Request-ID"] == "abc"
+    assert client.get("/health").headers["X-Request-ID"]
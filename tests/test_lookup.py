@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.graph.lookup import detect_intents, lookup_answer, match_product
+from app.graph.nodes import answer_lookup, route_after_lookup
+from app.services.database import ProductHit
+
+
+@pytest.fixture
+def docs():
+    return [
+        ProductHit(product_id="PROD-1", name="MacBook Air", price=1199.0, stock_quantity=4,
+                   specs={"procesador": "M2", "ram": "8GB"}),
+        ProductHit(product_id="PROD-2", name="iPhone 15", price=899.0, stock_quantity=0, specs={}),
+        ProductHit(product_id="PROD-3", name="iPhone 15 Pro", price=1099.0, stock_quantity=2, specs={}),
+    ]
+
+
+def test_detect_intents_ignores_accents():
+    assert detect_intents("¿Cuánto cuesta el MacBook Air?") == ["price"]
+    assert detect_intents("¿hay stock del iPhone 15?") == ["stock"]
+    assert detect_intents("recomiéndame una laptop") == []
+
+
+def test_match_product_prefers_exact_name(docs):
+    assert match_product("¿hay stock del iPhone 15?", docs).product_id == "PROD-2"
+    assert match_product("precio del iphone 15 pro", docs).product_id == "PROD-3"
+
+
+def test_match_product_rejects_unnamed_or_ambiguous(docs):
+    assert match_product("¿cuánto cuesta una laptop?", docs) is None
+    assert match_product("¿cuánto cuesta el iPhone?", docs) is None
+
+
+def test_lookup_answer_templates(docs):
+    answer, intents = lookup_answer("¿Cuánto cuesta el MacBook Air?", docs)
+    assert intents == ["price"]
+    assert "$1,199.00" in answer
+    
+    answer, intents = lookup_answer("¿hay stock del iPhone 15?", docs)
+    assert "no tenemos stock" in answer
+    
+    answer, intents = lookup_answer("¿qué procesador tiene el MacBook Air?", docs)
+    assert intents == ["specs"]
+    assert "procesador: M2" in answer
+    assert "ram" not in answer
+
+
+def test_lookup_answer_needs_llm_when_column_missing(docs):
+    docs[0].price = None
+    
+    assert lookup_answer("¿Cuánto cuesta el MacBook Air?", docs) is None
+    assert lookup_answer("¿el MacBook Air sirve para programar?", docs) is None
+
+
+@pytest.mark.asyncio
+async def test_answer_lookup_node_skips_llm(docs):
+    state = {
+        "original_query": "¿Cuánto cuesta el MacBook Air?",
+        "retrieved_docs": docs,
+        "processing_steps": [],
+        "error_messages": [],
+    }
+    
+    with patch("app.services.llm_service.llm_service.generate_answer_with_memory", new_callable=AsyncMock) as mock_llm:
+        state = await answer_lookup(state)
+    
+    mock_llm.assert_not_called()
+    assert state["lookup_intents"] == ["price"]
+    assert route_after_lookup(state) == "finalize"
+    assert route_after_lookup({"lookup_intents": None}) == "generate"
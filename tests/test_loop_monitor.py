@@ -0,0 +1,54 @@
+import asyncio
+import time
+import pytest
+from app.services.loop_monitor import LoopMonitor
+
+
+def blocking_helper(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_monitor_measures_lag_from_blocking_call():
+    monitor = LoopMonitor(interval=0.01, block_threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+        blocking_helper(0.12)
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    assert stats["lag_ms"]["max"] >= 80
+    assert "blocking_calls" not in stats
+
+
+@pytest.mark.asyncio
+async def test_debug_mode_captures_stack_of_blocking_code():
+    monitor = LoopMonitor(interval=0.01, block_threshold=0.05, debug=True)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.03)
+        blocking_helper(0.2)
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    captures = monitor.stats()["blocking_calls"]
+    assert len(captures) == 1
+    assert any("blocking_helper" in line for line in captures[0]["stack"])
+    assert captures[0]["blocked_ms"] >= 50
+
+
+def test_record_counts_stalls_over_threshold():
+    monitor = LoopMonitor(interval=0.1, block_threshold=0.1)
+    for lag_ms in (1.0, 2.0, 150.0, -0.5):
+        monitor.record(lag_ms)
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    assert stats["lag_ms"]["max"] == 150.0
+    assert stats["lag_ms"]["last"] == 0.0
+    assert stats["lag_ms"]["p99"] == 150.0
@@ -0,0 +1,94 @@
+import time
+from unittest.mock import MagicMock
+from app.services.model_router import ModelRouter, ModelTier
+
+
+def make_router():
+    return ModelRouter(
+        [
+            ModelTier(name="fast", deployment="gpt-fast", max_tokens=300),
+            ModelTier(name="strong", deployment="gpt-strong", max_tokens=600),
+        ],
+        max_latency_ms=1000.0
+    )
+
+
+def test_rewrites_go_to_fast_tier():
+    router = make_router()
+    
+    assert router.choose("rewrite", "compara estas dos laptops").name == "fast"
+
+
+def test_complex_answers_go_to_strong_tier():
+    router = make_router()
+    
+    assert router.choose("answer", "¿cuál es la diferencia entre el iPhone 15 y el 15 Pro?").name == "strong"
+    assert router.choose("answer", "laptops baratas", num_products=5).name == "strong"
+    assert router.choose("answer", "laptops baratas", num_products=1).name == "fast"
+
+
+def test_throttled_tier_spills_over():
+    router = make_router()
+    error = Exception("rate limited")
+    error.status_code = 429
+    error.response = MagicMock(headers={"retry-after": "30"})
+    
+    router.record(router.tiers["fast"], 50.0, error=error)
+    
+    assert not router.tiers["fast"].available
+    assert router.choose("rewrite", "hola").name == "strong"
+    assert router.stats()["fast"]["throttled"] == 1
+
+
+def test_slow_tier_spills_over_and_tracks_latency():
+    router = make_router()
+    
+    for _ in range(5):
+        router.record(router.tiers["strong"], 5000.0)
+    
+    router.tiers["strong"].probe_at = time.monotonic() + 60
+    assert router.choose("answer", "compara laptops").name == "fast"
+    stats = router.stats()["strong"]
+    assert stats["calls"] == 5
+    assert stats["p95_ms"] == 5000.0
+
+
+def test_slow_tier_is_probed_and_comes_back():
+    router = make_router()
+    strong = router.tiers["strong"]
+    
+    for _ in range(5):
+        router.record(strong, 5000.0)
+    
+    # First call after it turned slow is a probe; the rest spill over until the next probe
+    probe = router.choose("answer", "compara laptops")
+    assert probe.name == "strong"
+    assert router.choose("answer", "compara laptops").name == "fast"
+    
+    router.record(probe, 200.0)
+    assert strong.latency_ewma_ms == 200.0
+    assert router.choose("answer", "compara laptops").name == "strong"
+
+
+def test_slow_tier_probed_again_after_interval():
+    router = make_router()
+    strong = router.tiers["strong"]
+    router.record(strong, 5000.0)
+    
+    router.record(router.choose("answer", "compara laptops"), 4000.0)
+    assert router.choose("answer", "compara laptops").name == "fast"
+    
+    strong.probe_at = time.monotonic() - 1
+    assert router.choose("answer", "compara laptops").name == "strong"
+
+
+def test_single_deployment_never_spills():
+    router = ModelRouter([
+        ModelTier(name="fast", deployment="gpt", max_tokens=300),
+        ModelTier(name="strong", deployment="gpt", max_tokens=600),
+    ])
+    router.tiers["strong"].throttled_until = time.monotonic() + 60
+    
+    tier = router.choose("answer", "compara laptops")
+    assert tier.name == "strong"
+    assert tier.max_tokens == 600
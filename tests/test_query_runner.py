@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.database import ProductHit
+from app.services.query_runner import build_query_response, run_batch
+
+
+def agent_result(state):
+    return {
+        "final_answer": f"Answer to {state['original_query']}",
+        "confidence_score": 0.9,
+        "retrieved_docs": state["prefetched_docs"] or [],
+        "start_time": 0.0,
+        "end_time": 0.5
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_batch_embeds_once_and_prefetches_docs():
+    hits = [ProductHit(product_id="PROD-1", name="Laptop", combined_score=0.9)]
+    
+    with patch("app.services.llm_service.llm_service.generate_embeddings", new_callable=AsyncMock) as mock_embed, \
+         patch("app.services.database.db_service.hybrid_search", new_callable=AsyncMock) as mock_search, \
+         patch("app.graph.builder.rag_agent.ainvoke", new_callable=AsyncMock) as mock_agent:
+        mock_embed.return_value = [[0.1], [0.2]]
+        mock_search.return_value = hits
+        mock_agent.side_effect = agent_result
+        
+        results = [result async for result in run_batch([{"query": "a"}, {"query": "b", "max_sources": 0}])]
+    
+    mock_embed.assert_awaited_once_with(["a", "b"])
+    assert mock_search.await_count == 2
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0]["answer"] == "Answer to a"
+    assert by_index[0]["sources"][0]["product_id"] == "PROD-1"
+    assert by_index[1]["sources"] == []
+
+
+@pytest.mark.asyncio
+async def test_run_batch_reports_item_errors_and_falls_back_without_embeddings():
+    with patch("app.services.llm_service.llm_service.generate_embeddings", new_callable=AsyncMock) as mock_embed, \
+         patch("app.services.database.db_service.hybrid_search", new_callable=AsyncMock) as mock_search, \
+         patch("app.graph.builder.rag_agent.ainvoke", new_callable=AsyncMock) as mock_agent:
+        mock_embed.side_effect = Exception("Azure down")
+        mock_agent.side_effect = [agent_result({"original_query": "a", "prefetched_docs": None}), Exception("boom")]
+        
+        results = [result async for result in run_batch([{"query": "a"}, {"query": "b"}], agent_concurrency=1)]
+    
+    mock_search.assert_not_called()
+    assert mock_agent.call_args_list[0].args[0]["prefetched_docs"] is None
+    assert sorted(("error" in result) for result in results) == [False, True]
+
+
+def test_build_query_response_without_history():
+    result = {"final_answer": "Yes", "retrieved_docs": [], "start_time": 1.0, "end_time": 1.25}
+    
+    response = build_query_response("q", [], result, include_history=False)
+    
+    assert "conversation_history" not in response
+    assert response["processing_time_ms"] == 250
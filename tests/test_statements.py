@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+from app.services.statements import StatementRegistry
+
+
+@pytest.mark.asyncio
+async def test_fetch_records_timings():
+    registry = StatementRegistry()
+    registry.register("lookup", "SELECT * FROM products WHERE product_id = $1")
+    conn = AsyncMock()
+    conn.fetch.return_value = [{"product_id": "PROD-1"}]
+    
+    rows = await registry.fetch(conn, "lookup", "PROD-1")
+    await registry.fetch(conn, "lookup", "PROD-2")
+    
+    assert rows == [{"product_id": "PROD-1"}]
+    conn.fetch.assert_called_with("SELECT * FROM products WHERE product_id = $1", "PROD-2")
+    stats = registry.stats()["lookup"]
+    assert stats["calls"] == 2
+    assert stats["slow_calls"] == 0
+    assert stats["last_plan"] is None
+    conn.fetchval.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_slow_statement_captures_plan_in_background_once_per_interval():
+    explain_conn = AsyncMock()
+    explain_conn.fetchval.return_value = '[{"Plan": {"Node Type": "Index Scan"}}]'
+    
+    @asynccontextmanager
+    async def explain_connection():
+        yield explain_conn
+    
+    registry = StatementRegistry(explain_threshold_ms=0.001, explain_connection=explain_connection)
+    registry.register("lookup", "SELECT * FROM products WHERE product_id = $1")
+    conn = AsyncMock()
+    conn.fetch.return_value = []
+    
+    with patch("app.services.statements.time.perf_counter", side_effect=[0.0, 1.0, 2.0, 3.0, 4.0, 5.0]):
+        await registry.fetch(conn, "lookup", "PROD-1")
+        # Still running: a second slow call doesn't start another capture
+        await registry.fetch(conn, "lookup", "PROD-2")
+        await asyncio.gather(*registry._tasks)
+        await registry.fetch(conn, "lookup", "PROD-3")
+    
+    conn.fetchval.assert_not_called()
+    explain_conn.fetchval.assert_called_once_with(
+        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT * FROM products WHERE product_id = $1", "PROD-1"
+    )
+    stats = registry.stats()["lookup"]
+    assert stats["slow_calls"] == 3
+    assert stats["last_plan"]["plan"][0]["Plan"]["Node Type"] == "Index Scan"
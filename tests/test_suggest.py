@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from contextlib import asynccontextmanager
+from app.services.database import DatabaseService
+from app.services.suggest import PrefixIndex, SuggestService, Suggestion
+
+
+@pytest.fixture
+def index():
+    return PrefixIndex([
+        Suggestion("MacBook Air M2", "product", 1),
+        Suggestion("MacBook Pro 14", "product", 0),
+        Suggestion("Mouse Logitech MX", "product", 1),
+        Suggestion("Electrónicos", "category", 12),
+        Suggestion("Monitor Samsung", "product", 1),
+    ])
+
+
+def test_prefix_search_matches_start_of_name(index):
+    results = index.search("macb", 5)
+    
+    # In-stock products first
+    assert [s.text for s in results] == ["MacBook Air M2", "MacBook Pro 14"]
+
+
+def test_prefix_search_matches_later_words_after_leading_ones(index):
+    index = PrefixIndex([Suggestion("Air Fryer", "product", 0), Suggestion("MacBook Air M2", "product", 1)])
+    
+    assert [s.text for s in index.search("air", 5)] == ["Air Fryer", "MacBook Air M2"]
+    assert [s.text for s in index.search("m2", 5)] == ["MacBook Air M2"]
+
+
+def test_prefix_search_ignores_accents_and_case(index):
+    results = index.search("ELECTRO", 5)
+    
+    assert results == [Suggestion("Electrónicos", "category", 12)]
+    assert index.search("   ", 5) == []
+
+
+def make_service(rows, fuzzy_rows=None):
+    db = DatabaseService()
+    conn = AsyncMock()
+    conn.fetch.return_value = rows
+    
+    @asynccontextmanager
+    async def read_connection():
+        yield conn
+    
+    db.read_connection = read_connection
+    db.statements.fetch = AsyncMock(return_value=fuzzy_rows or [])
+    return SuggestService(db), conn
+
+
+@pytest.mark.asyncio
+async def test_suggest_builds_index_lazily_and_skips_fuzzy_when_enough_prefix_hits():
+    rows = [
+        {"name": "Laptop Gamer", "category": "Computadoras", "stock_quantity": 3},
+        {"name": "Laptop Oficina", "category": "Computadoras", "stock_quantity": 0},
+    ]
+    service, conn = make_service(rows)
+    
+    results = await service.suggest("lap", limit=2)
+    
+    assert [r["text"] for r in results] == ["Laptop Gamer", "Laptop Oficina"]
+    assert all(r["source"] == "prefix" for r in results)
+    service.db.statements.fetch.assert_not_called()
+    
+    await service.suggest("comp", limit=2)
+    conn.fetch.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_suggest_falls_back_to_trigram_for_typos():
+    service, _ = make_service(
+        [{"name": "MacBook Air M2", "category": "Computadoras", "stock_quantity": 1}],
+        fuzzy_rows=[{"name": "MacBook Air M2", "score": 0.5}]
+    )
+    
+    results = await service.suggest("macbok", limit=5)
+    await service.suggest("MACBOK", limit=5)
+    
+    assert results == [{"text": "MacBook Air M2", "type": "product", "source": "fuzzy"}]
+    service.db.statements.fetch.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_catalog_change_schedules_one_rebuild():
+    service, conn = make_service([{"name": "Laptop", "category": None, "stock_quantity": 1}])
+    await service.refresh()
+    
+    with patch("app.services.suggest.settings.suggest_refresh_delay_seconds", 0):
+        service.db.apply_catalog_change(["PROD-1"])
+        service.db.apply_catalog_change(["PROD-2"])
+        await service._refresh_task
+    
+    assert conn.fetch.call_count == 2
@@ -0,0 +1,68 @@
+import json
+import os
+import pytest
+from app.services.synonyms import SynonymDictionary, TermMatcher
+
+
+DICTIONARY = {
+    "synonyms": [
+        {"match": ["laptop", "portátil"], "expand": ["notebook", "macbook"]},
+        {"match": ["dia a dia"], "expand": ["diario"]}
+    ],
+    "boosts": [
+        {"query": ["laptop"], "category": ["tecnologia"], "factor": 1.5},
+        {"name": ["macbook"], "factor": 1.3}
+    ]
+}
+
+
+@pytest.fixture
+def dictionary_file(tmp_path):
+    path = tmp_path / "synonyms.json"
+    path.write_text(json.dumps(DICTIONARY), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def synonyms(dictionary_file):
+    return SynonymDictionary(str(dictionary_file), reload_interval=0)
+
+
+def test_term_matcher_words_plurals_and_phrases():
+    matcher = TermMatcher()
+    matcher.add("celular", "phone")
+    matcher.add("día a día", "daily")
+    
+    assert matcher.find("Celulares para el dia a dia") == {"phone", "daily"}
+    assert matcher.find("un dia cualquiera") == set()
+
+
+def test_expand_adds_group_terms(synonyms):
+    expanded = synonyms.expand("Portátiles baratos").split()
+    
+    assert expanded[:2] == ["Portátiles", "baratos"]
+    assert {"notebook", "macbook"} <= set(expanded)
+    assert synonyms.expand("mouse inalambrico") == "mouse inalambrico"
+
+
+def test_boost_first_matching_rule_wins(synonyms):
+    matches = synonyms.match_query("laptop para estudiar")
+    
+    assert synonyms.boost(matches, "MacBook Air", "Tecnología") == 1.5
+    assert synonyms.boost(matches, "MacBook Air", "Hogar") == 1.3
+    assert synonyms.boost(synonyms.match_query("mouse"), "MacBook Air", "Tecnología") == 1.3
+    assert synonyms.boost(matches, "Silla", "Hogar") == 1.0
+
+
+def test_reload_on_file_change_and_keep_previous_when_broken(synonyms, dictionary_file):
+    version = synonyms.version
+    
+    dictionary_file.write_text(json.dumps({"synonyms": [{"match": ["mouse"], "expand": ["raton"]}]}), encoding="utf-8")
+    os.utime(dictionary_file, (1, 1))
+    assert "raton" in synonyms.expand("mouse")
+    assert synonyms.version == version + 1
+    
+    dictionary_file.write_text("{not json", encoding="utf-8")
+    os.utime(dictionary_file, (2, 2))
+    assert "raton" in synonyms.expand("mouse")
+    assert synonyms.version == version + 1
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.warmup import WarmupService
+
+
+@pytest.mark.asyncio
+async def test_warm_up_marks_ready_when_all_steps_pass():
+    service = WarmupService()
+    
+    with patch("app.services.llm_service.llm_service.warm_up", new_callable=AsyncMock), \
+         patch("app.services.database.db_service.warm_up", new_callable=AsyncMock), \
+         patch("app.services.suggest.suggest_service.refresh", new_callable=AsyncMock), \
+         patch("app.services.warmup._compile_graph", new_callable=AsyncMock):
+        assert await service.warm_up() is True
+    
+    assert service.checks == {"tokenizer": "ok", "graph": "ok", "database": "ok", "suggest_index": "ok"}
+    assert service.warmed_at is not None
+
+
+@pytest.mark.asyncio
+async def test_warm_up_retries_only_failed_steps():
+    service = WarmupService()
+    
+    with patch("app.services.llm_service.llm_service.warm_up", new_callable=AsyncMock) as mock_tokenizer, \
+         patch("app.services.database.db_service.warm_up", new_callable=AsyncMock) as mock_db, \
+         patch("app.services.suggest.suggest_service.refresh", new_callable=AsyncMock), \
+         patch("app.services.warmup._compile_graph", new_callable=AsyncMock):
+        mock_db.side_effect = [OSError("connection refused"), None]
+        
+        assert await service.warm_up() is False
+        assert service.checks["database"].startswith("error")
+        
+        assert await service.warm_up() is True
+        assert mock_tokenizer.await_count == 1
+        assert mock_db.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_start_falls_back_to_background_retries():
+    service = WarmupService()
+    
+    with patch("app.services.llm_service.llm_service.warm_up", new_callable=AsyncMock), \
+         patch("app.services.database.db_service.warm_up", new_callable=AsyncMock) as mock_db, \
+         patch("app.services.suggest.suggest_service.refresh", new_callable=AsyncMock), \
+         patch("app.services.warmup._compile_graph", new_callable=AsyncMock):
+        mock_db.side_effect = OSError("connection refused")
+        
+        await service.start()
+        assert service.ready is False
+        assert service._task is not None
+        
+        await service.stop()
+        assert service._task is None